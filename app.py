@@ -4,6 +4,13 @@ from datetime import datetime, timedelta, timezone
 from streamlit_cookies_manager import EncryptedCookieManager
 from styles.styles import estilo_metricas, estilo_dashboard
 from utils.logger import get_logger
+from utils.monitor_consultas import (
+    iniciar_rerun_consultas,
+    registrar_resumen_rerun,
+    modo_depuracion,
+    render_panel_consultas,
+)
+from utils.actualizador_cache import iniciar_actualizador
 
 logger = get_logger(__name__)
 
@@ -252,7 +259,19 @@ def mostrar_app():
         </div>
         """, unsafe_allow_html=True)
 
-    pg.run()
+    # Hilo que recalcula las cachés tras cada escritura (una vez por proceso)
+    iniciar_actualizador()
+
+    iniciar_rerun_consultas()
+    try:
+        pg.run()
+    finally:
+        registrar_resumen_rerun()
+
+    # Vista de depuración de consultas (?debug=1)
+    if modo_depuracion():
+        with st.sidebar:
+            render_panel_consultas()
 
 # ======================
 # CONTROL DE ACCESO
@@ -1,7 +1,10 @@
 from datetime import datetime, date
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 import pytz
 import pandas as pd
+from postgrest.exceptions import APIError
+
+from utils.normalizacion import normalizar
 
 # Zona horaria de México
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
@@ -30,52 +33,71 @@ def convertir_fecha_a_iso(fecha):
     return None
 
 # ------------------ Función maestra ------------------
-def insertar_maestra(conn, tipo_registro: str, data: Dict[str, Any]) -> int:
-    """
-    Inserta un registro en la tabla maestra 'registros_rh' y devuelve el id.
-    """
-    if tipo_registro not in {"Alta", "Baja", "Vacante"}:
+TABLAS_HIJAS = {"Alta": "altas", "Baja": "bajas", "Vacante": "vacantes"}
+
+# Filas por llamada en las escrituras por lote
+TAMANO_LOTE_ESCRITURA = 200
+
+
+def _validar_tipo(tipo_registro: str):
+    if tipo_registro not in TABLAS_HIJAS:
         raise ValueError(f"tipo_registro inválido: {tipo_registro}. Debe ser 'Alta', 'Baja' o 'Vacante'.")
-    
-    payload = {
-        "tipo_registro": tipo_registro.strip().capitalize(),
-        "fecha_creacion": datetime.now(MEXICO_TZ).isoformat(),
-        "puesto": str(data.get("puesto", "")).strip().upper(),
+
+
+def _datos_maestra(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "puesto": normalizar(data.get("puesto", ""), quitar_acentos=False),
         "empresa": str(data.get("empresa", "")).strip(),
         "plaza": str(data.get("plaza", "")).strip(),
         "area": str(data.get("area", "")).strip(),
     }
-    
-    response = conn.table("registros_rh").insert(payload).execute()
-    return response.data[0]["id"]
+
+
+def armar_payload_maestra(tipo_registro: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    _validar_tipo(tipo_registro)
+    return {
+        "tipo_registro": tipo_registro.strip().capitalize(),
+        "fecha_creacion": datetime.now(MEXICO_TZ).isoformat(),
+        **_datos_maestra(data),
+    }
+
+
+def insertar_maestra(conn, tipo_registro: str, data: Dict[str, Any]) -> int:
+    """
+    Inserta un registro en la tabla maestra 'registros_rh' y devuelve el id.
+    """
+    return insertar_maestras(conn, tipo_registro, [data])[0]
 
 # ------------------ Funciones hijas ------------------
-def insertar_alta(conn, data: Dict[str, Any], id_registro: int):
+def armar_payload_alta(data: Dict[str, Any], id_registro: int) -> Dict[str, Any]:
     if not data.get("puesto_alta"):
         raise ValueError("El campo 'puesto_alta' es obligatorio.")
     
-    payload = {
+    return {
         "id_registro": id_registro,
         "fecha_alta": convertir_fecha_a_iso(data.get("fecha_alta")),
         "empresa_alta": data["empresa_alta"],
-        "puesto_alta": str(data["puesto_alta"]).strip().upper(),
+        "puesto_alta": normalizar(data["puesto_alta"], quitar_acentos=False),
         "plaza_alta": data["plaza_alta"],
         "area_alta": data["area_alta"],
         "contratados_alta": str(data["contratados_alta"]),
         "medio_reclutamiento_alta": data["medio_reclutamiento_alta"],
         "responsable_alta": data["responsable_alta"],
     }
-    return conn.table("altas").insert(payload).execute()
 
 
-def insertar_baja(conn, data: Dict[str, Any], id_registro: int):
+def insertar_alta(conn, data: Dict[str, Any], id_registro: int):
+    return conn.table("altas").insert(armar_payload_alta(data, id_registro)).execute()
+
+
+def armar_payload_baja(data: Dict[str, Any], id_registro: int) -> Dict[str, Any]:
     if not data.get("puesto_baja"):
         raise ValueError("El campo 'puesto_baja' es obligatorio.")
     
-    payload = {
+    return {
         "id_registro": id_registro,
         "fecha_baja": convertir_fecha_a_iso(data.get("fecha_baja")),
-        "puesto_baja": str(data["puesto_baja"]).strip().upper(),
+        "puesto_baja": normalizar(data["puesto_baja"], quitar_acentos=False),
         "empresa_baja": data["empresa_baja"],
         "plaza_baja": data["plaza_baja"],
         "area_baja": data["area_baja"],
@@ -83,34 +105,14 @@ def insertar_baja(conn, data: Dict[str, Any], id_registro: int):
         "tipo_baja": data["tipo_baja"],
         "motivo_baja": str(data["motivo_baja"]).strip(),
     }
-    return conn.table("bajas").insert(payload).execute()
+
+
+def insertar_baja(conn, data: Dict[str, Any], id_registro: int):
+    return conn.table("bajas").insert(armar_payload_baja(data, id_registro)).execute()
 
 
 def insertar_vacante(conn, data: Dict[str, Any], id_registro: int):
-    if not data.get("puesto_vacante"):
-        raise ValueError("El campo 'puesto_vacante' es obligatorio.")
-    
-    payload = {
-        "id_registro": id_registro,
-        "fecha_solicitud": convertir_fecha_a_iso(data.get("fecha_solicitud")),
-        "tipo_solicitud": data.get("tipo_solicitud"),
-        "estatus_solicitud": data.get("estatus_solicitud"),
-        "fase_proceso": data.get("fase_proceso"),
-        "fecha_avance": convertir_fecha_a_iso(data.get("fecha_avance")),
-        "fecha_autorizacion": convertir_fecha_a_iso(data.get("fecha_autorizacion")),
-        "puesto_vacante": str(data["puesto_vacante"]).strip().upper(),
-        "plaza_vacante": data.get("plaza_vacante"),
-        "empresa_vacante": data.get("empresa_vacante"),
-        "funcion_area_vacante": data.get("funcion_area_vacante", "").upper() if data.get("funcion_area_vacante") else None,
-        "vacantes_solicitadas": data.get("vacantes_solicitadas", 0),
-        "vacantes_contratados": data.get("vacantes_contratadas", 0),
-        "responsable_vacante": data.get("reponsable_vacante"),
-        "comentarios_vacante": (str(data["comentarios_vacante"]).strip().upper() if data.get("comentarios_vacante") else None), 
-        "tipo_reclutamiento_vacante": data.get("tipo_reclutamiento_vacante", "").strip().upper() if data.get("tipo_reclutamiento_vacante") else None,
-        "medio_reclutamiento_vacante": data.get("medio_reclutamiento_vacante", "").strip().upper() if data.get("medio_reclutamiento_vacante") else None,
-        "fecha_cobertura": convertir_fecha_a_iso(data.get("fecha_cobertura")),
-        "id_sistema": data.get("id_sistema")
-    }
+    payload = armar_payload_vacante(data, id_registro)
     return conn.table("vacantes").insert(payload).execute()
 
 def buscar_vacante_por_id_sistema(conn, id_sistema: int):
@@ -128,14 +130,15 @@ def buscar_vacante_por_id_sistema(conn, id_sistema: int):
         return None
 
 
-def actualizar_vacante_sistema(conn, data: Dict[str, Any], id_registro: int, id_vacante: int):
+def armar_payload_vacante(data: Dict[str, Any], id_registro: int) -> Dict[str, Any]:
     """
-    Actualiza una vacante existente.
+    Payload con el que se inserta o actualiza una vacante; también sirve para comparar
+    contra la fila guardada (ver utils/importacion_vacantes.huella).
     """
     if not data.get("puesto_vacante"):
         raise ValueError("El campo 'puesto_vacante' es obligatorio.")
     
-    payload = {
+    return {
         "id_registro": id_registro,
         "fecha_solicitud": convertir_fecha_a_iso(data.get("fecha_solicitud")),
         "tipo_solicitud": data.get("tipo_solicitud"),
@@ -143,31 +146,137 @@ def actualizar_vacante_sistema(conn, data: Dict[str, Any], id_registro: int, id_
         "fase_proceso": data.get("fase_proceso"),
         "fecha_avance": convertir_fecha_a_iso(data.get("fecha_avance")),
         "fecha_autorizacion": convertir_fecha_a_iso(data.get("fecha_autorizacion")),
-        "puesto_vacante": str(data["puesto_vacante"]).strip().upper(),
+        "puesto_vacante": normalizar(data["puesto_vacante"], quitar_acentos=False),
         "plaza_vacante": data.get("plaza_vacante"),
         "empresa_vacante": data.get("empresa_vacante"),
-        "funcion_area_vacante": data.get("funcion_area_vacante", "").upper() if data.get("funcion_area_vacante") else None,
+        "funcion_area_vacante": normalizar(data["funcion_area_vacante"], quitar_acentos=False) if data.get("funcion_area_vacante") else None,
         "vacantes_solicitadas": data.get("vacantes_solicitadas", 0),
         "vacantes_contratados": data.get("vacantes_contratadas", 0),
         "responsable_vacante": data.get("reponsable_vacante"),
-        "comentarios_vacante": (str(data["comentarios_vacante"]).strip().upper().replace("Á", "A").replace("É", "E").replace("Í", "I").replace("Ó", "O").replace("Ú", "U") if data.get("comentarios_vacante") else None),
-        "tipo_reclutamiento_vacante": (str(data["tipo_reclutamiento_vacante"]).strip().upper() if data.get("tipo_reclutamiento_vacante") else None),
-        "medio_reclutamiento_vacante": (str(data["medio_reclutamiento_vacante"]).strip().upper() if data.get("medio_reclutamiento_vacante") else None),
+        "comentarios_vacante": (normalizar(data["comentarios_vacante"]) if data.get("comentarios_vacante") else None),
+        "tipo_reclutamiento_vacante": (normalizar(data["tipo_reclutamiento_vacante"], quitar_acentos=False) if data.get("tipo_reclutamiento_vacante") else None),
+        "medio_reclutamiento_vacante": (normalizar(data["medio_reclutamiento_vacante"], quitar_acentos=False) if data.get("medio_reclutamiento_vacante") else None),
         "fecha_cobertura": convertir_fecha_a_iso(data.get("fecha_cobertura")),
         "id_sistema": data.get("id_sistema")
     }
-    
+
+
+def actualizar_vacante_sistema(conn, data: Dict[str, Any], id_registro: int, id_vacante: int):
+    """
+    Actualiza una vacante existente.
+    """
+    payload = armar_payload_vacante(data, id_registro)
     return conn.table("vacantes").update(payload).eq("id", id_vacante).execute()
 
 def actualizar_maestra(conn, id_maestra: int, data: Dict[str, Any]):
     """
     Actualiza un registro en la tabla maestra.
     """
-    payload = {
-        "puesto": str(data.get("puesto", "")).strip().upper(),
-        "empresa": str(data.get("empresa", "")).strip(),
-        "plaza": str(data.get("plaza", "")).strip(),
-        "area": str(data.get("area", "")).strip(),
-    }
-    
-    return conn.table("registros_rh").update(payload).eq("id", id_maestra).execute()
+    return conn.table("registros_rh").update(_datos_maestra(data)).eq("id", id_maestra).execute()
+
+
+# ------------------ Escritura por lotes ------------------
+# registrar_lote y actualizar_lote llaman a las funciones SQL de
+# config/sql/escritura_lote.sql en bloques de hasta TAMANO_LOTE_ESCRITURA filas:
+# cada bloque es una sola transacción, así que una maestra nunca queda sin su
+# registro hijo ni a medio actualizar, pero un bloque fallido no deshace los anteriores.
+class ConflictoVersion(Exception):
+    """El registro cambió en la base después de leerse (su columna `version` ya no coincide)."""
+
+
+class EscrituraParcial(Exception):
+    """Falló un bloque de registrar_lote después de guardar los anteriores.
+
+    `ids` son los pares ya guardados (en el orden de entrada) y `error` la causa.
+    """
+
+    def __init__(self, error: Exception, ids: List[Dict[str, int]]):
+        super().__init__(f"{len(ids)} registros guardados antes del error: {error}")
+        self.error = error
+        self.ids = ids
+
+
+_PAYLOADS_HIJOS = {
+    "Alta": armar_payload_alta,
+    "Baja": armar_payload_baja,
+    "Vacante": armar_payload_vacante,
+}
+
+
+def _en_bloques(filas: List[Any], tamano: int):
+    for inicio in range(0, len(filas), tamano):
+        yield filas[inicio:inicio + tamano]
+
+
+def insertar_maestras(conn, tipo_registro: str, datos: List[Dict[str, Any]], tamano: int = TAMANO_LOTE_ESCRITURA) -> List[int]:
+    """
+    Inserta varios registros en 'registros_rh' y devuelve sus ids en el mismo orden.
+    """
+    payloads = [armar_payload_maestra(tipo_registro, data) for data in datos]
+    ids = []
+    for bloque in _en_bloques(payloads, tamano):
+        response = conn.table("registros_rh").insert(bloque).execute()
+        ids += [fila["id"] for fila in response.data]
+    return ids
+
+
+def registrar_lote(conn, tipo_registro: str, registros: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+                   tamano: int = TAMANO_LOTE_ESCRITURA) -> List[Dict[str, int]]:
+    """
+    Inserta pares (datos de la maestra, datos del hijo) del mismo tipo de registro.
+    Devuelve, en el mismo orden, dicts con `id_registro` y el `id` del hijo.
+    Cada bloque de `tamano` pares es atómico; si falla uno después de guardar
+    otros, se lanza EscrituraParcial con los ids ya guardados.
+    """
+    _validar_tipo(tipo_registro)
+    payloads = []
+    for maestra_data, hijo_data in registros:
+        hijo = _PAYLOADS_HIJOS[tipo_registro](hijo_data, None)
+        hijo.pop("id_registro")
+        payloads.append({"maestra": armar_payload_maestra(tipo_registro, maestra_data), "hijo": hijo})
+
+    ids = []
+    for bloque in _en_bloques(payloads, tamano):
+        try:
+            response = conn.rpc("registrar_lote", {"p_tipo": tipo_registro, "p_registros": bloque}).execute()
+        except Exception as e:
+            if ids:
+                raise EscrituraParcial(e, ids) from e
+            raise
+        ids += [{"id_registro": fila["id_registro"], "id": fila["id_hijo"]} for fila in response.data]
+    return ids
+
+
+def registrar(conn, tipo_registro: str, maestra_data: Dict[str, Any], hijo_data: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Inserta una maestra con su registro hijo en una sola transacción.
+    """
+    return registrar_lote(conn, tipo_registro, [(maestra_data, hijo_data)])[0]
+
+
+def actualizar_lote(conn, tipo_registro: str, cambios: List[Dict[str, Any]], tamano: int = TAMANO_LOTE_ESCRITURA):
+    """
+    Actualiza maestras y registros hijos. Cada cambio es un dict con:
+    - `id_registro` y `maestra` (datos como en actualizar_maestra), y/o
+    - `id` y `hijo` (columnas de la tabla hija a escribir; puede ser parcial).
+    Si `hijo` incluye `version`, se lanza ConflictoVersion cuando la guardada es otra.
+    Cada bloque de `tamano` cambios es atómico; uno fallido no deshace los anteriores.
+    """
+    _validar_tipo(tipo_registro)
+    payloads = []
+    for cambio in cambios:
+        payload = {}
+        if cambio.get("maestra") is not None:
+            payload["maestra"] = {"id": cambio["id_registro"], **_datos_maestra(cambio["maestra"])}
+        if cambio.get("hijo"):
+            payload["hijo"] = {**cambio["hijo"], "id": cambio["id"]}
+        if payload:
+            payloads.append(payload)
+
+    for bloque in _en_bloques(payloads, tamano):
+        try:
+            conn.rpc("actualizar_lote", {"p_tipo": tipo_registro, "p_cambios": bloque}).execute()
+        except APIError as e:
+            if e.code == "PT409":
+                raise ConflictoVersion(e.message) from e
+            raise
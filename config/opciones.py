@@ -134,6 +134,16 @@ TRIMESTRES = {
     4: {"nombre": "T4 (Octubre-Diciembre)", "meses": [10, 11, 12]},
 }
 
+# Metas de SLA en días de cobertura. Gana la regla más específica: puesto > empresa > función de área
+SLA_POR_AREA = {
+    "OPERATIVA": 15,
+    "ADMINISTRATIVA": 45,
+}
+
+SLA_POR_EMPRESA = {}
+
+SLA_POR_PUESTO = {}
+
 EMPRESAS_NOMBRE_CORTO = {
     'MARKETING EN PUBLICIDAD DE QUERETARO SA DE CV': 'MKT QRO',
     'SICMART SA DE CV': 'SICMART',
@@ -0,0 +1,113 @@
+-- Escritura por lotes de registros_rh y sus tablas hijas (altas, bajas, vacantes).
+-- Las usa config/db_utils.py (registrar_lote, actualizar_lote) mediante RPC.
+-- Cada llamada (un bloque de hasta TAMANO_LOTE_ESCRITURA filas) corre en una sola
+-- transacción: si una fila falla, no se guarda nada del bloque y ninguna maestra
+-- queda sin su registro hijo.
+
+create or replace function _tabla_hija(p_tipo text)
+returns text
+language sql immutable as $$
+    select case p_tipo
+        when 'Alta' then 'altas'
+        when 'Baja' then 'bajas'
+        when 'Vacante' then 'vacantes'
+    end
+$$;
+
+
+-- Actualiza en p_tabla solo las columnas presentes en p_fila (que incluye el id).
+-- Si p_fila trae `version`, solo se actualiza cuando coincide con la guardada
+-- (concurrencia optimista); si no coincide se responde con HTTP 409.
+create or replace function _actualizar_fila(p_tabla text, p_fila jsonb)
+returns void
+language plpgsql as $$
+declare
+    v_asignaciones text;
+    v_filas integer;
+begin
+    select string_agg(format('%1$I = r.%1$I', columna), ', ')
+      into v_asignaciones
+      from jsonb_object_keys(p_fila) as columna
+     where columna not in ('id', 'version');
+
+    if v_asignaciones is null then
+        return;
+    end if;
+
+    execute format(
+        'update %1$I t set %2$s from jsonb_populate_record(null::%1$I, $1) r where t.id = r.id%3$s',
+        p_tabla, v_asignaciones,
+        case when p_fila ? 'version' then ' and t.version = r.version' else '' end
+    ) using p_fila;
+
+    get diagnostics v_filas = row_count;
+    if v_filas = 0 and p_fila ? 'version' then
+        raise sqlstate 'PT409' using message = format('%s %s fue modificado por otro usuario', p_tabla, p_fila ->> 'id');
+    end if;
+end
+$$;
+
+
+-- p_registros: [{"maestra": {...}, "hijo": {...}}, ...]
+-- Devuelve (id_registro, id_hijo) en el mismo orden que p_registros.
+create or replace function registrar_lote(p_tipo text, p_registros jsonb)
+returns table (id_registro bigint, id_hijo bigint)
+language plpgsql as $$
+declare
+    v_tabla text := _tabla_hija(p_tipo);
+    v_registro jsonb;
+    v_hijo jsonb;
+    v_columnas text;
+begin
+    if v_tabla is null then
+        raise exception 'tipo_registro inválido: %', p_tipo;
+    end if;
+
+    for v_registro in
+        select valor from jsonb_array_elements(p_registros) with ordinality as e(valor, n) order by n
+    loop
+        insert into registros_rh (tipo_registro, fecha_creacion, puesto, empresa, plaza, area)
+        select p_tipo, m.fecha_creacion, m.puesto, m.empresa, m.plaza, m.area
+          from jsonb_populate_record(null::registros_rh, v_registro -> 'maestra') as m
+        returning id into id_registro;
+
+        v_hijo := (v_registro -> 'hijo') || jsonb_build_object('id_registro', id_registro);
+        select string_agg(quote_ident(columna), ', ')
+          into v_columnas
+          from jsonb_object_keys(v_hijo) as columna;
+
+        execute format(
+            'insert into %1$I (%2$s) select %2$s from jsonb_populate_record(null::%1$I, $1) returning id',
+            v_tabla, v_columnas
+        ) into id_hijo using v_hijo;
+
+        return next;
+    end loop;
+end
+$$;
+
+
+-- p_cambios: [{"maestra": {"id": ..., ...}, "hijo": {"id": ..., ...}}, ...]; ambas llaves son opcionales
+create or replace function actualizar_lote(p_tipo text, p_cambios jsonb)
+returns void
+language plpgsql as $$
+declare
+    v_tabla text := _tabla_hija(p_tipo);
+    v_cambio jsonb;
+begin
+    if v_tabla is null then
+        raise exception 'tipo_registro inválido: %', p_tipo;
+    end if;
+
+    for v_cambio in
+        select valor from jsonb_array_elements(p_cambios) with ordinality as e(valor, n) order by n
+    loop
+        if v_cambio ? 'maestra' then
+            perform _actualizar_fila('registros_rh', v_cambio -> 'maestra');
+        end if;
+        if v_cambio ? 'hijo' then
+            perform _actualizar_fila(v_tabla, v_cambio -> 'hijo');
+        end if;
+    end loop;
+end
+$$;
@@ -0,0 +1,25 @@
+-- Columna `version` para la concurrencia optimista de las páginas de edición
+-- (utils/funciones_actualizacion.py). Cada actualización la incrementa; quien
+-- guarda con una versión anterior recibe un conflicto en lugar de pisar el cambio.
+
+alter table vacantes add column if not exists version integer not null default 1;
+alter table bajas add column if not exists version integer not null default 1;
+
+create or replace function incrementar_version()
+returns trigger
+language plpgsql as $$
+begin
+    new.version := old.version + 1;
+    return new;
+end
+$$;
+
+drop trigger if exists vacantes_version on vacantes;
+create trigger vacantes_version
+    before update on vacantes
+    for each row execute function incrementar_version();
+
+drop trigger if exists bajas_version on bajas;
+create trigger bajas_version
+    before update on bajas
+    for each row execute function incrementar_version();
@@ -2,8 +2,11 @@ import streamlit as st
 import pandas as pd
 import calendar
 from datetime import date
-from st_supabase_connection import SupabaseConnection
 from utils.auth import require_login
+from utils.monitor_consultas import obtener_conexion
+from utils.cargas_datos import cargar_altas, cargar_vacantes
+from utils.motor_tendencias import SERIES, TODAS, VENTANAS_SEMANAS, cargar_tendencias
+from utils.calendario import calendario
 from config.opciones import AREAS
 from utils.funciones_comparativa import (
     metricas_comparativas,
@@ -15,11 +18,12 @@ from utils.funciones_comparativa import (
     grafica_ejecutivos_periodo,
     grafica_mensual_periodo_comparado,
     grafica_ejecutivos_periodo_comparado,
+    grafica_variacion_anual,
 )
 
 require_login()
 
-conn = st.connection("supabase", type=SupabaseConnection)
+conn = obtener_conexion("comparativa_anual")
 
 st.markdown("""
 <div class="dash-header">
@@ -27,31 +31,14 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-data_altas = (
-    conn.table("altas")
-    .select("id, fecha_alta, contratados_alta, empresa_alta, area_alta, medio_reclutamiento_alta, responsable_alta")
-    .execute()
-)
-df_altas = pd.DataFrame(data_altas.data)
+# Frames compartidos (y en caché) con las demás páginas; ya vienen tipados
+df_altas = cargar_altas(conn)
 
 if df_altas.empty:
     st.info("No hay datos de contrataciones disponibles.")
     st.stop()
 
-df_altas["fecha_alta"]       = pd.to_datetime(df_altas["fecha_alta"])
-df_altas["contratados_alta"] = df_altas["contratados_alta"].astype(int)
-
-data_vacantes = (
-    conn.table("vacantes")
-    .select("id, fecha_solicitud, tipo_solicitud, fase_proceso, vacantes_contratados, funcion_area_vacante")
-    .execute()
-)
-df_vacantes = pd.DataFrame(data_vacantes.data)
-if not df_vacantes.empty:
-    df_vacantes["fecha_solicitud"]      = pd.to_datetime(df_vacantes["fecha_solicitud"])
-    df_vacantes["vacantes_contratados"] = (
-        pd.to_numeric(df_vacantes["vacantes_contratados"], errors="coerce").fillna(0).astype(int)
-    )
+df_vacantes = cargar_vacantes(conn)
 
 area_seleccionada = st.selectbox(
     ":material/filter_alt: Función de área",
@@ -64,7 +51,9 @@ if area_seleccionada != "Todas":
         df_vacantes = df_vacantes[df_vacantes["funcion_area_vacante"] == area_seleccionada]
 
 hoy  = date.today()
-AÑOS = [2024, 2025, 2026]
+# Los tres años más recientes con contrataciones (precalculados por versión de datos)
+AÑOS = calendario(conn)["años_altas"][-3:]
+AÑOS_TEXTO = " y ".join(filter(None, [", ".join(map(str, AÑOS[:-1])), str(AÑOS[-1])]))
 
 
 def _safe_date(año: int, mes: int, dia: int) -> date:
@@ -97,13 +86,13 @@ def _metricas_por_año(año: int, fi, ff):
     st.metric("Reemplazos", f"{total_reemplazo:,}")
 
 
-tab_general, tab_2024, tab_2025, tab_2026, tab_comp = st.tabs(
-    ["General", "2024", "2025", "2026", "Comparativa"]
+tab_general, *tabs_años, tab_comp = st.tabs(
+    ["General", *[str(año) for año in AÑOS], "Comparativa"]
 )
 
 # ── GENERAL ──────────────────────────────────────────────────────────────────
 with tab_general:
-    st.caption("Selecciona el rango de día y mes. El año del calendario se ignora — el período se aplica a 2024, 2025 y 2026.")
+    st.caption(f"Selecciona el rango de día y mes. El año del calendario se ignora — el período se aplica a {AÑOS_TEXTO}.")
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
         ref_ini = st.date_input(
@@ -129,8 +118,7 @@ with tab_general:
     st.divider()
 
     st.write("### Métricas del período")
-    mc1, mc2, mc3 = st.columns(3)
-    for col, (año, fi, ff) in zip([mc1, mc2, mc3], fechas_años):
+    for col, (año, fi, ff) in zip(st.columns(len(fechas_años)), fechas_años):
         with col:
             _metricas_por_año(año, fi, ff)
 
@@ -145,7 +133,7 @@ with tab_general:
     grafica_ejecutivos_periodo_comparado(df_altas, fechas_años, key="gen_ejec")
 
 # ── TABS POR AÑO ─────────────────────────────────────────────────────────────
-for tab, año in zip([tab_2024, tab_2025, tab_2026], AÑOS):
+for tab, año in zip(tabs_años, AÑOS):
     with tab:
         col1, col2, col3 = st.columns([1, 1, 2])
         with col1:
@@ -200,5 +188,23 @@ with tab_comp:
 
     st.divider()
 
+    st.write("### Tendencia interanual")
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        serie_tendencia = st.segmented_control(
+            "Serie", list(SERIES), default="contrataciones", format_func=SERIES.get,
+            key="comp_tendencia_serie",
+        ) or "contrataciones"
+    with col2:
+        semanas_tendencia = st.segmented_control(
+            "Ventana", VENTANAS_SEMANAS, default=52, format_func=lambda s: f"{s} semanas", key="comp_tendencia_ventana",
+        ) or 52
+    grafica_variacion_anual(
+        cargar_tendencias(conn), serie_tendencia, semanas_tendencia,
+        area=TODAS if area_seleccionada == "Todas" else area_seleccionada, key="comp_tendencia",
+    )
+
+    st.divider()
+
     st.write("### Vacantes contratadas: Nuevo vs Reemplazo")
     metricas_nuevo_reemplazo(df_vacantes)
@@ -1,23 +1,35 @@
 import streamlit as st
 import pandas as pd
-from st_supabase_connection import SupabaseConnection
 from datetime import datetime, timedelta
 import calendar
 import pytz
-from utils.funciones_dashboard import calcular_dias_cobertura, promedio_dias_cerradas, obtener_rango_semana, obtener_rango_trimestre, filtrar_datos, filtrar_por_ejecutivo, meses_es, trimestres, MEXICO_TZ
+from utils.funciones_dashboard import promedio_dias_cerradas, obtener_rango_semana, filtrar_datos, rango_periodo, filtrar_por_ejecutivo, meses_es, trimestres, MEXICO_TZ
 from utils.graficas_dashboard import (
     grafica_contrataciones_mes,
     grafica_contrataciones_por_ejecutivo,
     grafica_contrataciones_por_medio_reclutamiento,
     grafica_vacantes_por_empresa,
     grafica_vacantes_por_area,
+    grafica_tendencia_vacantes_semanales,
     grafica_embudo_fase_proceso,
     grafica_contrataciones_por_empresa,
     contrataciones_area_redes_pagadas,
     promedio_plaza_puesto,
+    distribucion_cobertura,
+    grafica_tendencia_movil,
+    panel_rotacion,
     tabla_dinamica_contrataciones,
 )
 from utils.auth import require_login
+from utils.monitor_consultas import obtener_conexion
+from utils.cargas_datos import cargar_altas, cargar_bajas_sistema, version_datos
+from utils.indice_fechas import cargar_indices_fechas
+from utils.distribucion_cobertura import cargar_cobertura
+from utils.motor_tendencias import cargar_tendencias
+from utils.motor_rotacion import cargar_rotacion
+from utils.motor_sla import cargar_vacantes_derivadas, objetivo_sla_area
+from utils.calendario import calendario, indice_semana_actual, rango_trimestre
+from utils.snapshot_vacantes import ultimo_snapshot, cargar_snapshots_detalle
 from utils.logger import get_logger
 from utils.expedientes_dashboard import cargar_datos_expedientes, render_tab_expedientes
 from utils.tabla_interactiva import render_interactive_table
@@ -27,23 +39,14 @@ logger = get_logger(__name__)
 # Requerir autenticación antes de mostrar cualquier contenido
 require_login()
 
-conn = st.connection("supabase", type=SupabaseConnection)
+conn = obtener_conexion("dashboard")
 
 # Filtros
 
 data_actualizacion = (conn.table("registros_rh").select("ultima_actualizacion").order("ultima_actualizacion", desc=True).limit(1).execute())
 
-# Snapshot más reciente para delta dinámico (ordenado por año y semana real, no por fecha de inserción)
-snap_resp = (
-    conn.table("snapshot_vacantes_semanales")
-    .select("n_vacantes, semana_iso, año")
-    .order("año", desc=True)
-    .order("semana_iso", desc=True)
-    .limit(1)
-    .execute()
-)
-
-snap_anterior         = snap_resp.data[0] if snap_resp.data else None
+# Snapshot más reciente para delta dinámico (lo genera utils/snapshot_vacantes.py)
+snap_anterior         = ultimo_snapshot(conn)
 n_vacantes_anterior   = int(snap_anterior["n_vacantes"]) if snap_anterior else None
 semana_anterior_label = f"S{snap_anterior['semana_iso']} {snap_anterior['año']}" if snap_anterior else ""
 ultima_actualizacion = data_actualizacion.data[0]['ultima_actualizacion']
@@ -58,80 +61,24 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 
-# Obtener datos completos
-conteo_vacantes = (conn.table("vacantes")
-.select("""
-        id, id_registro, fecha_solicitud, tipo_solicitud, estatus_solicitud, fase_proceso,
-        fecha_avance, fecha_autorizacion, puesto_vacante, plaza_vacante, empresa_vacante,
-        funcion_area_vacante, vacantes_solicitadas, vacantes_contratados, responsable_vacante,
-        comentarios_vacante, tipo_reclutamiento_vacante, medio_reclutamiento_vacante, fecha_cobertura,
-        id_sistema, confidencial
-        """).execute())
-todos_registros_vacantes = conteo_vacantes.data
-
-data_altas = (conn.table("altas")
-              .select("""
-                      id, id_registro, fecha_alta, empresa_alta, puesto_alta, plaza_alta, area_alta,
-                      contratados_alta, medio_reclutamiento_alta, responsable_alta, confidencial
-                      """).execute())
-todos_registros_altas = data_altas.data
-
-data_bajas = (conn.table("bajas_sistema")
-              .select("*")
-              .gte("fecha_baja", "2024-01-01")
-              .lte("fecha_baja", "2026-12-31")
-              .execute())
-todos_registros_bajas = data_bajas.data
-
 df_catalogo_docs, df_colaboradores, df_archivos = cargar_datos_expedientes(conn)
 
 # Preparar DataFrames
-if todos_registros_vacantes:
-    df_vacantes = pd.DataFrame(todos_registros_vacantes)
-    df_vacantes['fecha_solicitud']      = pd.to_datetime(df_vacantes['fecha_solicitud'])
-    df_vacantes['fecha_cobertura']      = pd.to_datetime(df_vacantes['fecha_cobertura'])
-    df_vacantes['fecha_autorizacion']   = pd.to_datetime(df_vacantes['fecha_autorizacion'])
-    df_vacantes['vacantes_contratados'] = pd.to_numeric(df_vacantes['vacantes_contratados'], errors='coerce').fillna(0).astype(int)
-    df_vacantes_cerradas = df_vacantes
-else:
-    df_vacantes = pd.DataFrame()
-    df_vacantes_cerradas = pd.DataFrame()
-
-if todos_registros_altas:
-    df_altas = pd.DataFrame(todos_registros_altas)
-    df_altas['fecha_alta'] = pd.to_datetime(df_altas['fecha_alta'])
-else:
-    df_altas = pd.DataFrame()
-
-if todos_registros_bajas:
-    df_bajas = pd.DataFrame(todos_registros_bajas)
-    df_bajas['fecha_baja'] = pd.to_datetime(df_bajas['fecha_baja'])
-else:
-    df_bajas = pd.DataFrame()
-    
-# Obtener años disponibles
-años_disponibles = []
-if not df_vacantes.empty:
-    años_vacantes = df_vacantes['fecha_solicitud'].dt.year.dropna().unique().tolist()
-    años_disponibles.extend(años_vacantes)
-if not df_vacantes_cerradas.empty:
-    años_vacantes_cerradas = df_vacantes_cerradas['fecha_cobertura'].dt.year.dropna().unique().tolist()
-    años_disponibles.extend(años_vacantes_cerradas)
-if not df_altas.empty:
-    años_altas = df_altas['fecha_alta'].dt.year.dropna().unique().tolist()
-    años_disponibles.extend(años_altas)
-if not df_bajas.empty:
-    años_bajas = df_bajas['fecha_baja'].dt.year.dropna().unique().tolist()
-    años_disponibles.extend(años_bajas)
-
-# Filtrar valores NaN y convertir a enteros
-años_disponibles = [int(año) for año in set(años_disponibles) if pd.notna(año)]
-años_disponibles = sorted(años_disponibles, reverse=True)
-
-if not años_disponibles:
-    años_disponibles = [datetime.now(MEXICO_TZ).year]
-
-ejecutivos_disponibles = ["Todos", "DIEGO", "HELEN", "LETY", "YULIANA"]
+# Frames compartidos (y en caché) con las demás páginas; los índices de fecha
+# deben ser de la misma versión que los frames. Las vacantes traen ya la columna
+# `dias` (días de cobertura al día de hoy)
+version = version_datos()
+df_vacantes = cargar_vacantes_derivadas(conn, version)
+df_vacantes_cerradas = df_vacantes
+
+df_altas = cargar_altas(conn, version)
+df_bajas = cargar_bajas_sistema(conn, version)
+indices = cargar_indices_fechas(conn, version)
+
+# Años, semanas, trimestres y ejecutivos precalculados por versión de datos
+cal = calendario(conn)
+años_disponibles = cal["años"]
+ejecutivos_disponibles = ["Todos"] + cal["ejecutivos"]
 
 # Interfaz de filtros
 col_f1, col_f2, col_f3, col_f4, col_f5 = st.columns([2, 2, 2, 2, 2])
@@ -163,44 +110,24 @@ if tipo_filtro in ["Por año", "Por trimestre", "Por mes", "Por semana"]:
 
 if tipo_filtro == "Por trimestre" and año_seleccionado:
     with col_f3:
-        trimestres_opciones = [trimestres[t]['nombre'] for t in [1, 2, 3, 4]]
-        trimestre_nombre = st.selectbox("Trimestre", trimestres_opciones, index=0)
-        # Extraer el número del trimestre (T1, T2, T3, T4)
-        trimestre_seleccionado = int(trimestre_nombre[1])
+        trimestre_seleccionado = st.selectbox("Trimestre", list(trimestres), index=0,
+                                              format_func=lambda t: trimestres[t]['nombre'])
     with col_f4:
         if trimestre_seleccionado:
-            inicio, fin = obtener_rango_trimestre(año_seleccionado, trimestre_seleccionado)
+            inicio, fin = rango_trimestre(cal, año_seleccionado, trimestre_seleccionado)
             st.info(f":material/calendar_today: {inicio.strftime('%d/%m/%Y')} - {fin.strftime('%d/%m/%Y')}")
 
 if tipo_filtro == "Por mes" and año_seleccionado:
     with col_f3:
-        meses_opciones = list(meses_es.values())
-        mes_nombre = st.selectbox("Mes", meses_opciones, index=datetime.now(MEXICO_TZ).month - 1)
-        mes_seleccionado = list(meses_es.keys())[list(meses_es.values()).index(mes_nombre)]
+        mes_seleccionado = st.selectbox("Mes", list(meses_es), index=datetime.now(MEXICO_TZ).month - 1,
+                                        format_func=meses_es.get)
 
 if tipo_filtro == "Por semana" and año_seleccionado:
     with col_f3:
-        # Calcular número máximo de semanas ISO para el año seleccionado (28 dic siempre cae en la última semana ISO)
-        try:
-            max_semana = int(datetime(int(año_seleccionado), 12, 28).isocalendar()[1])
-        except Exception:
-            max_semana = 52
-        
-        # Asegurar que max_semana sea un entero válido
-        if not isinstance(max_semana, int) or max_semana < 1:
-            max_semana = 52
-            
-        semanas_opciones = [i for i in range(1, max_semana + 1)]
-        
-        # Definir índice por defecto: si el año seleccionado es el actual, usar la semana actual; si no, 0
-        default_idx = 0
-        if int(año_seleccionado) == datetime.now(MEXICO_TZ).year:
-            try:
-                current_week = int(datetime.now(MEXICO_TZ).isocalendar()[1])
-                default_idx = min(current_week - 1, len(semanas_opciones) - 1)
-            except Exception:
-                default_idx = 0
-        semana_seleccionada = st.selectbox("Semana", semanas_opciones, index=default_idx)
+        semanas_opciones = cal["semanas"][año_seleccionado]
+        # Si el año seleccionado es el actual, la semana actual; si no, la primera
+        semana_seleccionada = st.selectbox("Semana", semanas_opciones,
+                                           index=indice_semana_actual(año_seleccionado, semanas_opciones))
     with col_f4:
         if semana_seleccionada:
             inicio, fin = obtener_rango_semana(año_seleccionado, semana_seleccionada)
@@ -226,11 +153,13 @@ if tipo_filtro == "Por rango de fechas":
 st.markdown("---")
 
 # Aplicar filtros
-df_vacantes_filtrado = filtrar_datos(df_vacantes, 'fecha_solicitud', tipo_filtro, año_seleccionado, mes_seleccionado, semana_seleccionada, trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-df_vacantes_cerradas_filtrado = filtrar_datos(df_vacantes_cerradas, 'fecha_cobertura', tipo_filtro, año_seleccionado, mes_seleccionado, semana_seleccionada, trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-df_altas_filtrado = filtrar_datos(df_altas, 'fecha_alta', tipo_filtro, año_seleccionado, mes_seleccionado, semana_seleccionada, trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-df_bajas_filtrado = filtrar_datos(df_bajas, 'fecha_baja', tipo_filtro, año_seleccionado, mes_seleccionado, semana_seleccionada, trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
-df_requisiciones_filtrado = filtrar_datos(df_vacantes, 'fecha_autorizacion', tipo_filtro, año_seleccionado, mes_seleccionado, semana_seleccionada, trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+filtro = dict(tipo_filtro=tipo_filtro, año=año_seleccionado, mes=mes_seleccionado, semana=semana_seleccionada,
+              trimestre=trimestre_seleccionado, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+df_vacantes_filtrado = filtrar_datos(df_vacantes, 'fecha_solicitud', indice=indices.get(("vacantes", "fecha_solicitud")), **filtro)
+df_vacantes_cerradas_filtrado = filtrar_datos(df_vacantes_cerradas, 'fecha_cobertura', indice=indices.get(("vacantes", "fecha_cobertura")), **filtro)
+df_altas_filtrado = filtrar_datos(df_altas, 'fecha_alta', indice=indices.get(("altas", "fecha_alta")), **filtro)
+df_bajas_filtrado = filtrar_datos(df_bajas, 'fecha_baja', indice=indices.get(("bajas_sistema", "fecha_baja")), **filtro)
+df_requisiciones_filtrado = filtrar_datos(df_vacantes, 'fecha_autorizacion', indice=indices.get(("vacantes", "fecha_autorizacion")), **filtro)
 
 if ejecutivo_seleccionado != "Todos":
     df_altas_filtrado             = filtrar_por_ejecutivo(df_altas_filtrado,             'responsable_alta',      ejecutivo_seleccionado)
@@ -244,13 +173,13 @@ vacantes_excluir = (
 ) if not df_vacantes.empty else pd.Series(dtype=bool)
 
 st.write("### :material/search_insights: Métricas principales")
-tab1, tab6, tab2, tab3, tab4, tab5 = st.tabs([":material/search_insights: Métricas Principales", ":material/files: Expedientes", ":material/analytics: Análisis Visual", ":material/info: Información de Vacantes", ":material/article_person: Redes Pagadas", ":material/analytics: Promedio de Plaza y Puesto"])
+tab1, tab6, tab2, tab3, tab4, tab5, tab7 = st.tabs([":material/search_insights: Métricas Principales", ":material/files: Expedientes", ":material/analytics: Análisis Visual", ":material/info: Información de Vacantes", ":material/article_person: Redes Pagadas", ":material/analytics: Promedio de Plaza y Puesto", ":material/group_remove: Rotación"])
 with tab1:
     col1, col2, col3 = st.columns([2, 2, 2])
 
     # No. CONTRATADOS
     if not df_altas_filtrado.empty:
-        n_contratados = df_altas_filtrado['contratados_alta'].astype(int).sum()
+        n_contratados = df_altas_filtrado['contratados_alta'].sum()
     else:
         n_contratados = 0
         with col1:st.info(f'No hay altas registradas en el período seleccionado.')
@@ -258,7 +187,7 @@ with tab1:
 
     try:
         if not df_bajas_filtrado.empty:
-            df_bajas = df_bajas_filtrado[df_bajas_filtrado['id'] > 0].copy()
+            df_bajas = df_bajas_filtrado[df_bajas_filtrado['id'] > 0]
             n_bajas = len(df_bajas)
         else:
             n_bajas = 0
@@ -270,7 +199,7 @@ with tab1:
 
     # No. VACANTES
     if not df_vacantes.empty:
-        n_vacantes = df_vacantes[df_vacantes['fecha_autorizacion'].notna() & ~vacantes_excluir]['vacantes_solicitadas'].astype(int).sum()
+        n_vacantes = df_vacantes[df_vacantes['fecha_autorizacion'].notna() & ~vacantes_excluir]['vacantes_solicitadas'].sum()
     else:
         n_vacantes = 0
         st.error(f'Error al calcular vacantes. No se encontraron datos.')
@@ -282,7 +211,7 @@ with tab1:
     col3.metric(label='Vacantes disponibles a la fecha', value=n_vacantes, delta=delta_str, delta_color="inverse")
 
     # Requisiciones vs Contrataciones
-    total_requisiciones = df_requisiciones_filtrado['vacantes_solicitadas'].astype(int).sum() + df_requisiciones_filtrado['vacantes_contratados'].astype(int).sum()
+    total_requisiciones = df_requisiciones_filtrado['vacantes_solicitadas'].sum() + df_requisiciones_filtrado['vacantes_contratados'].sum()
     total_no_requisitadas = (df_requisiciones_filtrado['fase_proceso'] == "SIN SOLICITUD DE REQUISICION").sum()
     if not df_requisiciones_filtrado.empty:
         with col1:
@@ -323,8 +252,7 @@ with tab1:
                 ]
                 
                 if not df_cobertura.empty:
-                    df_cobertura['dias_calculados'] = df_cobertura.apply(calcular_dias_cobertura, axis=1)
-                    promedio_cobertura = df_cobertura['dias_calculados'].dropna().mean()
+                    promedio_cobertura = df_cobertura['dias'].mean()
                     col4.metric(
                         label='Promedio en vacantes disponibles', 
                         value=f"{round(promedio_cobertura)}" if pd.notna(promedio_cobertura) else "0",
@@ -351,11 +279,10 @@ with tab1:
                     (df_vacantes['estatus_solicitud'] != 'CANCELADO') &
                     (df_vacantes['fecha_autorizacion'].notna()) &
                     (df_vacantes['fecha_autorizacion'] != pd.Timestamp('1900-01-01'))
-                ].copy()
+                ]
 
                 if not df_administrativas.empty:
-                    df_administrativas['dias_calculados'] = df_administrativas.apply(calcular_dias_cobertura, axis=1)
-                    promedio_cobertura = df_administrativas['dias_calculados'].dropna().mean()
+                    promedio_cobertura = df_administrativas['dias'].mean()
                     col5.metric(
                         label='Promedio en Administrativas',
                         value=f"{round(promedio_cobertura)}" if pd.notna(promedio_cobertura) else "0",
@@ -383,11 +310,10 @@ with tab1:
                     (df_vacantes['estatus_solicitud'] != 'CANCELADO') &
                     (df_vacantes['fecha_autorizacion'].notna()) &
                     (df_vacantes['fecha_autorizacion'] != pd.Timestamp('1900-01-01'))
-                ].copy()
+                ]
 
                 if not df_operativas.empty:
-                    df_operativas['dias_calculados'] = df_operativas.apply(calcular_dias_cobertura, axis=1)
-                    promedio_cobertura = df_operativas['dias_calculados'].dropna().mean()
+                    promedio_cobertura = df_operativas['dias'].mean()
                     col6.metric(
                         label='Promedio en Operativas',
                         value=f"{round(promedio_cobertura)}" if pd.notna(promedio_cobertura) else "0",
@@ -426,7 +352,7 @@ with tab1:
     try:
         promedio_cobertura = promedio_dias_cerradas(df_vacantes_cerradas_filtrado, 'ADMINISTRATIVA')
         if promedio_cobertura is not None and promedio_cobertura > 0:
-            valor = 45 / promedio_cobertura * 100
+            valor = objetivo_sla_area("ADMINISTRATIVA") / promedio_cobertura * 100
             ponderacion = f'{valor:.2f}%'
             delta_color = "inverse" if valor < 100 else "normal"
         else:
@@ -448,7 +374,7 @@ with tab1:
     try:
         promedio_cobertura = promedio_dias_cerradas(df_vacantes_cerradas_filtrado, 'OPERATIVA')
         if promedio_cobertura is not None and promedio_cobertura > 0:
-            valor = 15 / promedio_cobertura * 100
+            valor = objetivo_sla_area("OPERATIVA") / promedio_cobertura * 100
             ponderacion = f'{valor:.2f}%'
             delta_color = "inverse" if valor < 100 else "normal"
         else:
@@ -471,9 +397,10 @@ with tab1:
     st.write("### :material/docs: Detalle de las contrataciones")
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df['fecha_alta'] = df['fecha_alta'].dt.date
-            df = df.rename(columns={
+            df = df_altas_filtrado.assign(
+                fecha_alta=df_altas_filtrado['fecha_alta'].dt.date,
+                puesto_alta=df_altas_filtrado['puesto_alta'].mask(df_altas_filtrado['confidencial'] == 'SI', 'VACANTE'),
+            ).rename(columns={
                 'empresa_alta': 'Empresa',
                 "puesto_alta": "Puesto",
                 "plaza_alta": "Plaza",
@@ -484,7 +411,6 @@ with tab1:
                 'contratados_alta': 'Contratados',
                 'confidencial': 'Confidencial',
             })
-            df.loc[df['Confidencial'] == 'SI', 'Puesto'] = 'VACANTE'
             _cols_hide = ["id", "id_registro", "Confidencial"]
             df_show = df.drop(columns=[c for c in _cols_hide if c in df.columns])
             render_interactive_table(df_show, height=480)
@@ -512,6 +438,10 @@ with tab2:
     st.write("#### Contrataciones por Mes")
     grafica_contrataciones_mes(df_altas_filtrado)
 
+    st.write("#### Tendencia Móvil de Contrataciones y Bajas")
+    st.caption("Últimas 104 semanas, sin los filtros de periodo ni de ejecutivo.")
+    grafica_tendencia_movil(cargar_tendencias(conn, version), key="tendencia_dashboard")
+
     st.divider()
     st.write('### Contrataciones por Empresa')
     grafica_contrataciones_por_empresa(df_altas_filtrado)
@@ -532,6 +462,15 @@ with tab3:
     grafica_embudo_fase_proceso(df_vacantes_activas)
     st.divider()
 
+    st.write("### Tendencia Semanal de Vacantes Disponibles")
+    dimension_tendencia = st.segmented_control(
+        "Agrupar por", options=["area", "empresa", "ejecutivo"],
+        format_func=lambda d: {"area": "Área", "empresa": "Empresa", "ejecutivo": "Ejecutivo"}[d],
+        default="area", key="dimension_tendencia_vacantes",
+    )
+    grafica_tendencia_vacantes_semanales(cargar_snapshots_detalle(conn), dimension_tendencia or "area")
+    st.divider()
+
 with tab4:
     st.write("### Contrataciones por Redes Pagadas")
     contrataciones_area_redes_pagadas(df_altas_filtrado)
@@ -540,6 +479,32 @@ with tab5:
     st.write('### Detalle de Promedio de Días de Cobertura por Plaza y Puesto')
     promedio_plaza_puesto(df_vacantes_cerradas_filtrado)
 
+    st.divider()
+    st.write('### Distribución de Días de Cobertura')
+    # Percentiles en lugar de promedios: los registros viejos o con fecha centinela no los mueven
+    tipo_distribucion = st.segmented_control(
+        "Vacantes", ["Cerradas", "Abiertas"], default="Cerradas", key="distribucion_tipo"
+    )
+    df_cobertura = cargar_cobertura(conn, version)
+    if tipo_distribucion == "Abiertas":
+        df_cobertura = df_cobertura.loc[df_vacantes.index[~vacantes_excluir]] if not df_vacantes.empty else df_cobertura
+        df_cobertura = df_cobertura[df_cobertura['es_activa']]
+    else:
+        df_cobertura = df_cobertura.loc[df_vacantes_cerradas_filtrado.index]
+        df_cobertura = df_cobertura[df_cobertura['es_sla']]
+    distribucion_cobertura(df_cobertura, key="distribucion_dashboard")
+
 
 with tab6:
     render_tab_expedientes(df_catalogo_docs, df_colaboradores, df_archivos)
+
+with tab7:
+    st.write("### :material/group_remove: Rotación de personal")
+    # Tablas mensuales precalculadas por versión de datos; solo se toman los meses
+    # que toca el periodo seleccionado (aunque en alguno no haya bajas)
+    periodo = rango_periodo(**filtro)
+    meses_periodo = [f.strftime("%Y-%m") for f in periodo] if periodo else [None, None]
+    panel_rotacion(
+        cargar_rotacion(conn, version), df_bajas_filtrado.index, key="rotacion_dashboard",
+        desde=meses_periodo[0], hasta=meses_periodo[1],
+    )
@@ -1,56 +1,41 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from st_supabase_connection import SupabaseConnection
 from streamlit_echarts import st_echarts
 from utils.vars_efiencia import variables_actividades, variables_eficiencia
-from utils.funciones_dashboard import calcular_dias_cobertura, filtrar_datos, MEXICO_TZ
+from utils.motor_capacidad import (
+    escenario_base, horas_mensuales, capacidad_mensual, demanda_mensual_historica,
+    simular_escenarios, simular_montecarlo,
+)
+from utils.funciones_dashboard import filtrar_datos, MEXICO_TZ
 from utils.auth import require_login
+from utils.monitor_consultas import obtener_conexion
+from utils.calendario import calendario
+from utils.cargas_datos import version_datos
+from utils.motor_sla import cargar_sla_vacantes, cargar_vacantes_derivadas, objetivo_sla_area, resumen_sla, DIMENSIONES_SLA, EJECUTIVOS_SLA
 from utils.tabla_interactiva import render_interactive_table
+from utils.distribucion_cobertura import cargar_cobertura
+from utils.graficas_dashboard import distribucion_cobertura
 
 require_login()
 
-conn = st.connection("supabase", type=SupabaseConnection)
-
-# Vacantes activas (eficiencia teórica)
-vacantes_activas_resp = (
-    conn.table("vacantes")
-    .select("id, vacantes_solicitadas, fecha_autorizacion, estatus_solicitud, fase_proceso")
-    .neq("fase_proceso", "CONTRATADO")
-    .not_.in_("estatus_solicitud", ["FINALIZADO", "PAUSADO", "CANCELADO", "RECHAZADA"])
-    .not_.is_("fecha_autorizacion", None)
-    .execute()
-)
-vacantes_df = pd.DataFrame(vacantes_activas_resp.data)
-
-# Todos los registros de vacantes (igual que el dashboard, sin filtros en Supabase)
-todas_vacantes_resp = (
-    conn.table("vacantes")
-    .select("""
-        id, fecha_solicitud, fecha_autorizacion, fecha_cobertura,
-        funcion_area_vacante, responsable_vacante, empresa_vacante, puesto_vacante,
-        vacantes_solicitadas, vacantes_contratados, estatus_solicitud, fase_proceso
-    """)
-    .execute()
-)
-df_todas = pd.DataFrame(todas_vacantes_resp.data)
+conn = obtener_conexion("eficiencia_teorica")
 
-if not df_todas.empty:
-    df_todas["fecha_autorizacion"] = pd.to_datetime(df_todas["fecha_autorizacion"])
-    df_todas["fecha_cobertura"]    = pd.to_datetime(df_todas["fecha_cobertura"])
-    df_todas["fecha_solicitud"]    = pd.to_datetime(df_todas["fecha_solicitud"])
-    df_todas["vacantes_contratados"] = pd.to_numeric(df_todas["vacantes_contratados"], errors="coerce").fillna(0).astype(int)
-    df_todas["vacantes_solicitadas"] = pd.to_numeric(df_todas["vacantes_solicitadas"], errors="coerce").fillna(0).astype(int)
+# Un solo frame de vacantes compartido con el dashboard; el subconjunto activo,
+# el conjunto SLA y los días de cobertura (anclados a hoy) vienen de la caché.
+# Todos los frames de la página se leen de la misma versión de datos
+version = version_datos()
+df_todas = cargar_vacantes_derivadas(conn, version)
 
-# Replicar exactamente el criterio del dashboard: vacantes_contratados > 0
-df_sla_raw = df_todas[df_todas["vacantes_contratados"] > 0].copy() if not df_todas.empty else pd.DataFrame()
+# Vacantes activas (eficiencia teórica)
+vacantes_df = df_todas[df_todas["es_activa"]] if not df_todas.empty else df_todas
 
-if not df_sla_raw.empty:
-    df_sla_raw["dias"] = df_sla_raw.apply(calcular_dias_cobertura, axis=1)
-    df_sla_raw = df_sla_raw[df_sla_raw["dias"].notna() & (df_sla_raw["dias"] >= 0)]
+# Replicar exactamente el criterio del dashboard: vacantes_contratados > 0.
+# El motor de SLA ya trae dias, sla_objetivo, cumple_sla, ejecutivo y mes
+df_sla_raw = cargar_sla_vacantes(conn, version)
 
-SLA_OPERATIVA      = 15
-SLA_ADMINISTRATIVA = 45
+SLA_OPERATIVA      = objetivo_sla_area("OPERATIVA")
+SLA_ADMINISTRATIVA = objetivo_sla_area("ADMINISTRATIVA")
 
 _TEAL   = "#14b8a6"
 _INDIGO = "#6366f1"
@@ -58,13 +43,7 @@ _AMBER  = "#f59e0b"
 _TEXT   = "rgba(255,255,255,0.65)"
 _GRID   = "rgba(255,255,255,0.06)"
 
-_EJECUTIVOS = ["DIEGO", "YULIANA", "LETICIA", "ELENA"]
-
-def _match_ejecutivo(nombre):
-    for palabra in str(nombre).upper().split():
-        if palabra in _EJECUTIVOS:
-            return palabra
-    return None
+_EJECUTIVOS = EJECUTIVOS_SLA
 
 
 st.markdown("""
@@ -74,11 +53,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Filtros para el tab SLA
-años_sla = sorted(
-    df_todas["fecha_cobertura"].dt.year.dropna().unique().astype(int).tolist(),
-    reverse=True
-) if not df_todas.empty else [datetime.now(MEXICO_TZ).year]
+# Filtros para el tab SLA (años precalculados por versión de datos)
+años_sla = calendario(conn)["años_cobertura"]
 
 from utils.funciones_dashboard import meses_es
 
@@ -98,9 +74,8 @@ if tipo_filtro_sla in ["Por año", "Por mes"]:
 
 if tipo_filtro_sla == "Por mes" and año_sla:
     with col_f3:
-        mes_nombre = st.selectbox("Mes", list(meses_es.values()), key="mes_sla",
-                                  index=datetime.now(MEXICO_TZ).month - 1)
-        mes_sla = list(meses_es.keys())[list(meses_es.values()).index(mes_nombre)]
+        mes_sla = st.selectbox("Mes", list(meses_es), key="mes_sla", format_func=meses_es.get,
+                               index=datetime.now(MEXICO_TZ).month - 1)
 
 if tipo_filtro_sla == "Por rango de fechas":
     with col_f2:
@@ -144,8 +119,9 @@ with tab_eficiencia:
 
     st.divider()
 
-    horas_trabajador  = personas_atraccion * horas_diarias * dias_laborales_mes
-    capacidad_teorica = horas_trabajador / tiempo_total
+    escenario_actual  = escenario_base()
+    horas_trabajador  = horas_mensuales(escenario_actual)
+    capacidad_teorica = capacidad_mensual(escenario_actual)
     eficiencia_teorica = (vacantes_activas / capacidad_teorica) * 100
 
     c1, c2, c3 = st.columns(3)
@@ -171,24 +147,96 @@ with tab_eficiencia:
     }).set_index("Resultado")
     st.table(indicador)
 
+    # ── Simulación de capacidad ──
+    st.divider()
+    st.subheader("Simulación de capacidad")
+    st.caption(
+        "Proyección del backlog de vacantes activas con la demanda promedio de los últimos 12 meses. "
+        "Las bandas muestran los percentiles 10–90 de una simulación Monte Carlo."
+    )
+
+    demanda_hist = demanda_mensual_historica(df_todas)
+
+    s1, s2, s3, s4 = st.columns(4)
+    sim_personas = s1.number_input("Reclutadores", min_value=1, max_value=20, value=int(personas_atraccion), step=1)
+    sim_horas_vacante = s2.number_input(
+        "Horas por vacante", min_value=1.0, max_value=100.0, value=float(tiempo_total), step=0.5
+    )
+    sim_meses = s3.slider("Meses a proyectar", min_value=3, max_value=12, value=6)
+    sim_variacion = s4.slider("Variación de tiempos (%)", min_value=0, max_value=50, value=15, step=5)
+
+    escenario_sim = {
+        **escenario_actual,
+        "personas_atraccion": sim_personas,
+        "horas_por_vacante": sim_horas_vacante,
+    }
+
+    df_escenarios = simular_escenarios(
+        vacantes_activas, demanda_hist, [escenario_actual, escenario_sim], meses=sim_meses
+    )
+    final_actual = df_escenarios[df_escenarios["escenario"] == 0].iloc[-1]
+    final_sim = df_escenarios[df_escenarios["escenario"] == 1].iloc[-1]
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Demanda promedio mensual", f"{demanda_hist.mean():.1f}")
+    m2.metric(
+        "Capacidad del escenario", f"{final_sim['capacidad']:.2f}",
+        delta=f"{final_sim['capacidad'] - final_actual['capacidad']:+.2f} vs actual",
+    )
+    m3.metric(
+        f"Backlog al mes {sim_meses}", f"{final_sim['backlog']:.0f}",
+        delta=f"{final_sim['backlog'] - final_actual['backlog']:+.0f} vs actual", delta_color="inverse",
+    )
+
+    df_mc = simular_montecarlo(
+        vacantes_activas, demanda_hist, escenario_sim,
+        meses=sim_meses, variacion_tiempo=sim_variacion / 100, semilla=0,
+    )
+    etiquetas_mes = [f"Mes {m}" for m in df_mc.index]
+
+    def _opciones_banda(prefijo, titulo, sufijo=""):
+        inferior = df_mc[f"{prefijo}_p10"].round(1).tolist()
+        ancho = (df_mc[f"{prefijo}_p90"] - df_mc[f"{prefijo}_p10"]).round(1).tolist()
+        return {
+            "title": {"text": titulo, "left": "center", "textStyle": {"fontSize": 14}},
+            "tooltip": {"trigger": "axis"},
+            "legend": {"data": ["P50"], "bottom": 0},
+            "xAxis": {"type": "category", "data": etiquetas_mes},
+            "yAxis": {"type": "value", "axisLabel": {"formatter": "{value}" + sufijo}},
+            "series": [
+                {"name": "P10", "type": "line", "data": inferior, "stack": "banda",
+                 "lineStyle": {"opacity": 0}, "symbol": "none"},
+                {"name": "P10–P90", "type": "line", "data": ancho, "stack": "banda",
+                 "lineStyle": {"opacity": 0}, "areaStyle": {"color": _INDIGO, "opacity": 0.2},
+                 "symbol": "none"},
+                {"name": "P50", "type": "line", "data": df_mc[f"{prefijo}_p50"].round(1).tolist(),
+                 "itemStyle": {"color": _INDIGO}},
+            ],
+        }
+
+    g1, g2 = st.columns(2)
+    with g1:
+        st_echarts(_opciones_banda("backlog", "Backlog proyectado (vacantes)"), height="360px")
+    with g2:
+        st_echarts(_opciones_banda("eficiencia", "Eficiencia proyectada", "%"), height="360px")
+
 # Tab SLA
 with tab_sla:
     if df_sla.empty:
         st.info("No hay datos de vacantes contratadas para calcular el SLA.")
         st.stop()
 
-    df_op  = df_sla[df_sla["funcion_area_vacante"] == "OPERATIVA"]
-    df_adm = df_sla[df_sla["funcion_area_vacante"] == "ADMINISTRATIVA"]
+    resumen_area = resumen_sla(df_sla, "funcion_area_vacante")
 
-    def _stats(df, meta):
-        if df.empty:
+    def _stats(area):
+        if area not in resumen_area.index:
             return 0, 0.0, 0.0
-        total  = len(df)
-        dentro = int((df["dias"] <= meta).sum())
-        return total, dentro / total * 100, df["dias"].mean()
+        fila = resumen_area.loc[area]
+        pct = fila["pct_cumplimiento"] if pd.notna(fila["pct_cumplimiento"]) else 0.0
+        return int(fila["total"]), pct, fila["dias_promedio"]
 
-    total_op,  pct_op,  avg_op  = _stats(df_op,  SLA_OPERATIVA)
-    total_adm, pct_adm, avg_adm = _stats(df_adm, SLA_ADMINISTRATIVA)
+    total_op,  pct_op,  avg_op  = _stats("OPERATIVA")
+    total_adm, pct_adm, avg_adm = _stats("ADMINISTRATIVA")
 
     # Métricas
     c1, c2, c3, c4 = st.columns(4)
@@ -202,11 +250,10 @@ with tab_sla:
     # SLA por ejecutivo
     st.write("### Días promedio de cobertura por ejecutivo")
 
-    df_sla["ejecutivo"] = df_sla["responsable_vacante"].fillna("").apply(_match_ejecutivo)
     df_ejec = df_sla[df_sla["ejecutivo"].isin(_EJECUTIVOS)]
 
     if not df_ejec.empty:
-        resumen = df_ejec.groupby(["ejecutivo", "funcion_area_vacante"])["dias"].mean()
+        resumen = resumen_sla(df_ejec, ["ejecutivo", "funcion_area_vacante"])["dias_promedio"]
 
         def _val(ejec, area):
             try:
@@ -270,8 +317,7 @@ with tab_sla:
     # Tendencia mensual
     st.write("### Tendencia mensual de días de cobertura")
 
-    df_sla["mes"] = df_sla["fecha_cobertura"].dt.to_period("M").astype(str)
-    tendencia = df_sla.groupby(["mes", "funcion_area_vacante"])["dias"].mean()
+    tendencia = resumen_sla(df_sla, ["mes", "funcion_area_vacante"])["dias_promedio"]
     meses = sorted(df_sla["mes"].unique().tolist())
 
     def _trend(area):
@@ -334,3 +380,30 @@ with tab_sla:
         ],
     }
     st_echarts(options_trend, height="380px", key="sla_tendencia")
+
+    st.divider()
+
+    # Cumplimiento por dimensión
+    st.write("### Cumplimiento de SLA por dimensión")
+
+    dimension = st.segmented_control(
+        "Agrupar por", list(DIMENSIONES_SLA.keys()), default="Ejecutivo", key="sla_dimension"
+    )
+    if dimension:
+        df_dim = resumen_sla(df_sla, DIMENSIONES_SLA[dimension]).reset_index()
+        df_dim = df_dim.rename(columns={
+            DIMENSIONES_SLA[dimension]: dimension,
+            "total": "Vacantes",
+            "cumplen": "En meta",
+            "pct_cumplimiento": "% Cumplimiento",
+            "dias_promedio": "Días promedio",
+            "dias_p50": "Días p50",
+            "dias_p90": "Días p90",
+        }).round(1)
+        render_interactive_table(df_dim, height=420)
+
+    st.divider()
+
+    # Distribución de días: percentiles, histograma y registros atípicos
+    st.write("### Distribución de días de cobertura")
+    distribucion_cobertura(cargar_cobertura(conn, version).loc[df_sla.index], key="distribucion_sla")
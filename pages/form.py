@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-from st_supabase_connection import SupabaseConnection
 from datetime import datetime
 from utils.funciones_registro import registrar_alta, registrar_baja, registrar_vacante
 from utils.funciones_actualizacion import actualizar_vacante, actualizar_baja
@@ -10,12 +9,13 @@ from config.opciones import (
 )
 
 from utils.auth import require_login
+from utils.monitor_consultas import obtener_conexion
 
 # Requerir autenticación antes de mostrar cualquier contenido
 require_login()
 
 # Initialize Supabase connection
-conn = st.connection("supabase", type=SupabaseConnection)
+conn = obtener_conexion("form")
 
 st.markdown("""
 <div class="dash-header">
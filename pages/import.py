@@ -1,26 +1,34 @@
 import streamlit as st
 from datetime import datetime, date
-from st_supabase_connection import SupabaseConnection
 import pandas as pd
 import pytz
 import traceback
 
 from utils.auth import require_login
+from utils.monitor_consultas import obtener_conexion
+from utils.cargas_datos import invalidar_datos
 from utils.logger import get_logger
+from utils.normalizacion import normalizar_serie
+from utils.catalogo_puestos import canonizar_puestos
+from utils.lector_excel import filas_totales, leer_en_bloques, vista_previa
+from utils.importacion_vacantes import (
+    MAX_INTENTOS,
+    analizar_lotes,
+    borrar_checkpoint,
+    cargar_checkpoint,
+    clave_archivo,
+    dividir_en_lotes,
+    guardar_checkpoint,
+    importar_en_paralelo,
+    limpiar_fechas,
+)
 
 logger = get_logger(__name__)
-from config.db_utils import (
-    insertar_maestra, 
-    insertar_vacante, 
-    buscar_vacante_por_id_sistema, 
-    actualizar_vacante_sistema, 
-    actualizar_maestra
-)
 
 require_login()
 
 # --- Configuración base ---
-conn = st.connection("supabase", type=SupabaseConnection)
+conn = obtener_conexion("import")
 MEXICO_TZ = pytz.timezone("America/Mexico_City")
 
 st.markdown("""
@@ -56,26 +64,47 @@ column_map_vacantes = {
     "fecha_cobertura": "Fecha Del Seguimiento Del Proceso"
 }
 
-# --- Utilidad de fecha ---
-def convertir_fecha(valor):
-    """Convierte un valor a datetime de forma segura, retornando None si falla."""
-    if pd.isna(valor):
-        return None
-    if isinstance(valor, datetime):
-        return valor
-    if isinstance(valor, str):
-        try:
-            return pd.to_datetime(valor)
-        except:
-            return None
-    return None
+# --- Preparación de un bloque del archivo ---
+def preparar_bloque(df, formatos):
+    """Renombra, convierte fechas y normaliza un bloque de filas del exporte.
+
+    Devuelve el bloque y las fechas descartadas (ver `limpiar_fechas`).
+    """
+    df_vacantes = df.rename(columns={v: k for k, v in column_map_vacantes.items()})
+
+    # Fechas por columna; las inválidas y las autorizaciones anteriores a 2000 quedan en NaT
+    df_vacantes, rechazos = limpiar_fechas(df_vacantes, formatos)
+
+    # Mayúsculas y sin espacios sobrantes para toda la columna de una vez
+    for col in ["tipo_solicitud", "estatus_solicitud", "fase_proceso"]:
+        if col in df_vacantes.columns:
+            df_vacantes[col] = normalizar_serie(df_vacantes[col], quitar_acentos=False)
+
+    # Puestos con el nombre del catálogo (se resuelve una vez por puesto distinto)
+    if "puesto_vacante" in df_vacantes.columns:
+        df_vacantes["puesto_vacante"] = canonizar_puestos(df_vacantes["puesto_vacante"])
+
+    df_vacantes["fecha_importacion"] = datetime.now(MEXICO_TZ)
+    return df_vacantes, rechazos
+
+
+def lotes_del_archivo(archivo, fechas_descartadas):
+    """Lotes numerados del archivo, leídos y preparados bloque por bloque."""
+    siguiente = 0
+    formatos = {}    # formato de fecha por columna, solo para este archivo
+    for bloque in leer_en_bloques(archivo, list(column_map_vacantes.values())):
+        df_vacantes, rechazos = preparar_bloque(bloque, formatos)
+        fechas_descartadas.extend(rechazos)
+        lotes, siguiente = dividir_en_lotes(df_vacantes, siguiente)
+        yield from lotes
 
 # --- Verificar archivo ---
 if subir_archivo and archivo is not None:
     try:
-        df = pd.read_excel(archivo)
-        df.columns = df.columns.astype(str).str.strip()
-        st.session_state["archivo_df"] = df
+        # Solo se guarda una vista previa y el resumen de cambios; el archivo se vuelve a leer por bloques al confirmar
+        st.session_state["archivo_preview"] = vista_previa(archivo)
+        with st.spinner("Comparando con la base de datos..."):
+            st.session_state["archivo_resumen"] = analizar_lotes(conn, lotes_del_archivo(archivo, []))
         st.session_state["archivo_ok"] = True
         st.success("Archivo cargado correctamente. Revisa la vista previa y confirma.")
     except Exception as e:
@@ -88,35 +117,38 @@ elif subir_archivo and archivo is None:
 
 # --- Vista previa ---
 if st.session_state.get("archivo_ok", False):
-    df_preview = st.session_state["archivo_df"]
+    df_preview = st.session_state["archivo_preview"]
     st.write("### Vista previa del archivo cargado")
-    st.dataframe(df_preview.head(10))
-    st.write("Confirma que el archivo es correcto antes de subirlo a la base de datos.")
+    st.dataframe(df_preview)
+
+    resumen = st.session_state["archivo_resumen"]
+    st.write("### Cambios que se aplicarán")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(":material/edit: Nuevos", resumen["nuevos"])
+    with col2:
+        st.metric(":material/update: Con cambios", resumen["cambiados"])
+    with col3:
+        st.metric(":material/check: Sin cambios", resumen["sin_cambios"])
+    with col4:
+        st.metric(":material/warning: Inválidos", resumen["invalidos"])
+    if resumen["ejemplos_cambios"]:
+        with st.expander("Ver registros con cambios"):
+            st.dataframe(pd.DataFrame(resumen["ejemplos_cambios"]), hide_index=True)
+    if resumen["ejemplos_invalidos"]:
+        with st.expander("Ver registros inválidos"):
+            st.dataframe(pd.DataFrame(resumen["ejemplos_invalidos"]), hide_index=True)
+    st.write("Confirma que el archivo es correcto antes de subirlo a la base de datos. Los registros sin cambios no se vuelven a escribir.")
 
     if st.button(":material/check: Confirmar", type="primary", key="confirmar_subida"):
+        if archivo is None:
+            st.error("Debes seleccionar un archivo.")
+            st.stop()
         try:
-            df = df_preview.copy()
-            df_vacantes = df[[v for v in column_map_vacantes.values() if v in df.columns]].copy()
-            df_vacantes = df_vacantes.rename(columns={v: k for k, v in column_map_vacantes.items()})
-
-            # Convertir fechas de forma segura
-            for col in ["fecha_solicitud", "fecha_avance", "fecha_autorizacion", "fecha_cobertura"]:
-                if col in df_vacantes.columns:
-                    df_vacantes[col] = df_vacantes[col].apply(convertir_fecha)
-                    # Reemplazar explícitamente NaT por None
-                    df_vacantes[col] = df_vacantes[col].apply(lambda x: None if pd.isna(x) else x)
-            
-            # Validar fecha de autorización: debe ser del año 2000 en adelante
-            if "fecha_autorizacion" in df_vacantes.columns:
-                df_vacantes["fecha_autorizacion"] = df_vacantes["fecha_autorizacion"].apply(
-                    lambda x: x if x is not None and x.year >= 2000 else None
-                )
-
-            df_vacantes["fecha_importacion"] = datetime.now(MEXICO_TZ)
-
             registros_exitosos = 0
             registros_actualizados = 0
             registros_nuevos = 0
+            registros_sin_cambios = 0
             registros_fallidos = 0
             errores = []
 
@@ -124,117 +156,80 @@ if st.session_state.get("archivo_ok", False):
             status_text = st.empty()
             logs_box = st.empty()
 
-            total_rows = len(df_vacantes)
+            total_rows = filas_totales(archivo)
+            procesadas = 0
+            fechas_descartadas = []
             logs = []
 
-            for idx, row in df_vacantes.iterrows():
-                try:
-                    id_sistema_actual = int(row.get("id_sistema")) if pd.notna(row.get("id_sistema")) else None
-                    
-                    logs.append(f"🔄 Fila {idx + 1}: procesando {row.get('puesto_vacante', '')} (ID: {id_sistema_actual})")
-                    
-                    maestra_data = {
-                        "puesto": str(row.get("puesto_vacante", "")).strip(),
-                        "empresa": str(row.get("empresa_vacante", "")).strip(),
-                        "plaza": str(row.get("plaza_vacante", "")).strip(),
-                        "area": str(row.get("funcion_area_vacante", "")).strip(),
-                    }
-
-                    def safe_str(valor):
-                        if pd.isna(valor):
-                            return None
-                        return str(valor).strip() if str(valor).strip() else None
-                    
-                    # Determinar fecha de cobertura según la fase del proceso
-                    fase_proceso = str(row.get("fase_proceso", "")).strip().upper()
-                    fecha_cobertura_final = None
-                    
-                    if fase_proceso == "CONTRATADO":
-                        # Si la fase es "CONTRATADO", usar la Fecha Del Seguimiento Del Proceso
-                        fecha_cobertura_final = row.get("fecha_cobertura")
-                    # De lo contrario, fecha_cobertura queda como None
-                    
-                    vacante_data = {
-                        "fecha_solicitud": row.get("fecha_solicitud"),
-                        "tipo_solicitud": str(row.get("tipo_solicitud", "")).strip().upper() or None,
-                        "estatus_solicitud": str(row.get("estatus_solicitud", "")).strip().upper() or None,
-                        "fase_proceso": fase_proceso or None,
-                        "fecha_avance": row.get("fecha_avance"),
-                        "fecha_autorizacion": row.get("fecha_autorizacion"),
-                        "puesto_vacante": maestra_data["puesto"],
-                        "plaza_vacante": maestra_data["plaza"],
-                        "empresa_vacante": maestra_data["empresa"],
-                        "funcion_area_vacante": maestra_data["area"],
-                        "vacantes_solicitadas": max(
-                            int(row.get("vacantes_solicitadas", 0)) - int(row.get("vacantes_contratados", 0))
-                            if (
-                                pd.notna(row.get("vacantes_solicitadas"))
-                                and pd.notna(row.get("vacantes_contratados"))
-                                and int(row.get("vacantes_contratados", 0)) > 0
-                            )
-                            else int(row.get("vacantes_solicitadas", 0)) if pd.notna(row.get("vacantes_solicitadas")) else 0,
-                            0
-                        ),
-                        "vacantes_contratadas": int(row.get("vacantes_contratados", 0))
-                        if pd.notna(row.get("vacantes_contratados"))
-                        else 0,
-                        "reponsable_vacante": safe_str(row.get("responsable_vacante")) or "SIN ESPECIFICAR",
-                        "comentarios_vacante": safe_str(row.get("comentarios_vacante")),
-                        "tipo_reclutamiento_vacante": safe_str(row.get("tipo_reclutamiento_vacante")) or "SIN ESPECIFICAR",
-                        "medio_reclutamiento_vacante": safe_str(row.get("medio_reclutamiento_vacante")) or "SIN ESPECIFICAR",
-                        "fecha_cobertura": fecha_cobertura_final,
-                        "id_sistema": id_sistema_actual
-                    }
-
-                    # Buscar si ya existe el registro
-                    vacante_existente = None
-                    if id_sistema_actual:
-                        vacante_existente = buscar_vacante_por_id_sistema(conn, id_sistema_actual)
-                    
-                    if vacante_existente:
-                        id_maestra = vacante_existente["id_registro"]
-                        id_vacante = vacante_existente["id"]
-                        
-                        actualizar_maestra(conn, id_maestra, maestra_data)
-                        actualizar_vacante_sistema(conn, vacante_data, id_maestra, id_vacante)
-                        
-                        logs.append(f"🔄 Registro actualizado (ID Sistema: {id_sistema_actual})")
-                        registros_actualizados += 1
-                        registros_exitosos += 1
-                    else:
-                        id_maestra = insertar_maestra(conn, "Vacante", maestra_data)
-                        if id_maestra is None:
-                            raise Exception("No se generó ID de maestra")
-                        
-                        insertar_vacante(conn, vacante_data, id_maestra)
-                        logs.append(f":material/check: Registro nuevo insertado (ID Sistema: {id_sistema_actual})")
-                        registros_nuevos += 1
-                        registros_exitosos += 1
-
-                except Exception as e:
-                    registros_fallidos += 1
-                    error_msg = f":material/warning: Error en fila {idx + 1}: {e}"
+            # Lotes ya aplicados en un intento anterior con este mismo archivo
+            clave = clave_archivo(archivo)
+            completos = cargar_checkpoint(clave)
+            lotes_fallidos = 0
+            if completos:
+                st.info(f":material/restart_alt: Se reanuda una importación previa: {len(completos)} lotes ya aplicados se omiten.")
+
+            for lote in importar_en_paralelo(conn, lotes_del_archivo(archivo, fechas_descartadas), completos):
+                if lote["error"] is not None:
+                    # Sin checkpoint: el lote completo se vuelve a enviar al reanudar
+                    lotes_fallidos += 1
+                    registros_fallidos += lote["filas"]
+                    error_msg = f":material/warning: Lote {lote['numero'] + 1} sin aplicar tras {MAX_INTENTOS} intentos: {lote['error']}"
                     logs.append(error_msg)
                     errores.append(error_msg)
-
-                progress = (idx + 1) / total_rows
-                progress_bar.progress(progress)
-                status_text.text(f"Procesando {idx + 1}/{total_rows}")
-                logs_box.write("\n".join(logs[-5:]))
+                elif lote["omitido"]:
+                    logs.append(f":material/skip_next: Lote {lote['numero'] + 1} ya aplicado en un intento anterior")
+                else:
+                    for idx, row, resultado, error in lote["resultados"]:
+                        id_sistema_actual = int(row["id_sistema"]) if pd.notna(row.get("id_sistema")) else None
+                        if error is not None:
+                            registros_fallidos += 1
+                            error_msg = f":material/warning: Error en fila {idx + 1}: {error}"
+                            logs.append(error_msg)
+                            errores.append(error_msg)
+                        elif resultado == "sin_cambios":
+                            registros_sin_cambios += 1
+                            registros_exitosos += 1
+                        elif resultado == "actualizado":
+                            logs.append(f"🔄 Registro actualizado (ID Sistema: {id_sistema_actual})")
+                            registros_actualizados += 1
+                            registros_exitosos += 1
+                        else:
+                            logs.append(f":material/check: Registro nuevo insertado (ID Sistema: {id_sistema_actual})")
+                            registros_nuevos += 1
+                            registros_exitosos += 1
+                    completos.add(lote["numero"])
+                    guardar_checkpoint(clave, completos)
+
+                procesadas += lote["filas"]
+                if total_rows:
+                    progress_bar.progress(min(procesadas / total_rows, 1.0))
+                    status_text.text(f"Procesando {procesadas}/{total_rows}")
+                else:
+                    status_text.text(f"Procesando {procesadas}")
+                logs = logs[-5:]
+                logs_box.write("\n".join(logs))
+
+            if lotes_fallidos == 0:
+                borrar_checkpoint(clave)
 
             progress_bar.empty()
             status_text.empty()
+            invalidar_datos("vacantes")
 
             st.success(f":material/check: Importación completada: {registros_exitosos} registros procesados.")
             
-            col1, col2, col3 = st.columns(3)
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric(":material/edit: Nuevos", registros_nuevos)
             with col2:
                 st.metric(":material/update: Actualizados", registros_actualizados)
             with col3:
+                st.metric(":material/check: Sin cambios", registros_sin_cambios)
+            with col4:
                 st.metric(":material/warning: Fallidos", registros_fallidos)
             
+            if lotes_fallidos > 0:
+                st.warning(f":material/restart_alt: {lotes_fallidos} lotes no se aplicaron por errores de conexión. Vuelve a confirmar para reanudar desde el último lote aplicado.")
             if registros_fallidos > 0:
                 st.warning(f":material/warning: {registros_fallidos} registros fallaron.")
                 with st.expander("Ver errores"):
@@ -243,6 +238,11 @@ if st.session_state.get("archivo_ok", False):
                     if len(errores) > 10:
                         st.info(f"... y {len(errores) - 10} más.")
 
+            if fechas_descartadas:
+                st.warning(f":material/event_busy: {len(fechas_descartadas)} fechas se descartaron y se guardaron vacías.")
+                with st.expander("Ver fechas descartadas"):
+                    st.dataframe(pd.DataFrame(fechas_descartadas), hide_index=True)
+
         except Exception as e:
             logger.error("Error general en la importación: %s", e, exc_info=True)
             st.error("Ocurrió un error inesperado. Por favor recarga la página.")
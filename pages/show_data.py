@@ -1,18 +1,15 @@
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
 import pandas as pd
-import datetime as dt
-import pytz
 from utils.auth import require_login
+from utils.cargas_datos import cargar_bajas_sistema, cargar_vacantes
+from utils.funciones_dashboard import hoy_mexico
+from utils.monitor_consultas import obtener_conexion
 from utils.tabla_interactiva import render_interactive_table
 
 # Requerir autenticación antes de mostrar cualquier contenido
 require_login()
 
-# Zona horaria de México
-MEXICO_TZ = pytz.timezone('America/Mexico_City')
-
-conn = st.connection("supabase", type=SupabaseConnection)
+conn = obtener_conexion("show_data")
 
 st.markdown("""
 <div class="dash-header">
@@ -50,18 +47,9 @@ if consulta == "Altas":
 # CONSULTAR UNA BAJA
 # ======================
 elif consulta == "Bajas":
-    response = conn.table("bajas_sistema").select(
-        "id, no_colaborador, nombre, apellido_paterno, apellido_materno, "
-        "empresa, puesto, plaza, funcion_area, departamento, "
-        "fecha_ingreso, fecha_baja, motivo_baja, tipo_nomina, gerente, jefe"
-    ).gte("fecha_baja", "2024-01-01").execute()
+    # nombre_completo ya viene armado y normalizado desde la carga compartida
+    df_bajas = cargar_bajas_sistema(conn)
     st.write("## Datos encontrados en Bajas")
-    df_bajas = pd.DataFrame(response.data)
-    df_bajas["nombre_completo"] = (
-        df_bajas["nombre"].fillna("") + " " +
-        df_bajas["apellido_paterno"].fillna("") + " " +
-        df_bajas["apellido_materno"].fillna("")
-    ).str.strip()
     df_bajas = df_bajas.rename(columns={
         "id": "ID",
         "no_colaborador": "No. Colaborador",
@@ -89,46 +77,17 @@ elif consulta == "Bajas":
 # CONSULTAR VACANTES
 # ======================
 elif consulta == "Vacantes":
-    response =conn.table("vacantes").select("*").execute()
+    # Fechas ya en datetime y texto libre en Arrow desde la carga compartida
+    df_vacantes = cargar_vacantes(conn)
     st.write("## Datos encontrados en Vacantes")
-    df_vacantes = pd.DataFrame(response.data)
-    
-    # Convertir fechas a datetime con zona horaria de México
-    df_vacantes['fecha_solicitud'] = pd.to_datetime(df_vacantes['fecha_solicitud'], errors='coerce')
-    df_vacantes['fecha_autorizacion'] = pd.to_datetime(df_vacantes['fecha_autorizacion'], errors='coerce')
-    df_vacantes['fecha_cobertura'] = pd.to_datetime(df_vacantes['fecha_cobertura'], errors='coerce')
-    
+
     # Calcular días de cobertura
     # Si existe fecha_autorización: fecha_cobertura - fecha_autorización
     # Si no existe fecha_autorización: fecha_cobertura - fecha_solicitud
-    # Si no hay fecha_cobertura, usar fecha_hoy (México)
-    def calcular_dias_cobertura(row):
-        # Obtener fecha actual en zona horaria de México
-        fecha_hoy = dt.datetime.now(MEXICO_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Determinar la fecha de referencia final (cobertura o hoy)
-        if pd.notna(row['fecha_cobertura']):
-            fecha_final = row['fecha_cobertura']
-            if fecha_final.tzinfo is None:
-                fecha_final = MEXICO_TZ.localize(fecha_final)
-        else:
-            fecha_final = fecha_hoy
-        
-        # Determinar la fecha de inicio (autorización o solicitud)
-        if pd.notna(row['fecha_autorizacion']):
-            fecha_inicio = row['fecha_autorizacion']
-            if fecha_inicio.tzinfo is None:
-                fecha_inicio = MEXICO_TZ.localize(fecha_inicio)
-            return (fecha_final - fecha_inicio).days
-        elif pd.notna(row['fecha_solicitud']):
-            fecha_inicio = row['fecha_solicitud']
-            if fecha_inicio.tzinfo is None:
-                fecha_inicio = MEXICO_TZ.localize(fecha_inicio)
-            return (fecha_final - fecha_inicio).days
-        else:
-            return None
-    
-    df_vacantes['dias_cobertura'] = df_vacantes.apply(calcular_dias_cobertura, axis=1)
+    # Si no hay fecha_cobertura, se cuenta hasta hoy (México), una sola fecha para toda la tabla
+    fecha_inicio = df_vacantes['fecha_autorizacion'].fillna(df_vacantes['fecha_solicitud'])
+    fecha_final = df_vacantes['fecha_cobertura'].fillna(hoy_mexico())
+    df_vacantes['dias_cobertura'] = (fecha_final - fecha_inicio).dt.days
     
     columns_name = {
         "id": "ID de Origen",
@@ -0,0 +1,27 @@
+from datetime import date
+
+from utils.cambios_registro import campos_modificados
+
+
+def test_fecha_guardada_como_fecha_hora_no_cuenta_como_cambio():
+    original = {"fecha_baja": "2024-03-01T00:00:00", "fecha_ingreso": "2023-01-15T00:00:00+00:00"}
+    editado = {"fecha_baja": "2024-03-01", "fecha_ingreso": date(2023, 1, 15)}
+    assert campos_modificados(original, editado) == {}
+
+
+def test_fecha_distinta_si_cuenta_como_cambio():
+    original = {"fecha_baja": "2024-03-01T00:00:00"}
+    editado = {"fecha_baja": "2024-03-02"}
+    assert campos_modificados(original, editado) == {"fecha_baja": "2024-03-02"}
+
+
+def test_texto_que_no_es_fecha_se_compara_completo():
+    original = {"motivo_baja": "RENUNCIA VOLUNTARIA"}
+    editado = {"motivo_baja": "RENUNCIA"}
+    assert campos_modificados(original, editado) == {"motivo_baja": "RENUNCIA"}
+
+
+def test_espacios_y_vacios_no_cuentan_como_cambio():
+    original = {"comentarios_vacante": None, "puesto_vacante": "AUXILIAR", "vacantes_solicitadas": 2}
+    editado = {"comentarios_vacante": "  ", "puesto_vacante": "AUXILIAR ", "vacantes_solicitadas": 2.0}
+    assert campos_modificados(original, editado) == {}
@@ -0,0 +1,96 @@
+"""
+Actualizador de cachés en segundo plano.
+
+Un hilo por proceso de Streamlit vigila la versión de los datos: despierta en
+cuanto una escritura de la app llama a `invalidar_datos()` y, además, cada
+`INTERVALO_SEGUNDOS` compara la firma de `registros_rh` (última actualización y
+número de registros) para detectar cambios hechos fuera de la app. Cuando hay
+cambios recalcula las cargas afectadas para la versión siguiente (las demás
+reutilizan su resultado) y después la publica; mientras tanto las páginas siguen
+leyendo la versión actual. Un cambio detectado solo por la firma recalcula todo.
+Las cargas que dependen del día se calientan también al cambiar la fecha.
+"""
+import threading
+import time
+
+import streamlit as st
+from st_supabase_connection import SupabaseConnection
+
+from utils.cargas_datos import (
+    activar_actualizador,
+    calentar_caches,
+    combinar_cambios,
+    esperar_escritura,
+    publicar_version,
+    tomar_cambios,
+    version_datos,
+)
+from utils.funciones_dashboard import hoy_mexico
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INTERVALO_SEGUNDOS = 60
+
+
+def _firma_datos(conn):
+    """(ultima_actualizacion más reciente, número de registros) de registros_rh."""
+    respuesta = (
+        conn.table("registros_rh")
+        .select("ultima_actualizacion", count="exact")
+        .order("ultima_actualizacion", desc=True)
+        .limit(1)
+        .execute()
+    )
+    ultima = respuesta.data[0]["ultima_actualizacion"] if respuesta.data else None
+    return ultima, respuesta.count
+
+
+def _ciclo(conn):
+    firma_actual = None
+    dia_actual = None
+    pendiente = False
+    cambios = []
+    while True:
+        try:
+            if firma_actual is None:
+                # Arranque: calentar la versión vigente sin cambiarla
+                firma_actual = _firma_datos(conn)
+                dia_actual = hoy_mexico()
+                calentar_caches(conn, version_datos(), hoy=dia_actual)
+                continue
+
+            hubo_escritura = esperar_escritura(INTERVALO_SEGUNDOS)
+            hoy = hoy_mexico()
+            if hoy != dia_actual:
+                # Cambio de día: se calculan las cargas por día de la versión vigente
+                dia_actual = hoy
+                calentar_caches(conn, version_datos(), hoy=dia_actual)
+            firma = _firma_datos(conn)
+            if hubo_escritura:
+                cambios = combinar_cambios(cambios, tomar_cambios())
+            elif firma != firma_actual:
+                # Escritura hecha fuera de la app: no se sabe qué tocó
+                cambios = None
+            if pendiente or hubo_escritura or firma != firma_actual:
+                pendiente = True
+                inicio = time.perf_counter()
+                nueva = version_datos() + 1
+                calentar_caches(conn, nueva, cambios, hoy=dia_actual)
+                publicar_version(nueva)
+                firma_actual, pendiente, cambios = firma, False, []
+                logger.info("Cachés recalculadas (versión %s) en %.2f s", nueva, time.perf_counter() - inicio)
+        except Exception as e:
+            # Se reintenta en el siguiente ciclo; las páginas siguen con la versión anterior
+            logger.error("Error en el actualizador de cachés: %s", e, exc_info=True)
+            time.sleep(INTERVALO_SEGUNDOS)
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_actualizador():
+    """Arranca el hilo una sola vez por proceso; se llama desde app.py en cada rerun."""
+    conn = st.connection("supabase", type=SupabaseConnection)
+    hilo = threading.Thread(target=_ciclo, args=(conn,), name="actualizador_cache", daemon=True)
+    activar_actualizador()
+    hilo.start()
+    return hilo
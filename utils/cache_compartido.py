@@ -0,0 +1,290 @@
+"""
+Caché compartida entre sesiones para DataFrames y artefactos derivados.
+
+Vive una sola vez por proceso: todas las sesiones leen el mismo objeto en lugar
+de volver a consultar y procesar las tablas. Tiene un presupuesto de memoria
+(`CACHE_PRESUPUESTO_MB`, 512 por defecto) y, cuando se excede, descarta las
+entradas usadas hace más tiempo. Si varias sesiones piden a la vez una entrada
+que no existe, solo una la carga y las demás esperan ese resultado.
+
+Uso (misma convención que st.cache_data: los parámetros con "_" no forman la llave):
+
+    @cache_compartido(max_entradas=2)
+    def _cargar_vacantes(_conn, version):
+        ...
+
+Los valores se comparten sin copiar datos: se entregan como copia superficial
+con copy-on-write, así que escribir sobre ellos no afecta a otras sesiones.
+"""
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PRESUPUESTO_BYTES = int(float(os.getenv("CACHE_PRESUPUESTO_MB", "512")) * 1024 * 1024)
+
+_lock = threading.Lock()
+_entradas = OrderedDict()   # clave -> entrada, de la menos a la más recientemente usada
+_en_vuelo = {}              # clave -> carga en curso
+_por_funcion = {}           # nombre -> contadores acumulados (sobreviven a las expulsiones)
+_estado = {"bytes": 0}
+_consultas_en_vuelo = {}    # consulta -> ejecución en curso (ver `coalescer`)
+_coalescencia = {"ejecutadas": 0, "compartidas": 0}
+
+# Las copias superficiales que se entregan comparten memoria con la entrada; con
+# copy-on-write, modificar una copia no altera la de las demás sesiones (por
+# defecto desde pandas 3).
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def _contadores():
+    return {"aciertos": 0, "fallos": 0, "esperas": 0, "expulsiones": 0, "segundos_carga": 0.0}
+
+
+def tamano_bytes(valor):
+    """Memoria aproximada de un valor en caché."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_bytes(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_bytes(v) for v in valor.values())
+    return sys.getsizeof(valor)
+
+
+def _copia(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy(deep=False)
+    if isinstance(valor, tuple):
+        return tuple(_copia(v) for v in valor)
+    return valor
+
+
+def _expulsar(clave):
+    entrada = _entradas.pop(clave)
+    _estado["bytes"] -= entrada["bytes"]
+    _por_funcion[clave[0]]["expulsiones"] += 1
+
+
+def _guardar(clave, valor, segundos, max_entradas):
+    """Guarda la entrada y expulsa por LRU hasta respetar el presupuesto. Requiere _lock."""
+    tamano = tamano_bytes(valor)
+    if tamano > PRESUPUESTO_BYTES:
+        logger.warning("%s (%.1f MB) excede el presupuesto de la caché; no se guarda", clave[0], tamano / 1024 / 1024)
+        return
+
+    anterior = _entradas.pop(clave, None)
+    if anterior is not None:
+        # Reemplazo (p. ej. tras vencer su ttl): su memoria deja de contar
+        _estado["bytes"] -= anterior["bytes"]
+
+    _entradas[clave] = {
+        "valor": valor,
+        "bytes": tamano,
+        "aciertos": 0,
+        "esperas": 0,
+        "segundos_carga": segundos,
+        "creada": time.time(),
+        "ultimo_uso": time.time(),
+    }
+    _estado["bytes"] += tamano
+
+    if max_entradas is not None:
+        propias = [c for c in _entradas if c[0] == clave[0]]
+        for vieja in propias[:-max_entradas]:
+            _expulsar(vieja)
+
+    while _estado["bytes"] > PRESUPUESTO_BYTES and _entradas:
+        _expulsar(next(iter(_entradas)))
+
+
+def _una_sola_carga(en_vuelo, clave, cargar, guardado=None):
+    """Ejecuta `cargar()` una vez aunque varios hilos pidan la misma clave a la vez.
+
+    `guardado()` (opcional, se llama con _lock tomado) devuelve la entrada ya
+    guardada o None: cubre al hilo que llega justo después de que otro terminó
+    la carga, que si no volvería a cargar.
+
+    Returns
+    -------
+    tuple
+        (valor, compartido); compartido es True si se esperó la carga de otro
+        hilo o se encontró ya guardada.
+    """
+    with _lock:
+        entrada = guardado() if guardado is not None else None
+        if entrada is not None:
+            return entrada["valor"], True
+        vuelo = en_vuelo.get(clave)
+        propietario = vuelo is None
+        if propietario:
+            vuelo = {"listo": threading.Event(), "valor": None, "error": None}
+            en_vuelo[clave] = vuelo
+
+    if not propietario:
+        vuelo["listo"].wait()
+        if vuelo["error"] is not None:
+            raise vuelo["error"]
+        return vuelo["valor"], True
+
+    try:
+        vuelo["valor"] = cargar()
+    except Exception as e:
+        vuelo["error"] = e
+        raise
+    finally:
+        with _lock:
+            en_vuelo.pop(clave, None)
+        vuelo["listo"].set()
+    return vuelo["valor"], False
+
+
+def obtener(clave, cargar, max_entradas=None, ttl=None):
+    """Valor de `clave`; si no existe lo calcula con `cargar()` una sola vez aunque lo pidan varios hilos."""
+    def vigente():
+        """Entrada guardada y no vencida de `clave`, o None. Requiere _lock."""
+        entrada = _entradas.get(clave)
+        if entrada is not None and ttl is not None and time.time() - entrada["creada"] > ttl:
+            _expulsar(clave)
+            entrada = None
+        return entrada
+
+    with _lock:
+        contadores = _por_funcion.setdefault(clave[0], _contadores())
+        entrada = vigente()
+        if entrada is not None:
+            _entradas.move_to_end(clave)
+            entrada["aciertos"] += 1
+            entrada["ultimo_uso"] = time.time()
+            contadores["aciertos"] += 1
+            return entrada["valor"]
+
+    def cargar_y_guardar():
+        inicio = time.perf_counter()
+        valor = cargar()
+        segundos = time.perf_counter() - inicio
+        with _lock:
+            contadores["fallos"] += 1
+            contadores["segundos_carga"] += segundos
+            _guardar(clave, valor, segundos, max_entradas)
+        return valor
+
+    valor, compartido = _una_sola_carga(_en_vuelo, clave, cargar_y_guardar, guardado=vigente)
+    if compartido:
+        with _lock:
+            contadores["esperas"] += 1
+            if clave in _entradas:
+                _entradas[clave]["esperas"] += 1
+    return valor
+
+
+def coalescer(clave, cargar):
+    """Comparte una sola ejecución de `cargar()` entre llamadas simultáneas con la misma clave.
+
+    A diferencia de `obtener`, el resultado no se guarda: la siguiente llamada que
+    llegue después de terminar vuelve a ejecutar. Devuelve (valor, compartido).
+    """
+    valor, compartido = _una_sola_carga(_consultas_en_vuelo, clave, cargar)
+    with _lock:
+        _coalescencia["compartidas" if compartido else "ejecutadas"] += 1
+    return valor, compartido
+
+
+def trasladar(clave_origen, clave_destino, max_entradas=None):
+    """Guarda bajo `clave_destino` el mismo valor de `clave_origen`, sin recalcularlo.
+
+    Ambas entradas comparten el objeto, así que su memoria se cuenta una sola vez
+    (en la de destino). Devuelve False si el origen ya no está en caché.
+    """
+    with _lock:
+        entrada = _entradas.get(clave_origen)
+        if entrada is None:
+            return False
+        if clave_destino not in _entradas:
+            _estado["bytes"] -= entrada["bytes"]
+            entrada["bytes"] = 0
+            _guardar(clave_destino, entrada["valor"], 0.0, max_entradas)
+            if clave_destino in _entradas:
+                # El ttl sigue contando desde la carga original
+                _entradas[clave_destino]["creada"] = entrada["creada"]
+        return True
+
+
+def limpiar(nombre=None):
+    """Descarta las entradas de una función (o todas si `nombre` es None)."""
+    with _lock:
+        for clave in [c for c in _entradas if nombre is None or c[0] == nombre]:
+            entrada = _entradas.pop(clave)
+            _estado["bytes"] -= entrada["bytes"]
+
+
+def cache_compartido(funcion=None, *, max_entradas=None, ttl=None):
+    """Decorador que guarda el resultado en la caché compartida del proceso.
+
+    La llave es el nombre de la función y sus argumentos, salvo los que empiezan
+    con "_". `max_entradas` limita las entradas de la función y `ttl` (segundos)
+    las vence. Agrega `.clear()` como st.cache_data para que `invalidar_datos` funcione igual,
+    y `.trasladar(args_origen, args_destino)` (ver `trasladar`).
+    """
+    def decorador(f):
+        nombre = f"{f.__module__}.{f.__qualname__}"
+        firma = inspect.signature(f)
+
+        def llave(*args, **kwargs):
+            ligados = firma.bind(*args, **kwargs)
+            ligados.apply_defaults()
+            return (nombre, tuple((k, v) for k, v in ligados.arguments.items() if not k.startswith("_")))
+
+        @functools.wraps(f)
+        def envoltura(*args, **kwargs):
+            return _copia(obtener(llave(*args, **kwargs), lambda: f(*args, **kwargs), max_entradas, ttl))
+
+        envoltura.clear = lambda: limpiar(nombre)
+        # Reutiliza el resultado de unos argumentos para otros (p. ej. de una versión de datos a la siguiente)
+        envoltura.trasladar = lambda origen, destino: trasladar(llave(*origen), llave(*destino), max_entradas)
+        return envoltura
+
+    return decorador if funcion is None else decorador(funcion)
+
+
+def estadisticas():
+    """(resumen del proceso, DataFrame por entrada, DataFrame por función)."""
+    with _lock:
+        filas = [
+            {
+                "Función": clave[0].rsplit(".", 1)[-1],
+                "Argumentos": ", ".join(f"{k}={v!r}" for k, v in clave[1]),
+                "MB": entrada["bytes"] / 1024 / 1024,
+                "Aciertos": entrada["aciertos"],
+                "Esperas": entrada["esperas"],
+                "Carga (s)": entrada["segundos_carga"],
+                "Último uso": pd.Timestamp(entrada["ultimo_uso"], unit="s"),
+            }
+            for clave, entrada in reversed(_entradas.items())
+        ]
+        por_funcion = pd.DataFrame.from_dict(
+            {nombre.rsplit(".", 1)[-1]: dict(c) for nombre, c in _por_funcion.items()}, orient="index"
+        )
+        resumen = {
+            "entradas": len(_entradas),
+            "bytes": _estado["bytes"],
+            "presupuesto": PRESUPUESTO_BYTES,
+            "en_vuelo": len(_en_vuelo),
+            **_coalescencia,
+        }
+    return resumen, pd.DataFrame(filas), por_funcion
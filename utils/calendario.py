@@ -0,0 +1,100 @@
+"""
+Calendario y dimensiones de los filtros de las páginas.
+
+Los años con datos, las semanas ISO y los rangos de trimestre de cada año y los
+ejecutivos que aparecen en altas y vacantes se calculan una sola vez por versión
+de datos (caché compartida) en lugar de recorrer los frames en cada rerun. Los
+selectores de dashboard, eficiencia_teorica y comparativa_anual leen de aquí.
+"""
+from datetime import date, datetime
+
+from config.opciones import RESPONSABLES_RECLUTAMIENTO, TRIMESTRES
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import cargar_altas, cargar_bajas_sistema, cargar_vacantes, registrar_cache, version_datos
+from utils.funciones_dashboard import MEXICO_TZ, ejecutivos_de, obtener_rango_trimestre
+
+# Ejecutivos del catálogo (primer nombre, con alias resueltos), en orden alfabético
+EJECUTIVOS = sorted({
+    ejecutivo
+    for responsable in RESPONSABLES_RECLUTAMIENTO if responsable not in ("AGENCIA", "SIN ESPECIFICAR")
+    for ejecutivo in ejecutivos_de(responsable.split()[0])
+})
+
+
+def _años(*columnas):
+    """Años presentes en las columnas de fecha, del más reciente al más antiguo."""
+    años = set()
+    for columna in columnas:
+        if columna is not None:
+            años.update(columna.dt.year.dropna().astype(int).unique().tolist())
+    return sorted(años, reverse=True)
+
+
+def _columna(df, nombre):
+    return df[nombre] if not df.empty and nombre in df.columns else None
+
+
+def semanas_iso(año):
+    """Números de semana ISO del año (52 o 53; el 28 de diciembre siempre cae en la última)."""
+    return list(range(1, date(int(año), 12, 28).isocalendar()[1] + 1))
+
+
+@registrar_cache(tablas={
+    "vacantes": frozenset({"fecha_solicitud", "fecha_cobertura", "responsable_vacante"}),
+    "altas": frozenset({"fecha_alta", "responsable_alta"}),
+    "bajas_sistema": None,
+})
+@cache_compartido(max_entradas=2)
+def _calcular_calendario(_conn, version):
+    df_vacantes = cargar_vacantes(_conn, version)
+    df_altas = cargar_altas(_conn, version)
+    df_bajas = cargar_bajas_sistema(_conn, version)
+
+    cobertura = _columna(df_vacantes, "fecha_cobertura")
+    fecha_alta = _columna(df_altas, "fecha_alta")
+    años = _años(_columna(df_vacantes, "fecha_solicitud"), cobertura, fecha_alta, _columna(df_bajas, "fecha_baja"))
+    if not años:
+        años = [datetime.now(MEXICO_TZ).year]
+
+    # Cada responsable distinto se revisa una sola vez
+    responsables = set()
+    for df, columna in ((df_vacantes, "responsable_vacante"), (df_altas, "responsable_alta")):
+        if columna in df.columns:
+            responsables.update(df[columna].dropna().unique().tolist())
+    presentes = set().union(*(ejecutivos_de(r) for r in responsables)) if responsables else set()
+
+    return {
+        "años": años,
+        "años_cobertura": _años(cobertura) or años[:1],
+        "años_altas": sorted(_años(fecha_alta)) or años[:1],
+        "semanas": {año: semanas_iso(año) for año in años},
+        "trimestres": {año: {t: obtener_rango_trimestre(año, t) for t in TRIMESTRES} for año in años},
+        "ejecutivos": [e for e in EJECUTIVOS if e in presentes] or EJECUTIVOS,
+    }
+
+
+def calendario(conn) -> dict:
+    """Opciones de filtro de la versión de datos vigente.
+
+    Returns
+    -------
+    dict
+        años (todas las fechas, descendente), años_cobertura (descendente),
+        años_altas (ascendente), semanas {año: [1..52|53]},
+        trimestres {año: {1..4: (inicio, fin)}} y ejecutivos.
+    """
+    return _calcular_calendario(conn, version_datos())
+
+
+def indice_semana_actual(año, semanas):
+    """Posición de la semana ISO de hoy en `semanas` si `año` es el actual; 0 en otro caso."""
+    hoy = datetime.now(MEXICO_TZ).date()
+    if int(año) != hoy.year:
+        return 0
+    return min(hoy.isocalendar()[1] - 1, len(semanas) - 1)
+
+
+def rango_trimestre(cal, año, trimestre):
+    """(inicio, fin) del trimestre, precalculado si el año tiene datos."""
+    rangos = cal["trimestres"].get(año)
+    return rangos[trimestre] if rangos else obtener_rango_trimestre(año, trimestre)
@@ -0,0 +1,58 @@
+"""
+Seguimiento de cambios para las páginas de edición.
+
+El registro editado se compara contra el original leído de la base y solo se
+envían las columnas que cambiaron, junto con la `version` leída (concurrencia
+optimista, ver config/db_utils.actualizar_lote). Si nada cambió no se escribe
+ni se invalida nada; si cambió algo, solo se recalculan las cargas en caché que
+dependen de esas columnas.
+"""
+import math
+from datetime import date, datetime
+
+from config.db_utils import TABLAS_HIJAS, actualizar_lote
+from utils.cargas_datos import invalidar_datos
+
+
+def _comparable(columna, valor):
+    """Valor en la forma en que la base lo devuelve, para comparar sin falsos cambios."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()[:10]
+    if isinstance(valor, str):
+        valor = valor.strip()
+        if columna.startswith("fecha_"):
+            # La base puede devolver fecha o fecha-hora
+            valor = valor[:10]
+        return valor or None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if hasattr(valor, "item"):
+        # Escalares de numpy
+        return _comparable(columna, valor.item())
+    return valor
+
+
+def campos_modificados(original, editado):
+    """Columnas de `editado` cuyo valor difiere del de `original`, con su valor nuevo."""
+    return {
+        columna: valor
+        for columna, valor in editado.items()
+        if _comparable(columna, valor) != _comparable(columna, original.get(columna))
+    }
+
+
+def guardar_modificados(conn, tipo_registro, original, editado):
+    """Escribe solo lo que cambió del registro hijo `original` (leído con su `version`).
+
+    Devuelve el dict de columnas escritas; vacío si no había cambios (no se
+    escribe nada). Lanza ConflictoVersion si otra persona lo guardó antes.
+    """
+    cambios = campos_modificados(original, editado)
+    if not cambios:
+        return cambios
+
+    actualizar_lote(conn, tipo_registro, [{"id": original["id"], "hijo": {**cambios, "version": original["version"]}}])
+    invalidar_datos(TABLAS_HIJAS[tipo_registro], cambios)
+    return cambios
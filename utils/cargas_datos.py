@@ -0,0 +1,263 @@
+"""
+Carga compartida de tablas de Supabase.
+
+Las páginas obtienen de aquí los DataFrames ya tipados en lugar de consultar
+cada una la misma tabla por su cuenta. Las cargas viven en la caché compartida
+del proceso (utils/cache_compartido.py), así que todas las sesiones reutilizan
+el mismo frame. Cada carga recibe la versión de
+datos vigente (`version_datos`) como parte de su llave: el actualizador en
+segundo plano (utils/actualizador_cache.py) calcula la versión siguiente fuera
+del request y solo entonces la publica, de modo que las páginas siempre leen
+una entrada ya caliente.
+
+Cada carga declara las tablas y columnas de las que depende: al publicar una
+versión, las que no tocó la escritura reutilizan su resultado anterior. Por eso
+las tablas se leen siempre ordenadas por `id`: los cálculos que guardan
+posiciones o índices de fila (utils/indice_fechas.py, utils/motor_sla.py,
+utils/distribucion_cobertura.py) siguen valiendo para el frame recargado, aunque
+un UPDATE de Postgres haya cambiado el orden físico de las filas.
+"""
+import threading
+
+import pandas as pd
+
+from utils.cache_compartido import cache_compartido
+from utils.logger import get_logger
+from utils.normalizacion import TEXTO_ARROW, normalizar_serie, unir_nombres
+
+logger = get_logger(__name__)
+
+# Unión de las columnas que usan dashboard.py y eficiencia_teorica.py
+COLUMNAS_VACANTES = """
+    id, id_registro, fecha_solicitud, tipo_solicitud, estatus_solicitud, fase_proceso,
+    fecha_avance, fecha_autorizacion, puesto_vacante, plaza_vacante, empresa_vacante,
+    funcion_area_vacante, vacantes_solicitadas, vacantes_contratados, responsable_vacante,
+    comentarios_vacante, tipo_reclutamiento_vacante, medio_reclutamiento_vacante, fecha_cobertura,
+    id_sistema, confidencial
+"""
+
+COLUMNAS_ALTAS = """
+    id, id_registro, fecha_alta, empresa_alta, puesto_alta, plaza_alta, area_alta,
+    contratados_alta, medio_reclutamiento_alta, responsable_alta, confidencial
+"""
+
+# Primera fecha de bajas que muestra el dashboard; sin tope para no perder las recientes
+BAJAS_DESDE = "2024-01-01"
+
+_FECHAS_VACANTES = ["fecha_solicitud", "fecha_autorizacion", "fecha_cobertura"]
+_ENTEROS_VACANTES = ["vacantes_solicitadas", "vacantes_contratados"]
+
+# Texto libre: se guarda como cadenas de Arrow (TEXTO_ARROW, un solo búfer contiguo
+# en lugar de un objeto de Python por celda), que además filtra y compara más rápido.
+_TEXTO_VACANTES = ["puesto_vacante", "comentarios_vacante"]
+_TEXTO_ALTAS = ["puesto_alta"]
+_TEXTO_BAJAS = ["puesto", "puesto_baja", "motivo_baja", "nombre", "apellido_paterno", "apellido_materno", "gerente", "jefe"]
+
+# Versión vigente y anterior (la anterior se sigue sirviendo mientras se calcula la nueva)
+_ENTRADAS_POR_CARGA = 2
+
+_estado = {"version": 0, "actualizador_activo": False, "cambios": []}
+_lock = threading.Lock()
+_cambio_datos = threading.Event()
+
+
+def columnas_de(seleccion):
+    """Conjunto de columnas de una proyección como COLUMNAS_VACANTES."""
+    return frozenset(c.strip() for c in seleccion.split(",") if c.strip())
+
+
+# Tablas y columnas de las que depende cada carga; una escritura que no toca
+# ninguna de ellas no obliga a recalcularla (ver `invalidar_datos`).
+DEPENDENCIAS_VACANTES = {"vacantes": columnas_de(COLUMNAS_VACANTES)}
+DEPENDENCIAS_ALTAS = {"altas": columnas_de(COLUMNAS_ALTAS)}
+DEPENDENCIAS_BAJAS_SISTEMA = {"bajas_sistema": None}
+
+
+def a_texto_arrow(df, columnas):
+    """Convierte a TEXTO_ARROW las columnas de `columnas` que existan en `df`."""
+    presentes = [c for c in columnas if c in df.columns]
+    return df.astype({c: TEXTO_ARROW for c in presentes})
+
+
+def version_datos() -> int:
+    """Versión de datos que deben leer las páginas."""
+    return _estado["version"]
+
+
+def publicar_version(version: int):
+    """Cambia de golpe la versión que leen las páginas; sus cargas ya deben estar en caché."""
+    with _lock:
+        _estado["version"] = version
+
+
+@cache_compartido(max_entradas=_ENTRADAS_POR_CARGA)
+def _cargar_vacantes(_conn, version):
+    respuesta = _conn.table("vacantes").select(COLUMNAS_VACANTES).order("id").execute()
+    df = pd.DataFrame(respuesta.data)
+    if df.empty:
+        return df
+
+    for col in _FECHAS_VACANTES:
+        df[col] = pd.to_datetime(df[col])
+    for col in _ENTEROS_VACANTES:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+    return a_texto_arrow(df, _TEXTO_VACANTES)
+
+
+def cargar_vacantes(conn, version=None) -> pd.DataFrame:
+    """Tabla `vacantes` completa con fechas en datetime y conteos enteros."""
+    return _cargar_vacantes(conn, version_datos() if version is None else version)
+
+
+@cache_compartido(max_entradas=_ENTRADAS_POR_CARGA)
+def _cargar_altas(_conn, version):
+    respuesta = _conn.table("altas").select(COLUMNAS_ALTAS).order("id").execute()
+    df = pd.DataFrame(respuesta.data)
+    if df.empty:
+        return df
+    df["fecha_alta"] = pd.to_datetime(df["fecha_alta"])
+    df["contratados_alta"] = pd.to_numeric(df["contratados_alta"], errors="coerce").fillna(0).astype(int)
+    return a_texto_arrow(df, _TEXTO_ALTAS)
+
+
+def cargar_altas(conn, version=None) -> pd.DataFrame:
+    """Tabla `altas` con fecha_alta en datetime y contratados_alta entero."""
+    return _cargar_altas(conn, version_datos() if version is None else version)
+
+
+@cache_compartido(max_entradas=_ENTRADAS_POR_CARGA)
+def _cargar_bajas_sistema(_conn, version):
+    respuesta = (
+        _conn.table("bajas_sistema")
+        .select("*")
+        .gte("fecha_baja", BAJAS_DESDE)
+        .order("id")
+        .execute()
+    )
+    df = pd.DataFrame(respuesta.data)
+    if df.empty:
+        return df
+    df["fecha_baja"] = pd.to_datetime(df["fecha_baja"])
+    df = a_texto_arrow(df, _TEXTO_BAJAS)
+    return df.assign(
+        motivo_baja=normalizar_serie(df["motivo_baja"]),
+        nombre_completo=unir_nombres(df),
+    )
+
+
+def cargar_bajas_sistema(conn, version=None) -> pd.DataFrame:
+    """Tabla `bajas_sistema` desde BAJAS_DESDE con fecha_baja en datetime,
+    texto libre en Arrow y `nombre_completo` ya armado."""
+    return _cargar_bajas_sistema(conn, version_datos() if version is None else version)
+
+
+# Cargas y cálculos en caché con firma (_conn, version); el actualizador los
+# recalcula en este orden, así que los derivados van después de sus fuentes.
+_CACHES = [_cargar_vacantes, _cargar_altas, _cargar_bajas_sistema]
+_DEPENDENCIAS = {
+    _cargar_vacantes: DEPENDENCIAS_VACANTES,
+    _cargar_altas: DEPENDENCIAS_ALTAS,
+    _cargar_bajas_sistema: DEPENDENCIAS_BAJAS_SISTEMA,
+}
+
+
+# Cálculos registrados con firma (_conn, version, hoy): sus días corren hasta `hoy`
+_POR_DIA = set()
+
+
+def registrar_cache(funcion_cacheada=None, *, tablas=None, por_dia=False):
+    """Registra un cálculo en caché `(_conn, version)` para que se recalcule y se invalide con los datos.
+
+    `tablas` ({tabla: columnas o None}) son los datos de los que depende; sin
+    ellas se recalcula con cualquier escritura. Con `por_dia` la firma es
+    `(_conn, version, hoy)` y solo se calienta cuando se indica el día.
+    """
+    def registrar(funcion):
+        _CACHES.append(funcion)
+        _DEPENDENCIAS[funcion] = tablas
+        if por_dia:
+            _POR_DIA.add(funcion)
+        return funcion
+
+    return registrar if funcion_cacheada is None else registrar(funcion_cacheada)
+
+
+def _afectada(funcion, cambios):
+    """True si alguno de `cambios` ((tabla, columnas) escritas) puede alterar el resultado de `funcion`."""
+    tablas = _DEPENDENCIAS.get(funcion)
+    if cambios is None or tablas is None:
+        return True
+    for tabla, columnas in cambios:
+        if tabla in tablas and (columnas is None or tablas[tabla] is None or tablas[tabla] & columnas):
+            return True
+    return False
+
+
+def calentar_caches(conn, version, cambios=None, hoy=None):
+    """Ejecuta todas las cargas registradas para `version` (las que ya existen son aciertos de caché).
+
+    Con `cambios`, las cargas que no dependen de lo escrito reutilizan su
+    resultado de la versión vigente en lugar de volver a consultar. Con `hoy`
+    también se calculan las registradas `por_dia` para esa fecha.
+    """
+    vigente = version_datos()
+    for funcion in _CACHES:
+        if funcion in _POR_DIA:
+            if hoy is None:
+                continue
+            extra = (hoy,)
+        else:
+            extra = ()
+        if (
+            vigente != version and not _afectada(funcion, cambios)
+            and funcion.trasladar((conn, vigente, *extra), (conn, version, *extra))
+        ):
+            continue
+        funcion(conn, version, *extra)
+
+
+def activar_actualizador():
+    """Indica que hay un actualizador en segundo plano atendiendo `invalidar_datos`."""
+    _estado["actualizador_activo"] = True
+
+
+def esperar_escritura(timeout):
+    """Bloquea hasta que `invalidar_datos` avise de una escritura o pase `timeout`; True si hubo aviso."""
+    hubo_escritura = _cambio_datos.wait(timeout=timeout)
+    _cambio_datos.clear()
+    return hubo_escritura
+
+
+def tomar_cambios():
+    """Cambios avisados desde la última llamada: lista de (tabla, columnas), o None si pueden ser cualquiera."""
+    with _lock:
+        cambios, _estado["cambios"] = _estado["cambios"], []
+    return cambios
+
+
+def combinar_cambios(a, b):
+    return None if a is None or b is None else a + b
+
+
+def invalidar_datos(tabla=None, columnas=None):
+    """Avisa que hubo una escritura; se llama después de registrar, actualizar o importar.
+
+    `tabla` y `columnas` acotan lo escrito: solo se recalculan las cargas que
+    dependen de ellos (sin `tabla`, todas; sin `columnas`, todas las de la tabla).
+
+    Con el actualizador en marcha, la versión nueva se calcula en segundo plano y
+    las páginas siguen leyendo la actual hasta que esté lista. Sin él (p. ej. en
+    la CLI de snapshots) se descartan las cachés afectadas y se publica la versión siguiente.
+    """
+    cambios = None if tabla is None else [(tabla, None if columnas is None else frozenset(columnas))]
+    if _estado["actualizador_activo"]:
+        with _lock:
+            _estado["cambios"] = combinar_cambios(_estado["cambios"], cambios)
+        _cambio_datos.set()
+        return
+
+    vigente = version_datos()
+    for funcion in _CACHES:
+        if _afectada(funcion, cambios) or not funcion.trasladar((None, vigente), (None, vigente + 1)):
+            funcion.clear()
+    publicar_version(vigente + 1)
@@ -0,0 +1,107 @@
+"""
+Índice de canonización de puestos contra el catálogo `config.opciones.PUESTOS`.
+
+Los puestos llegan como texto libre (formularios e importaciones de Enla-c) y la
+misma posición aparece con variantes de acentos, espacios o erratas. El índice
+se arma una sola vez por proceso:
+
+- un diccionario con la llave normalizada de cada puesto del catálogo (acierto exacto), y
+- una matriz de trigramas (puestos × trigramas) para resolver las variantes
+  por similitud de Dice con un producto de matrices, en lote para todos los
+  valores distintos de una columna.
+
+Los textos que no se parecen lo suficiente a ningún puesto se conservan
+normalizados, sin inventar una coincidencia.
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from config.opciones import PUESTOS
+from utils.normalizacion import normalizar
+
+# Similitud mínima (Dice sobre trigramas) para aceptar un puesto del catálogo
+UMBRAL_SIMILITUD = 0.8
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9A-ZÑ]+")
+
+
+def _llave(texto):
+    """Texto normalizado sin signos ni espacios repetidos."""
+    texto = normalizar(texto)
+    if not texto:
+        return ""
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def _trigramas(llave):
+    relleno = f"  {llave} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+@functools.lru_cache(maxsize=1)
+def _indice():
+    """(llave -> puesto, puestos, {trigrama: columna}, matriz puestos × trigramas, trigramas por puesto)."""
+    exactos = {}
+    for puesto in PUESTOS:
+        exactos.setdefault(_llave(puesto), puesto.strip())
+    exactos.pop("", None)
+
+    llaves = list(exactos)
+    puestos = [exactos[llave] for llave in llaves]
+    trigramas = [_trigramas(llave) for llave in llaves]
+    columnas = {t: i for i, t in enumerate(sorted(set().union(*trigramas)))}
+
+    matriz = np.zeros((len(llaves), len(columnas)), dtype=np.float32)
+    for fila, conjunto in enumerate(trigramas):
+        matriz[fila, [columnas[t] for t in conjunto]] = 1.0
+    return exactos, puestos, columnas, matriz, matriz.sum(axis=1)
+
+
+def _similares(llaves, umbral):
+    """Puesto del catálogo más parecido a cada llave (None si ninguno supera `umbral`)."""
+    if not llaves:
+        return []
+    _, puestos, columnas, matriz, tamanos = _indice()
+
+    consultas = np.zeros((len(llaves), len(columnas)), dtype=np.float32)
+    tamanos_consulta = np.empty(len(llaves), dtype=np.float32)
+    for fila, llave in enumerate(llaves):
+        conjunto = _trigramas(llave)
+        tamanos_consulta[fila] = len(conjunto)
+        consultas[fila, [columnas[t] for t in conjunto if t in columnas]] = 1.0
+
+    compartidos = consultas @ matriz.T
+    dice = 2 * compartidos / (tamanos_consulta[:, None] + tamanos[None, :])
+    mejor = dice.argmax(axis=1)
+    puntaje = dice[np.arange(len(llaves)), mejor]
+    return [puestos[m] if p >= umbral else None for m, p in zip(mejor, puntaje)]
+
+
+def _resolver(valores, umbral):
+    exactos = _indice()[0]
+    llaves = [_llave(valor) for valor in valores]
+    resultado = [exactos.get(llave) for llave in llaves]
+    pendientes = [i for i, r in enumerate(resultado) if r is None and llaves[i]]
+    for i, puesto in zip(pendientes, _similares([llaves[i] for i in pendientes], umbral)):
+        resultado[i] = puesto
+    return [r if r is not None else normalizar(valor) for r, valor in zip(resultado, valores)]
+
+
+def canonizar_puestos(serie, umbral=UMBRAL_SIMILITUD) -> pd.Series:
+    """Puesto del catálogo para cada valor de `serie`; los que no coinciden quedan normalizados.
+
+    Solo se resuelven los valores distintos, así que miles de filas repetidas
+    cuestan lo mismo que su número de puestos únicos.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    canonicos = np.array(_resolver(list(unicos), umbral) + [np.nan], dtype=object)
+    return pd.Series(canonicos[codigos], index=serie.index, name=serie.name)
+
+
+@functools.lru_cache(maxsize=2048)
+def canonizar_puesto(texto, umbral=UMBRAL_SIMILITUD):
+    """Puesto del catálogo para un solo texto (ver `canonizar_puestos`)."""
+    return _resolver([texto], umbral)[0]
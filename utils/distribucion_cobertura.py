@@ -0,0 +1,151 @@
+"""
+Distribución de los días de cobertura de vacantes.
+
+El promedio se desvía con pocos registros: vacantes abiertas desde hace años o
+capturadas con la fecha centinela 1900-01-01. Aquí se resumen los días con
+percentiles (p50, p75, p90, p95), histogramas por rangos fijos y banderas de
+registros atípicos, agrupados por área, empresa, plaza, puesto o ejecutivo.
+
+Las columnas de agrupación (con el puesto ya canonizado) se calculan una vez por
+versión de datos y los días se anclan a `hoy` (ver utils/motor_sla.py), así que
+cada resumen es un solo groupby sobre el frame en caché.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import DEPENDENCIAS_VACANTES, cargar_vacantes, registrar_cache, version_datos
+from utils.catalogo_puestos import canonizar_puestos
+from utils.funciones_dashboard import _FECHA_CENTINELA, hoy_mexico
+from utils.motor_sla import cargar_vacantes_derivadas, extraer_ejecutivo
+
+# Dimensiones disponibles: etiqueta -> columna de cargar_cobertura
+DIMENSIONES_DISTRIBUCION = {
+    "Área": "area",
+    "Empresa": "empresa",
+    "Plaza": "plaza",
+    "Puesto": "puesto",
+    "Ejecutivo": "ejecutivo",
+}
+
+PERCENTILES = [0.5, 0.75, 0.9, 0.95]
+
+# Rangos del histograma (días); el último queda abierto
+BORDES_HISTOGRAMA = [0, 15, 30, 45, 60, 90, 120, 180, 365, np.inf]
+RANGOS_HISTOGRAMA = [
+    f"{int(a)}-{int(b) - 1}" if np.isfinite(b) else f"{int(a)}+"
+    for a, b in zip(BORDES_HISTOGRAMA[:-1], BORDES_HISTOGRAMA[1:])
+]
+
+# Más de un año de cobertura se considera registro viejo o mal capturado
+DIAS_ANTIGUA = 365
+
+_COLUMNAS_DIMENSIONES = {
+    "area": "funcion_area_vacante",
+    "empresa": "empresa_vacante",
+    "plaza": "plaza_vacante",
+}
+
+
+@registrar_cache(tablas={"vacantes": frozenset({
+    "funcion_area_vacante", "empresa_vacante", "plaza_vacante", "puesto_vacante",
+    "responsable_vacante", "fecha_autorizacion",
+})})
+@cache_compartido(max_entradas=2)
+def _cargar_dimensiones(_conn, version):
+    df = cargar_vacantes(_conn, version)
+    if df.empty:
+        return pd.DataFrame(columns=[*DIMENSIONES_DISTRIBUCION.values(), "centinela"])
+    return pd.DataFrame({
+        **{dimension: df[columna] for dimension, columna in _COLUMNAS_DIMENSIONES.items()},
+        "puesto": canonizar_puestos(df["puesto_vacante"]),
+        "ejecutivo": extraer_ejecutivo(df["responsable_vacante"]),
+        "centinela": df["fecha_autorizacion"] == _FECHA_CENTINELA,
+    }, index=df.index)
+
+
+@registrar_cache(tablas=DEPENDENCIAS_VACANTES, por_dia=True)
+@cache_compartido(max_entradas=2)
+def _cargar_cobertura(_conn, version, hoy):
+    derivadas = cargar_vacantes_derivadas(_conn, version, hoy)
+    dimensiones = _cargar_dimensiones(_conn, version)
+    if derivadas.empty:
+        return dimensiones.assign(dias=pd.Series(dtype=float), es_sla=pd.Series(dtype=bool),
+                                  es_activa=pd.Series(dtype=bool), antigua=pd.Series(dtype=bool),
+                                  atipica=pd.Series(dtype=bool))
+
+    dias = derivadas["dias"]
+    antigua = dias > DIAS_ANTIGUA
+    return dimensiones.assign(
+        dias=dias,
+        es_sla=derivadas["es_sla"],
+        es_activa=derivadas["es_activa"],
+        antigua=antigua,
+        atipica=antigua | dimensiones["centinela"] | (dias < 0),
+    )
+
+
+def cargar_cobertura(conn, version=None, hoy=None) -> pd.DataFrame:
+    """Días de cobertura al día `hoy` con dimensiones y banderas, por vacante.
+
+    Mismo índice que cargar_vacantes(version): se puede tomar el subconjunto de
+    un frame ya filtrado con `.loc[df.index]`. Columnas: area, empresa, plaza,
+    puesto, ejecutivo, dias, es_sla, es_activa y las banderas centinela
+    (autorización 1900-01-01), antigua (más de DIAS_ANTIGUA días) y atipica
+    (cualquiera de las anteriores o días negativos).
+    """
+    version = version_datos() if version is None else version
+    return _cargar_cobertura(conn, version, hoy_mexico() if hoy is None else pd.Timestamp(hoy))
+
+
+def resumen_distribucion(df, por, excluir_atipicas=True):
+    """Percentiles de días de cobertura por `por` (una o varias columnas de cargar_cobertura).
+
+    Returns
+    -------
+    pd.DataFrame
+        Índice `por` y columnas vacantes, atipicas, dias_promedio y dias_p50,
+        dias_p75, dias_p90, dias_p95; ordenado por dias_p50 descendente. Con
+        `excluir_atipicas` los atípicos solo se cuentan, no entran en los días.
+    """
+    columnas = ["vacantes", "atipicas", "dias_promedio"] + [f"dias_p{int(p * 100)}" for p in PERCENTILES]
+    df = df[df["dias"].notna()]
+    if df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    claves = [por] if isinstance(por, str) else list(por)
+    datos = df[claves].assign(
+        dias=df["dias"].mask(df["atipica"]) if excluir_atipicas else df["dias"],
+        atipica=df["atipica"],
+    )
+    grupos = datos.groupby(claves, observed=True)
+    resumen = grupos.agg(
+        vacantes=("atipica", "size"),
+        atipicas=("atipica", "sum"),
+        dias_promedio=("dias", "mean"),
+    )
+    percentiles = grupos["dias"].quantile(PERCENTILES).unstack()
+    for p in PERCENTILES:
+        resumen[f"dias_p{int(p * 100)}"] = percentiles[p]
+    return resumen[columnas].sort_values("dias_p50", ascending=False)
+
+
+def histograma(df, por=None, excluir_atipicas=True):
+    """Número de vacantes por rango de días (RANGOS_HISTOGRAMA), en total o por `por`.
+
+    Returns
+    -------
+    pd.Series | pd.DataFrame
+        Serie indexada por rango sin `por`; con `por`, un renglón por grupo y una columna por rango.
+    """
+    df = df[df["dias"].notna() & (df["dias"] >= 0)]
+    if excluir_atipicas:
+        df = df[~df["atipica"]]
+    rangos = pd.cut(df["dias"], BORDES_HISTOGRAMA, right=False, labels=RANGOS_HISTOGRAMA)
+    if por is None:
+        return rangos.value_counts(sort=False).reindex(RANGOS_HISTOGRAMA, fill_value=0)
+    return (
+        rangos.groupby([df[por], rangos], observed=False).size()
+        .unstack(fill_value=0)
+        .reindex(columns=RANGOS_HISTOGRAMA, fill_value=0)
+    )
@@ -25,6 +25,8 @@ def cargar_datos_expedientes(conn):
         page = (
             conn.table("archivos_expedientes")
             .select("id_colaborador, id_documento, estatus_pdf")
+            .order("id_colaborador")
+            .order("id_documento")
             .range(offset, offset + 999)
             .execute()
         )
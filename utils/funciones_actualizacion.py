@@ -5,41 +5,126 @@ from config.opciones import (
      PLAZAS, EMPRESAS, AREAS, CANALES_RECLUTAMIENTO, RESPONSABLES_RECLUTAMIENTO, 
      ESTATUS_SOLICITUD, FASE_PROCESO, TIPO_RECLUTAMIENTO
 )
-from config.db_utils import insertar_maestra, insertar_alta, insertar_baja, insertar_vacante
+from config.db_utils import ConflictoVersion
+from utils.cambios_registro import guardar_modificados
 from utils.logger import get_logger
+from utils.normalizacion import normalizar
 
 logger = get_logger(__name__)
 
+# Las páginas de edición no cargan la tabla completa: muestran un índice
+# paginado con pocas columnas y leen el registro completo solo al editarlo.
+FILAS_POR_PAGINA = 50
+
+_COLUMNAS_INDICE_VACANTES = "id, id_sistema, fecha_solicitud, puesto_vacante, plaza_vacante, empresa_vacante, fase_proceso"
+_COLUMNAS_VACANTE = """
+    id, id_registro, id_sistema, fecha_solicitud, tipo_solicitud, estatus_solicitud, fase_proceso,
+    fecha_avance, fecha_autorizacion, puesto_vacante, plaza_vacante, empresa_vacante,
+    funcion_area_vacante, vacantes_solicitadas, vacantes_contratados, responsable_vacante,
+    comentarios_vacante, tipo_reclutamiento_vacante, medio_reclutamiento_vacante, fecha_cobertura, version
+"""
+_NOMBRES_VACANTE = {
+    "id": "ID Origen",
+    "id_sistema": "ID",
+    "fecha_solicitud": "Fecha de solicitud",
+    "tipo_solicitud": "Tipo de solicitud",
+    "estatus_solicitud": "Estatus de solicitud",
+    "fase_proceso": "Fase del proceso",
+    "fecha_avance": "Fecha del avance",
+    "fecha_autorizacion": "Fecha de autorización",
+    "puesto_vacante": "Puesto",
+    "plaza_vacante": "Plaza",
+    "empresa_vacante": "Empresa",
+    "funcion_area_vacante": "Función de área",
+    "vacantes_solicitadas": "Vacantes solicitadas",
+    "vacantes_contratados": "Contratados",
+    "responsable_vacante": "Responsable",
+    "comentarios_vacante": "Comentarios",
+    "tipo_reclutamiento_vacante": "Tipo de reclutamiento",
+    "medio_reclutamiento_vacante": "Medio de reclutamiento",
+    "fecha_cobertura": "Fecha de cobertura",
+}
+
+_COLUMNAS_INDICE_BAJAS = "id, fecha_baja, puesto_baja, empresa_baja, plaza_baja, tipo_baja"
+_COLUMNAS_BAJA = """
+    id, id_registro, fecha_ingreso, fecha_baja, empresa_baja, puesto_baja, plaza_baja, area_baja,
+    tipo_baja, motivo_baja, fecha_registro_baja, version
+"""
+_NOMBRES_BAJA = {
+    "id": "ID",
+    "empresa_baja": "Empresa",
+    "puesto_baja": "Puesto",
+    "plaza_baja": "Plaza",
+    "fecha_ingreso": "Fecha de ingreso",
+    "fecha_baja": "Fecha de baja",
+    "tipo_baja": "Tipo de baja",
+    "motivo_baja": "Motivo de la baja",
+    "area_baja": "Área",
+    "fecha_registro_baja": "Fecha de registro de baja",
+}
+
+_MENSAJE_CONFLICTO = (":material/sync_problem: Otra persona modificó este registro mientras lo editabas. "
+                      "Cierra el diálogo y vuelve a abrirlo para ver la versión actual.")
+
+
+def _texto_busqueda(busqueda):
+    # Comas, paréntesis y asteriscos tienen significado en el filtro or de PostgREST
+    return "".join(c for c in busqueda if c not in ",()*").strip()
+
+
+def _reiniciar_pagina(clave):
+    st.session_state[f"pagina_{clave}"] = 1
+
+
+def indice_paginado(conn, clave, tabla, columnas, campos_texto, orden, campo_numero=None):
+    """Buscador y paginador sobre `tabla`; devuelve la página actual con solo `columnas`.
+
+    La búsqueda es por coincidencia parcial en `campos_texto` y, si el texto es
+    un número, exacta en `campo_numero`. Solo viajan FILAS_POR_PAGINA filas.
+    """
+    col_busqueda, col_pagina = st.columns([3, 1])
+    with col_busqueda:
+        busqueda = st.text_input(":material/search: Buscar", key=f"busqueda_{clave}",
+                                 on_change=_reiniciar_pagina, args=(clave,))
+    with col_pagina:
+        pagina = st.number_input("Página", min_value=1, value=1, step=1, key=f"pagina_{clave}")
+
+    consulta = conn.table(tabla).select(columnas, count="exact")
+    texto = _texto_busqueda(busqueda)
+    if texto:
+        filtros = [f"{campo}.ilike.*{texto}*" for campo in campos_texto]
+        if campo_numero and texto.isdigit():
+            filtros.append(f"{campo_numero}.eq.{texto}")
+        consulta = consulta.or_(",".join(filtros))
+    desde = (pagina - 1) * FILAS_POR_PAGINA
+    # "id" desempata el orden para que las páginas no se traslapen ni salten filas
+    if orden != "id":
+        consulta = consulta.order(orden)
+    respuesta = consulta.order("id").range(desde, desde + FILAS_POR_PAGINA - 1).execute()
+
+    total = respuesta.count or 0
+    paginas = max(1, -(-total // FILAS_POR_PAGINA))
+    st.caption(f"{total} registros · página {pagina} de {paginas}")
+    return pd.DataFrame(respuesta.data, columns=[c.strip() for c in columnas.split(",")])
+
+
+def cargar_registro(conn, tabla, columnas, id_registro):
+    """Registro completo de `tabla` con ese id; None si ya no existe."""
+    respuesta = conn.table(tabla).select(columnas).eq("id", id_registro).limit(1).execute()
+    return respuesta.data[0] if respuesta.data else None
+
+
 # ======================
 # ACTUALIZAR UNA VACANTE
 # ======================
 def actualizar_vacante(conn):
     st.write("### Actualización de vacante existente")
     try:
-        response = conn.table("vacantes").select("*").execute()
-        df = pd.DataFrame(response.data)
-        df = df.rename(columns={
-            "id": "ID Origen",
-            "id_sistema": "ID",
-            "fecha_solicitud": "Fecha de solicitud",
-            "tipo_solicitud": "Tipo de solicitud",
-            "estatus_solicitud": "Estatus de solicitud",
-            "fase_proceso": "Fase del proceso",
-            "fecha_avance": "Fecha del avance",
-            "fecha_autorizacion": "Fecha de autorización",
-            "puesto_vacante": "Puesto",
-            "plaza_vacante": "Plaza",
-            "empresa_vacante": "Empresa",
-            "funcion_area_vacante": "Función de área",
-            "vacantes_solicitadas": "Vacantes solicitadas",
-            "vacantes_contratados": "Contratados",
-            "responsable_vacante": "Responsable",
-            "comentarios_vacante": "Comentarios",
-            "tipo_reclutamiento_vacante": "Tipo de reclutamiento",
-            "medio_reclutamiento_vacante": "Medio de reclutamiento",
-            "fecha_cobertura": "Fecha de cobertura",
-        })
-        df = df.sort_values(by="ID", ascending=True)
+        df = indice_paginado(
+            conn, "vacantes", "vacantes", _COLUMNAS_INDICE_VACANTES,
+            campos_texto=["puesto_vacante", "empresa_vacante", "plaza_vacante", "fase_proceso"],
+            orden="id_sistema", campo_numero="id_sistema",
+        ).rename(columns=_NOMBRES_VACANTE)
         
         st.write('### Selecciona una fila para editar')
         st.info(":material/left_click: Haz clic en cualquier fila de la tabla para seleccionarla")
@@ -47,8 +132,7 @@ def actualizar_vacante(conn):
         # Dataframe interactivo con selección
         event = st.dataframe(
             df,
-            column_config={"ID Origen": None, "id_registro": None},
-            column_order=["ID","Fecha de solicitud", "Puesto", "Plaza", "Empresa", "Fecha de autorización", "Fecha de cobertura"],
+            column_order=["ID", "Fecha de solicitud", "Puesto", "Plaza", "Empresa", "Fase del proceso"],
             hide_index=True,
             width="stretch",
             on_select="rerun",
@@ -61,7 +145,8 @@ def actualizar_vacante(conn):
             
             # Definir el diálogo modal
             @st.dialog("Editar Vacante", width="large")
-            def editar_vacante(registro):
+            def editar_vacante(original):
+                registro = pd.Series(original).rename(_NOMBRES_VACANTE)
                 st.write(f"**Editando: {registro['Empresa']} - {registro['Puesto']} - {registro['Plaza']}**")
                 
                 # Sección 1: Información de Solicitud
@@ -144,7 +229,7 @@ def actualizar_vacante(conn):
                                 "fecha_solicitud": fecha_solicitud.strftime('%Y-%m-%d') if fecha_solicitud else None,
                                 "tipo_solicitud": tipo_solicitud,
                                 "estatus_solicitud": estatus_solicitud,
-                                "fase_proceso": fase_proceso.upper().replace("Á", "A").replace("É", "E").replace("Í", "I").replace("Ó", "O").replace("Ú", "U"),
+                                "fase_proceso": normalizar(fase_proceso),
                                 "fecha_avance": fecha_avance.strftime('%Y-%m-%d') if fecha_avance else None,
                                 "fecha_autorizacion": fecha_autorizacion.strftime('%Y-%m-%d') if fecha_autorizacion else None,
                                 "puesto_vacante": puesto.strip(),
@@ -154,14 +239,18 @@ def actualizar_vacante(conn):
                                 "vacantes_solicitadas": vacantes_solicitadas,
                                 "vacantes_contratados": vacantes_contratados,
                                 "responsable_vacante": responsable,
-                                "comentarios_vacante": comentarios.upper().replace("Á", "A").replace("É", "E").replace("Í", "I").replace("Ó", "O").replace("Ú", "U"),
+                                "comentarios_vacante": normalizar(comentarios),
                                 "tipo_reclutamiento_vacante": tipo_reclutamiento,
                                 "medio_reclutamiento_vacante": medio_reclutamiento,
                                 "fecha_cobertura": fecha_cobertura.strftime('%Y-%m-%d') if fecha_cobertura else None,
                             }
-                            conn.table("vacantes").update(payload_vac).eq("id", registro["ID Origen"]).execute()
-                            st.success(":material/check_circle: Vacante actualizada correctamente")
-                            st.rerun()
+                            if guardar_modificados(conn, "Vacante", original, payload_vac):
+                                st.success(":material/check_circle: Vacante actualizada correctamente")
+                                st.rerun()
+                            else:
+                                st.info(":material/info: No hay cambios que guardar")
+                        except ConflictoVersion:
+                            st.warning(_MENSAJE_CONFLICTO)
                         except Exception as e:
                             logger.error("Error al actualizar: %s", e, exc_info=True)
                             st.error("Ocurrió un error inesperado. Por favor recarga la página.")
@@ -174,8 +263,11 @@ def actualizar_vacante(conn):
             st.success(f":material/check_circle: Seleccionaste: {df.iloc[fila_seleccionada]['Empresa']} - {df.iloc[fila_seleccionada]['Puesto']} - {df.iloc[fila_seleccionada]['Plaza']}")
             
             if st.button(":material/edit: Editar registro seleccionado", type="primary"):
-                registro_seleccionado = df.iloc[fila_seleccionada]
-                editar_vacante(registro_seleccionado)
+                registro_seleccionado = cargar_registro(conn, "vacantes", _COLUMNAS_VACANTE, int(df.iloc[fila_seleccionada]["ID Origen"]))
+                if registro_seleccionado is None:
+                    st.warning(":material/warning: El registro ya no existe.")
+                else:
+                    editar_vacante(registro_seleccionado)
         else:
             st.warning(":material/warning: No has seleccionado ningún registro. Haz clic en una fila de la tabla.")
     
@@ -189,21 +281,11 @@ def actualizar_vacante(conn):
 def actualizar_baja(conn):
     st.write("### Actualización de baja existente")
     try:
-        response = conn.table("bajas").select("*").execute()
-        df = pd.DataFrame(response.data)
-        df = df.rename(columns={
-            "id": "ID",
-            "empresa_baja": "Empresa",
-            "puesto_baja": "Puesto",
-            "plaza_baja": "Plaza",
-            "fecha_ingreso": "Fecha de ingreso",
-            "fecha_baja": "Fecha de baja",
-            "tipo_baja": "Tipo de baja",
-            "motivo_baja": "Motivo de la baja",
-            "area_baja": "Área",
-            "fecha_registro_baja": "Fecha de registro de baja",
-        })
-        df = df.sort_values(by="ID", ascending=True)
+        df = indice_paginado(
+            conn, "bajas", "bajas", _COLUMNAS_INDICE_BAJAS,
+            campos_texto=["puesto_baja", "empresa_baja", "plaza_baja", "tipo_baja"],
+            orden="id", campo_numero="id",
+        ).rename(columns=_NOMBRES_BAJA)
         
         st.write('### Datos encontrados en bajas')
         st.info(":material/left_click: Haz clic en cualquier fila de la tabla para seleccionarla")
@@ -211,9 +293,6 @@ def actualizar_baja(conn):
         # Dataframe interactivo con selección
         event = st.dataframe(
             df,
-            column_config = {
-                "id_registro": None,
-                "Fecha de registro de baja": None},
             hide_index=True,
             width="stretch",
             on_select="rerun",
@@ -222,7 +301,8 @@ def actualizar_baja(conn):
         
         # Definir el diálogo modal
         @st.dialog("Editar baja", width="large")
-        def editar_baja(registro):
+        def editar_baja(original):
+            registro = pd.Series(original).rename(_NOMBRES_BAJA)
             st.write(f"**Editando: {registro['Empresa']} - {registro['Puesto']}**")
             
             # Sección 1. Información de Baja
@@ -257,12 +337,16 @@ def actualizar_baja(conn):
                             "puesto_baja": puesto_baja.strip(),
                             "plaza_baja": plaza_baja.strip(),
                             "tipo_baja": tipo_baja.strip(),
-                            "motivo_baja": motivo_baja.strip().upper().replace("Á", "A").replace("É", "E").replace("Í", "I").replace("Ó", "O").replace("Ú", "U"),
+                            "motivo_baja": normalizar(motivo_baja),
                             "fecha_registro_baja": fecha_registro_baja.strftime('%Y-%m-%d') if fecha_registro_baja else None,
                         }
-                        conn.table("bajas").update(payload_baja).eq("id", registro["ID"]).execute()
-                        st.success(":material/check_circle: Baja actualizada correctamente")
-                        st.rerun()
+                        if guardar_modificados(conn, "Baja", original, payload_baja):
+                            st.success(":material/check_circle: Baja actualizada correctamente")
+                            st.rerun()
+                        else:
+                            st.info(":material/info: No hay cambios que guardar")
+                    except ConflictoVersion:
+                        st.warning(_MENSAJE_CONFLICTO)
                     except Exception as e:
                         logger.error("Error al guardar: %s", e, exc_info=True)
                         st.error("Ocurrió un error inesperado. Por favor recarga la página.")
@@ -277,8 +361,11 @@ def actualizar_baja(conn):
             st.success(f":material/check_circle: Seleccionaste: {df.iloc[fila_seleccionada]['Empresa']} - {df.iloc[fila_seleccionada]['Puesto']}")
             
             if st.button(":material/edit: Editar registro seleccionado", type="primary"):
-                registro_seleccionado = df.iloc[fila_seleccionada]
-                editar_baja(registro_seleccionado)
+                registro_seleccionado = cargar_registro(conn, "bajas", _COLUMNAS_BAJA, int(df.iloc[fila_seleccionada]["ID"]))
+                if registro_seleccionado is None:
+                    st.warning(":material/warning: El registro ya no existe.")
+                else:
+                    editar_baja(registro_seleccionado)
         else:
             st.warning(":material/warning: No has seleccionado ningún registro. Haz clic en una fila de la tabla.")
     
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from streamlit_echarts import st_echarts
 from config.opciones import MESES_CORTO
+from utils.motor_sla import EJECUTIVOS_SLA, extraer_ejecutivo
+from utils.motor_tendencias import SERIES, TODAS, semanal, variacion_anual
 
 _TEAL   = "#14b8a6"
 _INDIGO = "#6366f1"
@@ -10,7 +12,7 @@ _TEXT   = "rgba(255,255,255,0.65)"
 _GRID   = "rgba(255,255,255,0.06)"
 _COLORES = [_TEAL, _INDIGO, _AMBER, "#2dd4bf", "#818cf8"]
 
-_EJECUTIVOS = ["DIEGO", "YULIANA", "LETICIA", "ELENA"]
+_EJECUTIVOS = EJECUTIVOS_SLA
 
 _TOOLTIP = {
     "trigger": "axis",
@@ -36,11 +38,10 @@ _YAXIS = {
 }
 
 
-def _match_ejecutivo(nombre: str) -> str:
-    for palabra in str(nombre).upper().split():
-        if palabra in _EJECUTIVOS:
-            return palabra
-    return ""
+def _contratados_por_ejecutivo(df, ejecutivo):
+    """Contrataciones de cada ejecutivo de _EJECUTIVOS (0 si no tiene)."""
+    por_ejecutivo = df["contratados_alta"].groupby(ejecutivo).sum()
+    return [int(v) for v in por_ejecutivo.reindex(_EJECUTIVOS, fill_value=0)]
 
 
 def metricas_comparativas(df_altas: pd.DataFrame):
@@ -48,14 +49,9 @@ def metricas_comparativas(df_altas: pd.DataFrame):
         st.info("No hay datos disponibles.")
         return
 
-    df = df_altas.copy()
-    df["contratados_alta"] = df["contratados_alta"].astype(int)
-    años = sorted(df["fecha_alta"].dt.year.dropna().unique().astype(int).tolist())
-
-    totales = {
-        año: int(df[df["fecha_alta"].dt.year == año]["contratados_alta"].sum())
-        for año in años
-    }
+    por_año = df_altas["contratados_alta"].groupby(df_altas["fecha_alta"].dt.year).sum()
+    totales = {int(año): int(total) for año, total in por_año.items()}
+    años = sorted(totales)
 
     cols = st.columns(len(años))
     for i, año in enumerate(años):
@@ -70,9 +66,7 @@ def grafica_mensual_por_anio(df_altas: pd.DataFrame, año: int, key: str = None)
         st.info("No hay datos disponibles.")
         return
 
-    df = df_altas.copy()
-    df["contratados_alta"] = df["contratados_alta"].astype(int)
-    df = df[df["fecha_alta"].dt.year == año]
+    df = df_altas[df_altas["fecha_alta"].dt.year == año]
 
     if df.empty:
         st.info(f"No hay contrataciones registradas en {año}.")
@@ -116,23 +110,22 @@ def grafica_comparativa_agrupada(df_altas: pd.DataFrame, key: str = None):
         st.info("No hay datos disponibles.")
         return
 
-    df = df_altas.copy()
-    df["contratados_alta"] = df["contratados_alta"].astype(int)
-    años = sorted(df["fecha_alta"].dt.year.dropna().unique().astype(int).tolist())
+    fechas = df_altas["fecha_alta"]
+    por_mes = (
+        df_altas["contratados_alta"]
+        .groupby([fechas.dt.year, fechas.dt.month.rename("mes")])
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=range(1, 13), fill_value=0)
+    )
+    años = [int(a) for a in por_mes.index]
 
     if len(años) < 2:
         st.info("Se necesitan al menos dos años de datos para mostrar la comparativa agrupada.")
         return
 
     series = []
-    for i, año in enumerate(años):
-        df_año = df[df["fecha_alta"].dt.year == año]
-        valores = (
-            df_año.groupby(df_año["fecha_alta"].dt.month)["contratados_alta"]
-            .sum()
-            .reindex(range(1, 13), fill_value=0)
-            .tolist()
-        )
+    for i, (año, valores) in enumerate(zip(años, por_mes.to_numpy())):
         color = _COLORES[i % len(_COLORES)]
         series.append({
             "name": str(año),
@@ -168,7 +161,7 @@ def metricas_nuevo_reemplazo(df_vacantes: pd.DataFrame):
         st.info("No hay datos de vacantes disponibles.")
         return
 
-    df = df_vacantes[df_vacantes["fase_proceso"] == "CONTRATADO"].copy()
+    df = df_vacantes[df_vacantes["fase_proceso"] == "CONTRATADO"]
     if df.empty:
         st.info("No hay vacantes con estatus Contratado.")
         return
@@ -202,24 +195,23 @@ def grafica_ejecutivos_por_anio(df_altas: pd.DataFrame, key: str = None):
         st.info("No hay datos disponibles.")
         return
 
-    df = df_altas.copy()
-    df["contratados_alta"] = df["contratados_alta"].astype(int)
-    df["primer_nombre"] = df["responsable_alta"].fillna("").apply(_match_ejecutivo)
-    df = df[df["primer_nombre"].isin(_EJECUTIVOS)]
-
-    if df.empty:
+    ejecutivo = extraer_ejecutivo(df_altas["responsable_alta"])
+    if ejecutivo.isna().all():
         st.info("No hay datos para los ejecutivos seleccionados.")
         return
 
-    años = sorted(df["fecha_alta"].dt.year.dropna().unique().astype(int).tolist())
+    por_ejecutivo = (
+        df_altas["contratados_alta"]
+        .groupby([df_altas["fecha_alta"].dt.year, ejecutivo])
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=_EJECUTIVOS, fill_value=0)
+    )
+    años = [int(a) for a in por_ejecutivo.index]
 
     series = []
-    for i, año in enumerate(años):
-        df_año = df[df["fecha_alta"].dt.year == año]
-        valores = [
-            int(df_año[df_año["primer_nombre"] == ejec]["contratados_alta"].sum())
-            for ejec in _EJECUTIVOS
-        ]
+    for i, (año, fila) in enumerate(zip(años, por_ejecutivo.to_numpy())):
+        valores = [int(v) for v in fila]
         color = _COLORES[i % len(_COLORES)]
         series.append({
             "name": str(año),
@@ -279,7 +271,7 @@ def grafica_mensual_periodo(df_altas: pd.DataFrame, fecha_ini, fecha_fin, key: s
     fi = pd.Timestamp(fecha_ini)
     ff = pd.Timestamp(fecha_fin)
 
-    df = df_altas[(df_altas["fecha_alta"] >= fi) & (df_altas["fecha_alta"] <= ff)].copy()
+    df = df_altas[(df_altas["fecha_alta"] >= fi) & (df_altas["fecha_alta"] <= ff)]
 
     if df.empty:
         st.info("No hay contrataciones en el período seleccionado.")
@@ -323,16 +315,15 @@ def grafica_ejecutivos_periodo(df_altas: pd.DataFrame, fecha_ini, fecha_fin, key
     fi = pd.Timestamp(fecha_ini)
     ff = pd.Timestamp(fecha_fin)
 
-    df = df_altas[(df_altas["fecha_alta"] >= fi) & (df_altas["fecha_alta"] <= ff)].copy()
-    df["ejecutivo"] = df["responsable_alta"].fillna("").apply(_match_ejecutivo)
-    df = df[df["ejecutivo"].isin(_EJECUTIVOS)]
+    df = df_altas[(df_altas["fecha_alta"] >= fi) & (df_altas["fecha_alta"] <= ff)]
+    ejecutivo = extraer_ejecutivo(df["responsable_alta"])
 
-    if df.empty:
+    if ejecutivo.isna().all():
         st.info("No hay datos para los ejecutivos en este período.")
         return
 
     colores_ejec = [_TEAL, _INDIGO, _AMBER, "#2dd4bf"]
-    valores = [int(df[df["ejecutivo"] == e]["contratados_alta"].sum()) for e in _EJECUTIVOS]
+    valores = _contratados_por_ejecutivo(df, ejecutivo)
 
     options = {
         "tooltip": _TOOLTIP,
@@ -368,7 +359,7 @@ def grafica_mensual_periodo_comparado(df_altas: pd.DataFrame, fechas_años: list
         df_f = df_altas[
             (df_altas["fecha_alta"] >= pd.Timestamp(fi)) &
             (df_altas["fecha_alta"] <= pd.Timestamp(ff))
-        ].copy()
+        ]
         valores = (
             df_f.groupby(df_f["fecha_alta"].dt.month)["contratados_alta"]
             .sum()
@@ -409,12 +400,8 @@ def grafica_ejecutivos_periodo_comparado(df_altas: pd.DataFrame, fechas_años: l
         df_f = df_altas[
             (df_altas["fecha_alta"] >= pd.Timestamp(fi)) &
             (df_altas["fecha_alta"] <= pd.Timestamp(ff))
-        ].copy()
-        df_f["ejecutivo"] = df_f["responsable_alta"].fillna("").apply(_match_ejecutivo)
-        valores = [
-            int(df_f[df_f["ejecutivo"] == e]["contratados_alta"].sum())
-            for e in _EJECUTIVOS
         ]
+        valores = _contratados_por_ejecutivo(df_f, extraer_ejecutivo(df_f["responsable_alta"]))
         color = _COLORES[i % len(_COLORES)]
         series.append({
             "name": str(año),
@@ -441,3 +428,46 @@ def grafica_ejecutivos_periodo_comparado(df_altas: pd.DataFrame, fechas_años: l
     }
 
     st_echarts(options, height="420px", width="100%", key=key)
+
+
+def grafica_variacion_anual(tendencias: dict, serie: str, semanas: int = 52, area: str = TODAS,
+                            semanas_visibles: int = 104, key: str = None):
+    """Ventana móvil de `semanas` semanas de `serie` contra la misma ventana un año antes."""
+    desde = tendencias["fechas"][-1] - pd.Timedelta(weeks=semanas_visibles) if len(tendencias["fechas"]) else None
+    df = variacion_anual(tendencias, serie, semanas, area, desde=desde)
+    puntos = semanal(df["actual"]).index
+    df = df.loc[puntos]
+    if df["actual"].isna().all():
+        st.info("No hay suficiente historial para la comparación interanual.")
+        return
+
+    def _valores(columna):
+        return [None if pd.isna(v) else round(float(v), 1) for v in df[columna]]
+
+    nombre = SERIES[serie]
+    options = {
+        "color": [_TEAL, _INDIGO, _AMBER],
+        "tooltip": {**_TOOLTIP, "axisPointer": {"type": "line"}},
+        "legend": {
+            "data": [f"{nombre} ({semanas} sem.)", "Mismo periodo año anterior", "% variación"],
+            "textStyle": {"color": _TEXT},
+            "top": "4%",
+        },
+        "toolbox": _TOOLBOX,
+        "xAxis": {
+            "type": "category",
+            "data": [f.strftime("%d/%m/%Y") for f in df.index],
+            "axisLabel": {"color": _TEXT},
+        },
+        "yAxis": [_YAXIS, {**_YAXIS, "axisLabel": {"color": _TEXT, "formatter": "{value}%"}, "splitLine": {"show": False}}],
+        "series": [
+            {"name": f"{nombre} ({semanas} sem.)", "type": "line", "smooth": True, "showSymbol": False,
+             "data": _valores("actual")},
+            {"name": "Mismo periodo año anterior", "type": "line", "smooth": True, "showSymbol": False,
+             "lineStyle": {"type": "dashed"}, "data": _valores("anterior")},
+            {"name": "% variación", "type": "bar", "yAxisIndex": 1, "barMaxWidth": 6,
+             "itemStyle": {"color": "rgba(245,158,11,0.5)"}, "data": _valores("pct_variacion")},
+        ],
+    }
+
+    st_echarts(options, height="420px", width="100%", key=key)
@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import pytz
 from config.opciones import TRIMESTRES, MESES_ES
+from utils.indice_fechas import posiciones_periodo
 
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
 
@@ -11,37 +12,80 @@ trimestres = TRIMESTRES
 
 
 
-def calcular_dias_cobertura(row):
-    """Días entre autorización y cobertura; para vacantes abiertas usa la fecha de hoy."""
-    try:
-        fecha_hoy = datetime.now(MEXICO_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        if pd.notna(row['fecha_autorizacion']):
-            fecha_inicio = pd.to_datetime(row['fecha_autorizacion'])
-            if fecha_inicio == pd.Timestamp('1900-01-01'):
-                return 1
-            if fecha_inicio.tzinfo is None:
-                fecha_inicio = MEXICO_TZ.localize(fecha_inicio)
-        elif pd.notna(row['fecha_solicitud']):
-            fecha_inicio = pd.to_datetime(row['fecha_solicitud'])
-            if fecha_inicio.tzinfo is None:
-                fecha_inicio = MEXICO_TZ.localize(fecha_inicio)
-        else:
-            return None
-
-        if row.get('vacantes_contratados', 0) > 0 and pd.notna(row.get('fecha_cobertura')):
-            fecha_final = pd.to_datetime(row['fecha_cobertura'])
-            if fecha_final.tzinfo is None:
-                fecha_final = MEXICO_TZ.localize(fecha_final)
-        elif row.get('vacantes_solicitadas', 0) > 0:
-            fecha_final = fecha_hoy
-        else:
-            return None
-
-        return (fecha_final - fecha_inicio).days
-
-    except Exception:
-        return None
+def hoy_mexico():
+    """Fecha de hoy en México a medianoche y sin zona: ancla de los días de vacantes abiertas."""
+    return pd.Timestamp(datetime.now(MEXICO_TZ).date())
+
+
+_FECHA_CENTINELA = pd.Timestamp('1900-01-01')
+
+# Criterio de vacante activa (equivale a los filtros neq / not_.in_ / not_.is_ de Supabase)
+ESTATUS_INACTIVOS = ["FINALIZADO", "PAUSADO", "CANCELADO", "RECHAZADA"]
+
+
+def base_cobertura(df):
+    """Parte de los días de cobertura que no depende de la fecha de referencia.
+
+    Returns
+    -------
+    pd.DataFrame
+        Mismo índice que df y columnas inicio (autorización o, si falta,
+        solicitud), dias_cerrada (días ya fijos: vacantes cubiertas y fecha
+        centinela; NaN en las demás) y abierta (True si sus días corren hasta hoy).
+    """
+    autorizacion = df['fecha_autorizacion']
+    inicio = autorizacion.fillna(df['fecha_solicitud'])
+    centinela = autorizacion == _FECHA_CENTINELA
+
+    cerrada = (df['vacantes_contratados'] > 0) & df['fecha_cobertura'].notna()
+    abierta = ~cerrada & (df['vacantes_solicitadas'] > 0) & inicio.notna() & ~centinela
+
+    dias_cerrada = (df['fecha_cobertura'] - inicio).dt.days.astype(float).where(cerrada)
+    return pd.DataFrame({
+        'inicio': inicio,
+        'dias_cerrada': dias_cerrada.mask(centinela, 1.0),
+        'abierta': abierta,
+    }, index=df.index)
+
+
+def dias_cobertura(base, hoy):
+    """Días de cobertura al día `hoy` a partir de `base_cobertura`: las abiertas suman hoy - inicio."""
+    abiertas = (pd.Timestamp(hoy) - base['inicio']).dt.days.astype(float)
+    return base['dias_cerrada'].mask(base['abierta'], abiertas)
+
+
+def calcular_dias_cobertura_vectorizado(df, hoy=None):
+    """Días de cobertura de todo el DataFrame al día `hoy` (por defecto, hoy en México)."""
+    return dias_cobertura(base_cobertura(df), hoy_mexico() if hoy is None else hoy)
+
+
+def dias_cobertura_de(df, hoy=None):
+    """Columna `dias` si df ya viene derivado (ver derivar_vacantes); si no, la calcula."""
+    if 'dias' in df.columns:
+        return df['dias']
+    return calcular_dias_cobertura_vectorizado(df, hoy)
+
+
+def derivar_vacantes(df, hoy=None, base=None):
+    """Agrega en una sola pasada las columnas es_activa, es_sla y dias.
+
+    - es_activa: no contratada, estatus vigente y con fecha de autorización.
+    - es_sla: con contrataciones (vacantes_contratados > 0) y días de cobertura válidos.
+    - dias: días de cobertura al día `hoy` (ver base_cobertura); `base`
+      permite reutilizar un `base_cobertura(df)` ya calculado.
+    """
+    if df.empty:
+        return df.assign(es_activa=pd.Series(dtype=bool), es_sla=pd.Series(dtype=bool), dias=pd.Series(dtype=float))
+
+    base = base_cobertura(df) if base is None else base
+    dias = dias_cobertura(base, hoy_mexico() if hoy is None else hoy)
+    es_activa = (
+        df['fase_proceso'].notna() & (df['fase_proceso'] != 'CONTRATADO') &
+        df['estatus_solicitud'].notna() & ~df['estatus_solicitud'].isin(ESTATUS_INACTIVOS) &
+        df['fecha_autorizacion'].notna()
+    )
+    es_sla = (df['vacantes_contratados'] > 0) & dias.notna() & (dias >= 0)
+    return df.assign(es_activa=es_activa, es_sla=es_sla, dias=dias)
 
 
 def obtener_rango_semana(año, semana):
@@ -70,32 +114,59 @@ def obtener_rango_trimestre(año, trimestre):
         raise ValueError(f"Error al calcular rango de trimestre: {e}") from e
 
 
-def filtrar_datos(df, fecha_columna, tipo_filtro, año=None, mes=None, semana=None, trimestre=None, fecha_inicio=None, fecha_fin=None):
+def filtrar_datos(df, fecha_columna, tipo_filtro, año=None, mes=None, semana=None, trimestre=None, fecha_inicio=None, fecha_fin=None, indice=None):
+    """Filas de df dentro del periodo seleccionado; no modifica df.
+
+    Con `indice` (utils/indice_fechas.py, de la misma versión que df) el periodo
+    se resuelve por búsqueda en lugar de comparar toda la columna.
+    """
     if df.empty:
         return df
 
-    df[fecha_columna] = pd.to_datetime(df[fecha_columna])
+    if indice is not None:
+        posiciones = posiciones_periodo(indice, tipo_filtro, año, mes, semana, trimestre, fecha_inicio, fecha_fin)
+        return df if posiciones is None else df.iloc[posiciones]
+
+    fechas = df[fecha_columna]
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas)
+        df = df.assign(**{fecha_columna: fechas})
 
     if tipo_filtro == "Todo el tiempo":
         return df
     elif tipo_filtro == "Por año" and año:
-        return df[df[fecha_columna].dt.year == año]
+        return df[fechas.dt.year == año]
     elif tipo_filtro == "Por trimestre" and año and trimestre:
         inicio, fin = obtener_rango_trimestre(año, trimestre)
-        return df[(df[fecha_columna] >= inicio) & (df[fecha_columna] <= fin)]
+        return df[(fechas >= inicio) & (fechas <= fin)]
     elif tipo_filtro == "Por mes" and año and mes:
-        return df[(df[fecha_columna].dt.year == año) & (df[fecha_columna].dt.month == mes)]
+        return df[(fechas.dt.year == año) & (fechas.dt.month == mes)]
     elif tipo_filtro == "Por semana" and año and semana:
         inicio, fin = obtener_rango_semana(año, semana)
-        return df[(df[fecha_columna] >= inicio) & (df[fecha_columna] <= fin)]
+        return df[(fechas >= inicio) & (fechas <= fin)]
     elif tipo_filtro == "Por rango de fechas" and fecha_inicio and fecha_fin:
-        return df[
-            (df[fecha_columna] >= pd.to_datetime(fecha_inicio)) &
-            (df[fecha_columna] <= pd.to_datetime(fecha_fin))
-        ]
+        return df[(fechas >= pd.to_datetime(fecha_inicio)) & (fechas <= pd.to_datetime(fecha_fin))]
     return df
 
 
+def rango_periodo(tipo_filtro, año=None, mes=None, semana=None, trimestre=None, fecha_inicio=None, fecha_fin=None):
+    """(inicio, fin) del periodo seleccionado como Timestamps; None si el filtro no acota."""
+    if tipo_filtro == "Por año" and año:
+        return pd.Timestamp(int(año), 1, 1), pd.Timestamp(int(año), 12, 31)
+    if tipo_filtro == "Por trimestre" and año and trimestre:
+        inicio, fin = obtener_rango_trimestre(año, trimestre)
+    elif tipo_filtro == "Por mes" and año and mes:
+        inicio = pd.Timestamp(int(año), int(mes), 1)
+        fin = inicio + pd.offsets.MonthEnd(0)
+    elif tipo_filtro == "Por semana" and año and semana:
+        inicio, fin = obtener_rango_semana(año, semana)
+    elif tipo_filtro == "Por rango de fechas" and fecha_inicio and fecha_fin:
+        inicio, fin = fecha_inicio, fecha_fin
+    else:
+        return None
+    return pd.Timestamp(inicio), pd.Timestamp(fin)
+
+
 _ALIAS_EJECUTIVO = {
     'MARTA':   'HELEN',
     'ELENA':   'HELEN',
@@ -104,27 +175,27 @@ _ALIAS_EJECUTIVO = {
 
 def promedio_dias_cerradas(df, area=None):
     """Días promedio entre fecha_autorizacion y fecha_cobertura para vacantes finalizadas."""
-    mask = (df['vacantes_contratados'] > 0) & df['fecha_cobertura'].notna() & df['fecha_autorizacion'].notna()
+    mask = (
+        (df['vacantes_contratados'] > 0) & df['fecha_cobertura'].notna() &
+        df['fecha_autorizacion'].notna() & (df['fecha_autorizacion'] != _FECHA_CENTINELA)
+    )
     if area:
         mask &= df['funcion_area_vacante'] == area
-    df_f = df[mask].copy()
-    if df_f.empty:
+    if not mask.any():
         return None
-    df_f = df_f[df_f['fecha_autorizacion'] != pd.Timestamp('1900-01-01')]
-    dias = (df_f['fecha_cobertura'] - df_f['fecha_autorizacion']).dt.days
+    dias = (df.loc[mask, 'fecha_cobertura'] - df.loc[mask, 'fecha_autorizacion']).dt.days
     dias = dias[dias >= 0]
     return dias.mean() if not dias.empty else None
 
 
+def ejecutivos_de(nombre):
+    """Palabras del nombre de un responsable con los alias de ejecutivo ya resueltos."""
+    return {_ALIAS_EJECUTIVO.get(palabra, palabra) for palabra in str(nombre).upper().split()}
+
+
 def filtrar_por_ejecutivo(df, columna_responsable, ejecutivo):
     """Filtra df buscando el ejecutivo en todas las palabras del nombre."""
     if df.empty:
         return df
 
-    def _match(nombre):
-        for palabra in str(nombre).upper().split():
-            if _ALIAS_EJECUTIVO.get(palabra, palabra) == ejecutivo:
-                return True
-        return False
-
-    return df[df[columna_responsable].apply(_match)]
+    return df[df[columna_responsable].apply(lambda nombre: ejecutivo in ejecutivos_de(nombre))]
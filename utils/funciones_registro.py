@@ -5,8 +5,10 @@ from config.opciones import (
      PLAZAS, EMPRESAS, AREAS, CANALES_RECLUTAMIENTO, RESPONSABLES_RECLUTAMIENTO, 
      ESTATUS_SOLICITUD, FASE_PROCESO, TIPO_RECLUTAMIENTO, PUESTOS
 )
-from config.db_utils import insertar_maestra, insertar_alta, insertar_baja, insertar_vacante
+from config.db_utils import registrar
+from utils.cargas_datos import invalidar_datos
 from utils.logger import get_logger
+from utils.normalizacion import normalizar
 
 logger = get_logger(__name__)
 
@@ -34,13 +36,12 @@ def registrar_alta(conn):
         else:
             
             try:
-                id_maestra = insertar_maestra(conn, "Alta", {
+                registrar(conn, "Alta", {
                     "puesto": puesto_alta.strip(),
                     "empresa": empresa_alta,
                     "plaza": plaza_alta,
                     "area": area_alta,
-                    })
-                insertar_alta(conn, {
+                    }, {
                     "fecha_alta": fecha_alta, 
                     "empresa_alta": empresa_alta,
                     "puesto_alta": puesto_alta.strip(),
@@ -48,7 +49,8 @@ def registrar_alta(conn):
                     "area_alta": area_alta,
                     "contratados_alta": contratados_alta,
                     "medio_reclutamiento_alta": medio_reclutamiento_alta,
-                    "responsable_alta": responsable_alta,}, id_maestra)
+                    "responsable_alta": responsable_alta,})
+                invalidar_datos("altas")
                 st.toast("Alta registrada exitosamente", icon="✅")
             except Exception as e:
                 logger.error("Error al registrar la alta: %s", e, exc_info=True)
@@ -76,22 +78,22 @@ def registrar_baja(conn):
             st.error("Debes ingresar un puesto")
         else:
             try:
-                id_maestra = insertar_maestra(conn, "Baja", {
-                    "puesto": puesto_baja.strip().upper().replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U'),
+                registrar(conn, "Baja", {
+                    "puesto": normalizar(puesto_baja),
                     "empresa": empresa_baja,
                     "plaza": plaza_baja,
                     "area": area_baja,
-                })
-                insertar_baja(conn, {
+                }, {
                     "fecha_baja": fecha_baja,
-                    "puesto_baja": puesto_baja.strip().upper().replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U'),
+                    "puesto_baja": normalizar(puesto_baja),
                     "empresa_baja": empresa_baja,
                     "plaza_baja": plaza_baja,
                     "area_baja": area_baja,
                     "fecha_ingreso": fecha_ingreso,
                     "tipo_baja": tipo_baja,
-                    "motivo_baja": motivo_baja.strip().upper().replace('Á', 'A').replace('É', 'E').replace('Í', 'I').replace('Ó', 'O').replace('Ú', 'U'),
-                }, id_maestra)
+                    "motivo_baja": normalizar(motivo_baja),
+                })
+                invalidar_datos("bajas")
                 st.toast("Baja registrada exitosamente", icon="✅")
             except Exception as e:
                 logger.error("Error al registrar la baja: %s", e, exc_info=True)
@@ -136,13 +138,12 @@ def registrar_vacante(conn):
             st.error("Debes ingresar un puesto.")
         else:
             try:
-                id_maestra = insertar_maestra(conn, "Vacante", {
+                registrar(conn, "Vacante", {
                     "puesto": puesto_vacante.strip(),
                     "empresa": empresa_vacante,
                     "plaza": plaza_vacante,
                     "area": funcion_area_vacante,
-                })
-                insertar_vacante(conn, {
+                }, {
                     "fecha_solicitud": fecha_solicitud,
                     "tipo_solicitud": tipo_solicitud,
                     "estatus_solicitud": estatus_solicitud,
@@ -160,7 +161,8 @@ def registrar_vacante(conn):
                     "tipo_reclutamiento_vacante": tipo_reclutamiento_vacante,
                     "medio_reclutamiento_vacante": medio_reclutamiento_vacante,
                     "fecha_cobertura": fecha_cobertura,
-                }, id_maestra)
+                })
+                invalidar_datos("vacantes")
                 st.success("Vacante registrada exitosamente", icon="✅")
             except Exception as e:
                 logger.error("Error al registrar la vacante: %s", e, exc_info=True)
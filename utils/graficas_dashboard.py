@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from utils.funciones_dashboard import calcular_dias_cobertura
+from utils.catalogo_puestos import canonizar_puestos
+from utils.distribucion_cobertura import DIMENSIONES_DISTRIBUCION, histograma, resumen_distribucion
+from utils.funciones_dashboard import dias_cobertura_de
+from utils.motor_sla import objetivo_sla_area, objetivo_sla_promedio
+from utils.motor_rotacion import DIMENSIONES_ROTACION, DIAS_TEMPRANA, histograma_antiguedad, resumen_antiguedad, rotacion_mensual
+from utils.motor_tendencias import TODAS, VENTANAS_SEMANAS, cambio_neto_acumulado, semanal, ventana_movil
 from utils.tabla_interactiva import render_interactive_table
 from config.opciones import EMPRESAS_NOMBRE_CORTO, MESES_ES
 from streamlit_echarts import st_echarts, JsCode
@@ -63,11 +68,18 @@ _YAXIS = {
 }
 
 
+def _mes_categorico(fechas):
+    """Nombre del mes como categoría ordenada enero→diciembre."""
+    return pd.Series(
+        pd.Categorical(fechas.dt.month.map(MESES_ES), categories=list(MESES_ES.values()), ordered=True),
+        index=fechas.index,
+    )
+
+
 def tabla_dinamica_contrataciones(df_altas_filtrado):
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
                 tabla_dinamica = df.drop(columns=['id_registro', 'confidencial'])
                 tabla_dinamica = tabla_dinamica.rename(
@@ -112,17 +124,15 @@ def tabla_dinamica_contrataciones(df_altas_filtrado):
 def grafica_contrataciones_por_ejecutivo(df_altas_filtrado):
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
-                df['primer_nombre'] = df['responsable_alta'].str.split().str[0]
-                df['primer_nombre'] = df['primer_nombre'].replace({
+                primer_nombre = df['responsable_alta'].str.split().str[0].replace({
                     'MARTA': 'HELEN',
                     'LETICIA': 'LETY',
                     'YULIANA': 'YULI',
-                })
+                }).rename('primer_nombre')
                 resumen = (
-                    df.groupby(['primer_nombre', 'area_alta'])['contratados_alta']
+                    df.groupby([primer_nombre, 'area_alta'])['contratados_alta']
                     .sum()
                     .reset_index()
                 )
@@ -195,12 +205,11 @@ def grafica_contrataciones_por_ejecutivo(df_altas_filtrado):
 def grafica_contrataciones_por_empresa(df_altas_filtrado):
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
-                df.replace(EMPRESAS_NOMBRE_CORTO, inplace=True)
+                empresa = df['empresa_alta'].replace(EMPRESAS_NOMBRE_CORTO)
                 resumen = (
-                    df.groupby('empresa_alta')['contratados_alta']
+                    df.groupby(empresa)['contratados_alta']
                     .sum()
                     .reset_index()
                     .sort_values('contratados_alta', ascending=False)
@@ -275,8 +284,7 @@ def grafica_contrataciones_por_empresa(df_altas_filtrado):
 def grafica_contrataciones_por_medio_reclutamiento(df_altas_filtrado):
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
                 resumen = (
                     df.groupby('medio_reclutamiento_alta')['contratados_alta']
@@ -328,34 +336,19 @@ def grafica_contrataciones_por_medio_reclutamiento(df_altas_filtrado):
 def grafica_vacantes_por_empresa(df_vacantes):
     try:
         if not df_vacantes.empty:
-            df = df_vacantes.copy()
-            df['vacantes_solicitadas'] = df['vacantes_solicitadas'].astype(int)
-            df = df[(df['vacantes_solicitadas'] > 0) & (df['fecha_autorizacion'].notna())]
+            df = df_vacantes[(df_vacantes['vacantes_solicitadas'] > 0) & df_vacantes['fecha_autorizacion'].notna()]
 
             if not df.empty:
-                df['dias_cobertura_calculados'] = df.apply(calcular_dias_cobertura, axis=1)
-                df_detalle = df[[
-                    'id_sistema', 'fecha_autorizacion', 'empresa_vacante', 'puesto_vacante',
-                    'plaza_vacante', 'vacantes_solicitadas', 'dias_cobertura_calculados',
-                    'confidencial', 'fase_proceso',
-                ]].copy()
-                df_detalle['fecha_autorizacion'] = df_detalle['fecha_autorizacion'].dt.date
-                df_detalle = df_detalle.rename(columns={
-                    "id_sistema": "ID",
-                    "fecha_autorizacion": "Fecha de autorización",
-                    "empresa_vacante": "Empresa",
-                    "puesto_vacante": "Puesto",
-                    "plaza_vacante": "Plaza",
-                    "vacantes_solicitadas": "Vacantes",
-                    "dias_cobertura_calculados": "Días de cobertura",
-                    "fase_proceso": "Fase de proceso",
-                })
-                df_grafico = df_detalle.copy()
-                df_grafico['Empresa'] = df_grafico['Empresa'].replace(EMPRESAS_NOMBRE_CORTO)
-                df_detalle['Días de cobertura'] = df_detalle['Días de cobertura'].round(0).astype(int)
-                df_detalle = df_detalle.sort_values(by='Días de cobertura', ascending=False)
-                df_detalle.loc[df_detalle['confidencial'] == 'SI', 'Puesto'] = 'VACANTE'
-                df_detalle = df_detalle.drop(columns=['confidencial']).reset_index(drop=True)
+                df_detalle = pd.DataFrame({
+                    "ID": df['id_sistema'],
+                    "Fecha de autorización": df['fecha_autorizacion'].dt.date,
+                    "Empresa": df['empresa_vacante'],
+                    "Puesto": df['puesto_vacante'].mask(df['confidencial'] == 'SI', 'VACANTE'),
+                    "Plaza": df['plaza_vacante'],
+                    "Vacantes": df['vacantes_solicitadas'],
+                    "Días de cobertura": dias_cobertura_de(df).round(0).astype(int),
+                    "Fase de proceso": df['fase_proceso'],
+                }).sort_values(by='Días de cobertura', ascending=False).reset_index(drop=True)
 
                 st_pivot_table(
                     df_detalle,
@@ -367,13 +360,14 @@ def grafica_vacantes_por_empresa(df_vacantes):
                         "type": "threshold",
                         "apply_to": ['Días de cobertura'],
                         "conditions": [
-                            {"operator": "gt", "value": 15, "background": _INDIGO, "bold": True},
+                            {"operator": "gt", "value": objetivo_sla_area("OPERATIVA"), "background": _INDIGO, "bold": True},
                         ],
                     }],
                     export_filename="vacantes_actuales"
                 )
 
-                resumen = df_grafico.groupby('Empresa')['Vacantes'].sum().reset_index()
+                empresa = df['empresa_vacante'].replace(EMPRESAS_NOMBRE_CORTO).rename('Empresa')
+                resumen = df['vacantes_solicitadas'].groupby(empresa).sum().rename('Vacantes').reset_index()
                 resumen = resumen.sort_values('Vacantes', ascending=False)
 
                 st.write('### Resumen de Vacantes por Empresa')
@@ -413,8 +407,7 @@ def grafica_vacantes_por_empresa(df_vacantes):
 def grafica_vacantes_por_area(df_vacantes):
     try:
         if not df_vacantes.empty:
-            df = df_vacantes.copy()
-            df = df[(df['vacantes_solicitadas'].astype(int) > 0) & (df['fecha_autorizacion'].notna())]
+            df = df_vacantes[(df_vacantes['vacantes_solicitadas'] > 0) & df_vacantes['fecha_autorizacion'].notna()]
             if not df.empty:
                 resumen = (
                     df.groupby('funcion_area_vacante')['vacantes_solicitadas']
@@ -458,16 +451,58 @@ def grafica_vacantes_por_area(df_vacantes):
         st.error("Ocurrió un error inesperado. Por favor recarga la página.")
 
 
+def grafica_tendencia_vacantes_semanales(df_snapshots, dimension, max_series=6):
+    """Vacantes abiertas por semana desde los snapshots guardados (lectura, sin recálculo)."""
+    try:
+        df = df_snapshots[df_snapshots['dimension'] == dimension] if not df_snapshots.empty else df_snapshots
+        if not df.empty:
+            completa = df.pivot_table(index='semana', columns='valor', values='n_vacantes', aggfunc='sum', fill_value=0)
+            principales = completa.iloc[-1].sort_values(ascending=False).index[:max_series]
+            otras = completa.columns.difference(principales)
+            tabla = completa[principales]
+            if len(otras) > 0:
+                tabla = tabla.assign(OTRAS=completa[otras].sum(axis=1))
+
+            options = {
+                "color": _PALETTE,
+                "tooltip": {**_TOOLTIP, "axisPointer": {"type": "line"}},
+                "toolbox": _TOOLBOX,
+                "legend": {"bottom": 0, "textStyle": {"color": _TEXT}},
+                "grid": {"left": "3%", "right": "3%", "bottom": "15%", "containLabel": True},
+                "xAxis": {
+                    "type": "category",
+                    "data": tabla.index.tolist(),
+                    "axisLabel": {"rotate": 45, "color": _TEXT},
+                },
+                "yAxis": _YAXIS,
+                "series": [
+                    {
+                        "name": str(col),
+                        "type": "line",
+                        "stack": "total",
+                        "areaStyle": {"opacity": 0.25},
+                        "smooth": True,
+                        "symbol": "none",
+                        "data": [int(v) for v in tabla[col]],
+                    }
+                    for col in tabla.columns
+                ],
+            }
+            st_echarts(options, height="400px", width="100%")
+        else:
+            st.info('Aún no hay snapshots semanales guardados.')
+    except Exception as e:
+        logger.error("Error en grafica_tendencia_vacantes_semanales: %s", e, exc_info=True)
+        st.error("Ocurrió un error inesperado. Por favor recarga la página.")
+
+
 def grafica_contrataciones_mes(df_altas_filtrado):
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
-                df['mes_alta'] = df['fecha_alta'].dt.month.map(MESES_ES)
-                meses_ordenados = list(MESES_ES.values())
-                df['mes_alta'] = pd.Categorical(df['mes_alta'], categories=meses_ordenados, ordered=True)
-                resumen = df.groupby('mes_alta', as_index=False, observed=True)['contratados_alta'].sum()
+                mes_alta = _mes_categorico(df['fecha_alta']).rename('mes_alta')
+                resumen = df.groupby(mes_alta, observed=True)['contratados_alta'].sum().reset_index()
 
                 options = {
                     "color": [_TEAL],
@@ -502,8 +537,7 @@ def grafica_contrataciones_mes(df_altas_filtrado):
 def grafica_embudo_fase_proceso(df_vacantes_filtrado):
     try:
         if not df_vacantes_filtrado.empty:
-            df = df_vacantes_filtrado.copy()
-            df = df[df['fase_proceso'].notna()]
+            df = df_vacantes_filtrado[df_vacantes_filtrado['fase_proceso'].notna()]
 
             if not df.empty:
                 df = df.loc[
@@ -542,11 +576,9 @@ def contrataciones_area_redes_pagadas(df_altas_filtrado):
     col1, col2, col3, col4 = st.columns(4)
     try:
         if not df_altas_filtrado.empty:
-            df = df_altas_filtrado.copy()
-            df = df[df['contratados_alta'].astype(int) > 0]
+            df = df_altas_filtrado[df_altas_filtrado['contratados_alta'] > 0]
             if not df.empty:
-                df['mes_alta'] = df['fecha_alta'].dt.month.map(MESES_ES)
-                df['mes_alta'] = pd.Categorical(df['mes_alta'], categories=MESES_ES.values(), ordered=True)
+                df = df.assign(mes_alta=_mes_categorico(df['fecha_alta']))
 
                 total_contrataciones = df['contratados_alta'].sum()
                 col1.metric('Contratados Totales', total_contrataciones)
@@ -607,16 +639,15 @@ def contrataciones_area_redes_pagadas(df_altas_filtrado):
 def promedio_plaza_puesto(df_vacantes_cerradas_filtrado):
     try:
         if not df_vacantes_cerradas_filtrado.empty:
-            df = df_vacantes_cerradas_filtrado.copy()
-            df['dias_cobertura_calculados'] = df.apply(calcular_dias_cobertura, axis=1)
-            df = df[df['vacantes_contratados'] > 0]
+            df = df_vacantes_cerradas_filtrado[df_vacantes_cerradas_filtrado['vacantes_contratados'] > 0]
+            df = df.assign(dias_cobertura_calculados=dias_cobertura_de(df))
 
             col1, col2, col3 = st.columns([2, 2, 2])
             st.write('### Tablas Detalle')
             row_container = st.container(horizontal=True, horizontal_alignment='center')
 
             valor_promedio_general = df['dias_cobertura_calculados'].mean().round(0)
-            valor_actual = 15 + 30 / 2
+            valor_actual = objetivo_sla_promedio()
             with col1:
                 promedio_general = st.metric(label='Promedio Global', value=valor_promedio_general, delta=f"Meta actual: {valor_actual:.0f} días")
 
@@ -628,8 +659,9 @@ def promedio_plaza_puesto(df_vacantes_cerradas_filtrado):
                 .round(0)
                 .rename(columns={'plaza_vacante': 'Plaza', 'dias_cobertura_calculados': 'Días de cobertura'})
             )
+            # Las variantes de escritura de un mismo puesto se agrupan bajo el nombre del catálogo
             df_puesto = (
-                df.groupby('puesto_vacante')['dias_cobertura_calculados']
+                df.groupby(canonizar_puestos(df['puesto_vacante']))['dias_cobertura_calculados']
                 .mean()
                 .reset_index()
                 .sort_values(by='dias_cobertura_calculados', ascending=False)
@@ -651,3 +683,210 @@ def promedio_plaza_puesto(df_vacantes_cerradas_filtrado):
     except Exception as e:
         logger.error("Error en promedio_plaza_puesto: %s", e, exc_info=True)
         st.error("Ocurrió un error inesperado. Por favor recarga la página.")
+
+
+def distribucion_cobertura(df_cobertura, key):
+    """Percentiles e histograma de días de cobertura de un subconjunto de cargar_cobertura()."""
+    try:
+        if df_cobertura.empty or df_cobertura['dias'].notna().sum() == 0:
+            st.info('No se encontró información de cobertura en el periodo seleccionado.')
+            return
+
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            dimension = st.segmented_control(
+                "Agrupar por", list(DIMENSIONES_DISTRIBUCION), default="Área", key=f"{key}_dimension"
+            )
+        with col2:
+            excluir = st.toggle("Excluir atípicos (centinela 1900 y más de un año)", value=True, key=f"{key}_atipicos")
+
+        conteo = histograma(df_cobertura, excluir_atipicas=excluir)
+        options = {
+            "color": [_TEAL],
+            "tooltip": _TOOLTIP,
+            "toolbox": _TOOLBOX_SIMPLE,
+            "grid": {"left": "3%", "right": "4%", "bottom": "3%", "containLabel": True},
+            "xAxis": {
+                "type": "category",
+                "name": "Días",
+                "data": list(conteo.index),
+                "axisLabel": {"color": _TEXT},
+            },
+            "yAxis": _YAXIS,
+            "series": {
+                "name": "Vacantes",
+                "type": "bar",
+                "label": {"show": True, "position": "top", "color": _TEXT},
+                "data": [int(v) for v in conteo],
+            },
+        }
+        st_echarts(options, height="320px", width="100%", key=f"{key}_histograma")
+
+        if dimension:
+            columna = DIMENSIONES_DISTRIBUCION[dimension]
+            df_resumen = resumen_distribucion(df_cobertura, columna, excluir_atipicas=excluir).reset_index()
+            df_resumen = df_resumen.rename(columns={
+                columna: dimension,
+                "vacantes": "Vacantes",
+                "atipicas": "Atípicas",
+                "dias_promedio": "Días promedio",
+                "dias_p50": "Días p50",
+                "dias_p75": "Días p75",
+                "dias_p90": "Días p90",
+                "dias_p95": "Días p95",
+            }).round(1)
+            render_interactive_table(df_resumen, height=420)
+    except Exception as e:
+        logger.error("Error en distribucion_cobertura: %s", e, exc_info=True)
+        st.error("Ocurrió un error inesperado. Por favor recarga la página.")
+
+
+def grafica_tendencia_movil(tendencias, key, area=TODAS, semanas_visibles=104):
+    """Sumas móviles de contrataciones y bajas y cambio neto acumulado de las últimas `semanas_visibles` semanas."""
+    try:
+        if len(tendencias["fechas"]) == 0:
+            st.info('No se encontró información de contrataciones.')
+            return
+
+        semanas = st.segmented_control(
+            "Ventana", VENTANAS_SEMANAS, default=13, format_func=lambda s: f"{s} semanas", key=f"{key}_ventana"
+        ) or 13
+        desde = tendencias["fechas"][-1] - pd.Timedelta(weeks=semanas_visibles)
+
+        contrataciones = semanal(ventana_movil(tendencias, "contrataciones", semanas, area, desde=desde))
+        bajas = semanal(ventana_movil(tendencias, "bajas", semanas, area, desde=desde))
+        neto = semanal(cambio_neto_acumulado(tendencias, area, desde=desde))
+
+        def _valores(serie):
+            return [None if pd.isna(v) else round(float(v), 1) for v in serie]
+
+        options = {
+            "color": [_TEAL, _AMBER, _INDIGO],
+            "tooltip": {**_TOOLTIP, "axisPointer": {"type": "line"}},
+            "toolbox": _TOOLBOX_SIMPLE,
+            "legend": {
+                "data": [f"Contrataciones ({semanas} sem.)", f"Bajas ({semanas} sem.)", "Cambio neto acumulado"],
+                "top": "2%",
+                "left": "center",
+                "textStyle": {"color": _TEXT},
+            },
+            "grid": {"left": "3%", "right": "4%", "bottom": "3%", "top": "15%", "containLabel": True},
+            "xAxis": {
+                "type": "category",
+                "data": [f.strftime("%d/%m/%Y") for f in contrataciones.index],
+                "axisLabel": {"color": _TEXT},
+            },
+            "yAxis": [_YAXIS, {**_YAXIS, "splitLine": {"show": False}}],
+            "series": [
+                {
+                    "name": f"Contrataciones ({semanas} sem.)",
+                    "type": "line",
+                    "smooth": True,
+                    "showSymbol": False,
+                    "data": _valores(contrataciones),
+                },
+                {
+                    "name": f"Bajas ({semanas} sem.)",
+                    "type": "line",
+                    "smooth": True,
+                    "showSymbol": False,
+                    "data": _valores(bajas),
+                },
+                {
+                    "name": "Cambio neto acumulado",
+                    "type": "line",
+                    "yAxisIndex": 1,
+                    "showSymbol": False,
+                    "lineStyle": {"type": "dashed"},
+                    "data": _valores(neto),
+                },
+            ],
+        }
+        st_echarts(options, height="380px", width="100%", key=f"{key}_grafica")
+    except Exception as e:
+        logger.error("Error en grafica_tendencia_movil: %s", e, exc_info=True)
+        st.error("Ocurrió un error inesperado. Por favor recarga la página.")
+
+
+def _antiguedad_egreso(df, key):
+    """Métricas e histograma de antigüedad al egreso de las bajas de `df`."""
+    resumen = resumen_antiguedad(df).iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric('Bajas', f"{int(resumen['bajas']):,}", border=True)
+    col2.metric('Antigüedad mediana', f"{resumen['antiguedad_p50']:.0f} días" if pd.notna(resumen['antiguedad_p50']) else "-", border=True)
+    for col, dias in zip((col3, col4), DIAS_TEMPRANA):
+        valor = resumen[f'pct_{dias}']
+        col.metric(f'Bajas antes de {dias} días', f"{valor:.1f}%" if pd.notna(valor) else "-", border=True)
+
+    conteo = histograma_antiguedad(df)
+    options = {
+        "color": [_AMBER],
+        "tooltip": _TOOLTIP,
+        "toolbox": _TOOLBOX_SIMPLE,
+        "grid": {"left": "3%", "right": "4%", "bottom": "3%", "containLabel": True},
+        "xAxis": {"type": "category", "name": "Antigüedad", "data": list(conteo.index), "axisLabel": {"color": _TEXT}},
+        "yAxis": _YAXIS,
+        "series": {
+            "name": "Bajas",
+            "type": "bar",
+            "label": {"show": True, "position": "top", "color": _TEXT},
+            "data": [int(v) for v in conteo],
+        },
+    }
+    st_echarts(options, height="320px", width="100%", key=f"{key}_antiguedad")
+
+
+def panel_rotacion(rotacion, indices_bajas, key, desde=None, hasta=None):
+    """Antigüedad al egreso, bajas tempranas y rotación mensual de las bajas en `indices_bajas`.
+
+    `desde` y `hasta` ("AAAA-MM") acotan la tabla mensual precalculada; sin
+    bajas en el periodo se siguen mostrando sus contrataciones.
+    """
+    try:
+        df = rotacion["bajas"]
+        df = df.loc[df.index.intersection(indices_bajas)] if not df.empty else df
+        if df.empty:
+            st.info('No hay bajas registradas en el período seleccionado.')
+        else:
+            _antiguedad_egreso(df, key)
+
+        nombres = {
+            "mes": "Mes",
+            "bajas": "Bajas",
+            "bajas_30": f"Bajas < {DIAS_TEMPRANA[0]} días",
+            "bajas_90": f"Bajas < {DIAS_TEMPRANA[1]} días",
+            "antiguedad_mediana": "Antigüedad mediana (días)",
+            "altas": "Contrataciones",
+            "rotacion_pct": "Rotación % (bajas / contrataciones)",
+        }
+
+        st.write("#### Rotación mensual total")
+        total = rotacion_mensual(rotacion, None, desde, hasta).reset_index().rename(columns=nombres)
+        render_interactive_table(total.round(1), height=320)
+
+        dimension = st.segmented_control(
+            "Agrupar por", list(DIMENSIONES_ROTACION), default="Empresa", key=f"{key}_dimension"
+        )
+        if not dimension:
+            return
+        columna = DIMENSIONES_ROTACION[dimension]
+
+        st.write(f"#### Rotación mensual por {dimension.lower()}")
+        mensual = rotacion_mensual(rotacion, columna, desde, hasta).reset_index().rename(columns={**nombres, columna: dimension})
+        render_interactive_table(mensual.round(1), height=420)
+
+        st.write(f"#### Antigüedad al egreso por {dimension.lower()}")
+        por_dimension = resumen_antiguedad(df, columna).reset_index().rename(columns={
+            columna: dimension,
+            "bajas": "Bajas",
+            "antiguedad_p25": "p25 (días)",
+            "antiguedad_p50": "p50 (días)",
+            "antiguedad_p75": "p75 (días)",
+            "antiguedad_p90": "p90 (días)",
+            "pct_30": f"% < {DIAS_TEMPRANA[0]} días",
+            "pct_90": f"% < {DIAS_TEMPRANA[1]} días",
+        })
+        render_interactive_table(por_dimension.round(1), height=420)
+    except Exception as e:
+        logger.error("Error en panel_rotacion: %s", e, exc_info=True)
+        st.error("Ocurrió un error inesperado. Por favor recarga la página.")
@@ -0,0 +1,584 @@
+"""
+Etapas de la importación de vacantes desde los exportes de Enla-c.
+
+Cada etapa recibe un bloque completo (ver utils/lector_excel.py) y trabaja por
+columnas en lugar de fila por fila. La escritura se reparte en lotes que un
+grupo acotado de hilos envía a Supabase:
+
+- cada lote consulta de una vez qué `id_sistema` ya existen;
+- las vacantes nuevas del lote se insertan junto con su `registros_rh` en una
+  sola transacción (`registrar_lote`) y las cambiadas se actualizan en otra
+  (`actualizar_lote`), así que ninguna maestra queda huérfana;
+- las filas con el mismo `id_sistema` se serializan (gana la última del archivo,
+  como en una importación secuencial);
+- cada escritura se reintenta con espera exponencial ante errores transitorios;
+  antes de reenviar una inserción se revisa qué `id_sistema` ya quedaron
+  guardados, y las vacantes sin `id_sistema` no se reintentan;
+- los lotes terminados se guardan en un checkpoint por archivo, así que una
+  importación interrumpida se reanuda sin repetirlos;
+- las vacantes cuya huella de contenido coincide con la guardada no se escriben,
+  de modo que reimportar el mismo exporte casi no genera escrituras.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from datetime import date, datetime
+from pathlib import Path
+
+import httpx
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from postgrest.exceptions import APIError
+
+from config.db_utils import actualizar_lote, armar_payload_vacante, registrar_lote
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COLUMNAS_FECHA = ["fecha_solicitud", "fecha_avance", "fecha_autorizacion", "fecha_cobertura"]
+
+# Las autorizaciones anteriores a este año son capturas erróneas de Enla-c
+ANIO_MINIMO_AUTORIZACION = 2000
+
+# Enla-c exporta las fechas con el día primero; se usa cuando ninguna muestra lo aclara
+DIA_PRIMERO = True
+
+# Textos distintos que se revisan para inferir el formato de una columna
+MUESTRAS_FORMATO = 200
+
+
+def _adivinar(texto, dayfirst):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return guess_datetime_format(texto, dayfirst=dayfirst)
+
+
+def inferir_formato(textos):
+    """(formato, confirmado) de una columna de textos con fecha.
+
+    Confirmado si sale de muestras no ambiguas (las que dan el mismo formato con
+    día o mes primero, p. ej. 13/02/2024) y se toma el más frecuente; si todas
+    son ambiguas se asume DIA_PRIMERO, salvo con el año al inicio (año-mes-día).
+    """
+    muestras = textos.drop_duplicates().head(MUESTRAS_FORMATO)
+    claros = [
+        formato for formato, otro in ((_adivinar(t, True), _adivinar(t, False)) for t in muestras)
+        if formato is not None and formato == otro
+    ]
+    if claros:
+        return pd.Series(claros).mode().iloc[0], True
+    if muestras.empty:
+        return None, False
+    formato = _adivinar(muestras.iloc[0], DIA_PRIMERO)
+    if formato is not None and formato.startswith("%Y"):
+        formato = _adivinar(muestras.iloc[0], False)
+    return formato, False
+
+
+def _formato(formatos, columna, textos):
+    """Formato de `columna`; `formatos` guarda los confirmados durante una importación."""
+    formato = formatos.get(columna)
+    if formato is None:
+        formato, confirmado = inferir_formato(textos)
+        if confirmado:
+            formatos[columna] = formato
+    return formato
+
+
+def _parsear_textos(formatos, columna, textos):
+    """Fechas a partir de texto con el formato de la columna; lo que no encaja se reintenta elemento por elemento."""
+    fechas = pd.to_datetime(textos, errors="coerce", format=_formato(formatos, columna, textos))
+    fallidas = fechas.isna()
+    if fallidas.any():
+        fechas[fallidas] = pd.to_datetime(textos[fallidas], errors="coerce", format="mixed", dayfirst=DIA_PRIMERO)
+    return fechas
+
+
+def limpiar_fechas(df, formatos, columnas=COLUMNAS_FECHA, anio_minimo=ANIO_MINIMO_AUTORIZACION):
+    """Convierte las columnas de fecha de un bloque y reporta los valores descartados.
+
+    Se aceptan celdas de fecha y textos con fecha; cualquier otro valor (números,
+    textos sin fecha) queda como NaT. Las autorizaciones anteriores a `anio_minimo`
+    también se descartan. `formatos` es un dict por importación (un archivo) que
+    conserva el formato inferido de cada columna entre sus bloques.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, list[dict]]
+        (bloque con las columnas en datetime64, filas rechazadas con Fila, Columna, Valor y Motivo)
+    """
+    cambios = {}
+    rechazos = []
+    for columna in [c for c in columnas if c in df.columns]:
+        original = df[columna]
+        if pd.api.types.is_datetime64_any_dtype(original):
+            fechas = original
+        else:
+            tipos = original.map(type)
+            es_fecha = tipos.map(lambda t: issubclass(t, (datetime, date)))
+            es_str = tipos == str
+            es_texto = es_str & (original.where(es_str, "").astype(str).str.strip() != "")
+            fechas = pd.to_datetime(original.where(es_fecha), errors="coerce")
+            if es_texto.any():
+                fechas[es_texto] = _parsear_textos(formatos, columna, original[es_texto].str.strip())
+            invalidas = original.notna() & ~es_str & ~es_fecha | es_texto & fechas.isna()
+            rechazos += _rechazos(original[invalidas], columna, "Formato no reconocido")
+
+        if columna == "fecha_autorizacion":
+            antiguas = fechas.dt.year < anio_minimo
+            rechazos += _rechazos(original[antiguas], columna, f"Anterior a {anio_minimo}")
+            fechas = fechas.mask(antiguas)
+        cambios[columna] = fechas
+
+    return df.assign(**cambios), rechazos
+
+
+def _rechazos(valores, columna, motivo):
+    return [
+        {"Fila": fila + 1, "Columna": columna, "Valor": str(valor), "Motivo": motivo}
+        for fila, valor in valores.items()
+    ]
+
+
+# ------------------ Registros por fila ------------------
+def _texto(valor):
+    if pd.isna(valor):
+        return None
+    return str(valor).strip() if str(valor).strip() else None
+
+
+def _entero(valor):
+    return int(valor) if pd.notna(valor) else 0
+
+
+def construir_registro(row):
+    """(id_sistema, datos de registros_rh, datos de vacantes) de una fila ya preparada."""
+    id_sistema = int(row.get("id_sistema")) if pd.notna(row.get("id_sistema")) else None
+
+    maestra_data = {
+        "puesto": str(row.get("puesto_vacante", "")).strip(),
+        "empresa": str(row.get("empresa_vacante", "")).strip(),
+        "plaza": str(row.get("plaza_vacante", "")).strip(),
+        "area": str(row.get("funcion_area_vacante", "")).strip(),
+    }
+
+    # La fecha de cobertura solo aplica cuando la fase es CONTRATADO
+    fase_proceso = _texto(row.get("fase_proceso")) or ""
+    fecha_cobertura = row.get("fecha_cobertura") if fase_proceso == "CONTRATADO" else None
+
+    # Las solicitadas del exporte incluyen las ya contratadas
+    solicitadas = _entero(row.get("vacantes_solicitadas"))
+    contratadas = _entero(row.get("vacantes_contratados"))
+    if pd.notna(row.get("vacantes_solicitadas")) and pd.notna(row.get("vacantes_contratados")) and contratadas > 0:
+        solicitadas -= contratadas
+
+    vacante_data = {
+        "fecha_solicitud": row.get("fecha_solicitud"),
+        "tipo_solicitud": _texto(row.get("tipo_solicitud")),
+        "estatus_solicitud": _texto(row.get("estatus_solicitud")),
+        "fase_proceso": fase_proceso or None,
+        "fecha_avance": row.get("fecha_avance"),
+        "fecha_autorizacion": row.get("fecha_autorizacion"),
+        "puesto_vacante": maestra_data["puesto"],
+        "plaza_vacante": maestra_data["plaza"],
+        "empresa_vacante": maestra_data["empresa"],
+        "funcion_area_vacante": maestra_data["area"],
+        "vacantes_solicitadas": max(solicitadas, 0),
+        "vacantes_contratadas": contratadas,
+        "reponsable_vacante": _texto(row.get("responsable_vacante")) or "SIN ESPECIFICAR",
+        "comentarios_vacante": _texto(row.get("comentarios_vacante")),
+        "tipo_reclutamiento_vacante": _texto(row.get("tipo_reclutamiento_vacante")) or "SIN ESPECIFICAR",
+        "medio_reclutamiento_vacante": _texto(row.get("medio_reclutamiento_vacante")) or "SIN ESPECIFICAR",
+        "fecha_cobertura": fecha_cobertura,
+        "id_sistema": id_sistema,
+    }
+    return id_sistema, maestra_data, vacante_data
+
+
+# ------------------ Detección de cambios ------------------
+# Columnas de `vacantes` que escribe la importación (sin id_registro, que no viene del archivo)
+CAMPOS_COMPARADOS = [
+    "fecha_solicitud", "tipo_solicitud", "estatus_solicitud", "fase_proceso", "fecha_avance",
+    "fecha_autorizacion", "puesto_vacante", "plaza_vacante", "empresa_vacante", "funcion_area_vacante",
+    "vacantes_solicitadas", "vacantes_contratados", "responsable_vacante", "comentarios_vacante",
+    "tipo_reclutamiento_vacante", "medio_reclutamiento_vacante", "fecha_cobertura", "id_sistema",
+]
+_CAMPOS_FECHA = {"fecha_solicitud", "fecha_avance", "fecha_autorizacion", "fecha_cobertura"}
+
+
+def _canonico(campo, valor):
+    if valor is None or valor == "":
+        return None
+    if campo in _CAMPOS_FECHA:
+        return str(valor)[:10]    # la base puede devolver fecha o fecha-hora
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def huella(payload):
+    """Hash estable del contenido de una vacante (payload a escribir o fila leída de la base)."""
+    valores = [_canonico(campo, payload.get(campo)) for campo in CAMPOS_COMPARADOS]
+    return hashlib.sha1(json.dumps(valores, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def campos_distintos(payload, guardado):
+    return [c for c in CAMPOS_COMPARADOS if _canonico(c, payload.get(c)) != _canonico(c, guardado.get(c))]
+
+
+# ------------------ Reintentos ------------------
+TRABAJADORES = int(os.getenv("IMPORTACION_TRABAJADORES", "4"))
+TAMANO_LOTE = 25
+MAX_INTENTOS = 4
+ESPERA_BASE_SEGUNDOS = 0.5
+
+# Códigos HTTP y de PostgreSQL que indican una falla pasajera (saturación, timeout, bloqueo)
+_HTTP_TRANSITORIOS = {"408", "425", "429", "500", "502", "503", "504"}
+_SQL_TRANSITORIOS = {"40001", "40P01", "57014", "53300"}
+
+
+class ErrorTransitorio(Exception):
+    """Un lote agotó sus reintentos; se vuelve a intentar al reanudar la importación."""
+
+
+def es_transitorio(error):
+    if isinstance(error, (httpx.TransportError, httpx.TimeoutException)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return str(error.response.status_code) in _HTTP_TRANSITORIOS
+    if isinstance(error, APIError):
+        codigo = str(error.code or "")
+        return codigo in _HTTP_TRANSITORIOS or codigo in _SQL_TRANSITORIOS or codigo.startswith("08")
+    return False
+
+
+def con_reintentos(funcion, *args):
+    """Ejecuta `funcion(*args)` reintentando con espera exponencial (y jitter) los errores transitorios."""
+    for intento in range(MAX_INTENTOS):
+        try:
+            return funcion(*args)
+        except Exception as e:
+            if not es_transitorio(e):
+                raise
+            if intento == MAX_INTENTOS - 1:
+                raise ErrorTransitorio(str(e)) from e
+            espera = ESPERA_BASE_SEGUNDOS * 2 ** intento * (1 + random.random())
+            logger.warning("Error transitorio en %s (intento %d): %s; reintento en %.1f s",
+                           funcion.__name__, intento + 1, e, espera)
+            time.sleep(espera)
+
+
+# ------------------ Escritura por lotes ------------------
+def _nuevo_estado():
+    return {
+        "lock": threading.Lock(),
+        "existentes": {},    # id_sistema -> {"id": vacante, "id_registro": maestra, "huella": contenido}
+        "candados": {},      # id_sistema -> Lock
+        "ultima_fila": {},   # id_sistema -> última fila del archivo ya aplicada
+    }
+
+
+def _buscar_existentes(conn, ids):
+    """Vacantes guardadas con esos id_sistema, con su huella de contenido."""
+    respuesta = (
+        conn.table("vacantes")
+        .select(", ".join(["id", "id_registro"] + CAMPOS_COMPARADOS))
+        .in_("id_sistema", ids)
+        .execute()
+    )
+    return {r["id_sistema"]: {**r, "huella": huella(r)} for r in respuesta.data}
+
+
+def _candado(estado, id_sistema):
+    with estado["lock"]:
+        return estado["candados"].setdefault(id_sistema, threading.Lock())
+
+
+def _actualizar(conn, cambiadas):
+    """Una llamada con las unidades que ya existen en la base."""
+    actualizar_lote(conn, "Vacante", [
+        {
+            "id_registro": u["existente"]["id_registro"],
+            "maestra": u["maestra"],
+            "id": u["existente"]["id"],
+            "hijo": armar_payload_vacante(u["vacante"], u["existente"]["id_registro"]),
+        }
+        for u in cambiadas
+    ])
+    for u in cambiadas:
+        u["existente"]["huella"] = u["contenido"]
+        u["escrita"] = True
+
+
+def _insertar(conn, estado, nuevas):
+    """Una llamada con las unidades nuevas.
+
+    Antes de reenviar unidades con id_sistema se consulta si un intento anterior
+    ya las guardó (la respuesta pudo perderse); esas pasan a actualizarse si
+    hace falta en lugar de insertarse otra vez.
+    """
+    enviadas = [u["id_sistema"] for u in nuevas if u.get("enviada")]
+    if enviadas:
+        guardadas = _buscar_existentes(conn, enviadas)
+        for u in nuevas:
+            existente = guardadas.get(u["id_sistema"])
+            if existente is not None:
+                with estado["lock"]:
+                    estado["existentes"][u["id_sistema"]] = existente
+                u["existente"] = existente
+                u["escrita"] = existente["huella"] == u["contenido"]
+        distintas = [u for u in nuevas if u["existente"] and not u["escrita"]]
+        if distintas:
+            _actualizar(conn, distintas)
+        nuevas = [u for u in nuevas if not u["existente"]]
+        if not nuevas:
+            return
+
+    for u in nuevas:
+        u["enviada"] = True
+    ids = registrar_lote(conn, "Vacante", [(u["maestra"], u["vacante"]) for u in nuevas])
+    for u, par in zip(nuevas, ids):
+        u["escrita"] = True
+        if u["id_sistema"] is not None:
+            u["existente"] = estado["existentes"][u["id_sistema"]] = {**par, "huella": u["contenido"]}
+
+
+def _aplicar(conn, estado, unidades):
+    """Escribe las unidades pendientes de un lote: una llamada para las cambiadas y otra para las nuevas.
+
+    Cada llamada se reintenta por separado y las unidades escritas quedan
+    marcadas, así que ni un reintento ni el paso unidad por unidad repiten lo
+    que ya se guardó. Las nuevas sin id_sistema no se reintentan.
+    """
+    cambiadas = [u for u in unidades if u["existente"] and not u.get("escrita")]
+    if cambiadas:
+        con_reintentos(_actualizar, conn, cambiadas)
+    nuevas = [u for u in unidades if not u["existente"] and not u.get("escrita")]
+    con_id = [u for u in nuevas if u["id_sistema"] is not None]
+    if con_id:
+        con_reintentos(_insertar, conn, estado, con_id)
+
+    # Sin id_sistema no hay forma de saber si un intento fallido se guardó: un solo intento
+    sin_id = [u for u in nuevas if u["id_sistema"] is None]
+    if sin_id:
+        try:
+            _insertar(conn, estado, sin_id)
+        except Exception as e:
+            if not es_transitorio(e):
+                raise
+            logger.warning("Error transitorio al insertar %d vacantes sin id_sistema: %s", len(sin_id), e)
+            for u in sin_id:
+                u["escrita"] = True
+                u["error"] = ErrorTransitorio(f"No se confirmó si la vacante se guardó; revísala antes de reimportar ({e})")
+
+
+def _agrupar(estado, registros, resultados):
+    """Una unidad de escritura por id_sistema (gana la última fila) y por fila sin id_sistema.
+
+    Las filas que no cambian nada o que una fila posterior ya reemplazó se
+    agregan directo a `resultados`. Se llama con los candados del lote tomados.
+    """
+    unidades, por_id = [], {}
+    for fila, row, id_sistema, maestra_data, vacante_data, contenido in registros:
+        if id_sistema is not None:
+            if estado["ultima_fila"].get(id_sistema, -1) > fila:
+                # Una fila posterior del archivo ya dejó su versión; aplicar esta la revertiría
+                resultados.append((fila, row, "actualizado", None))
+                continue
+            estado["ultima_fila"][id_sistema] = fila
+
+        unidad = por_id.get(id_sistema)
+        if unidad is not None:
+            unidad.update(maestra=maestra_data, vacante=vacante_data, contenido=contenido)
+            unidad["filas"].append((fila, row, "actualizado"))
+            continue
+
+        existente = estado["existentes"].get(id_sistema)
+        if existente and existente["huella"] == contenido:
+            resultados.append((fila, row, "sin_cambios", None))
+            continue
+
+        unidad = {
+            "id_sistema": id_sistema,
+            "existente": existente,
+            "maestra": maestra_data,
+            "vacante": vacante_data,
+            "contenido": contenido,
+            "filas": [(fila, row, "actualizado" if existente else "nuevo")],
+        }
+        unidades.append(unidad)
+        if id_sistema is not None:
+            por_id[id_sistema] = unidad
+    return unidades
+
+
+def _importar_lote(conn, estado, filas):
+    """Escribe un lote de (fila, row); devuelve una lista de (fila, row, resultado, error).
+
+    Si la base rechaza el lote completo, se reintenta unidad por unidad para
+    atribuir el error solo a las filas que lo causan.
+    """
+    registros, resultados = [], []
+    for fila, row in filas:
+        try:
+            id_sistema, maestra_data, vacante_data = construir_registro(row)
+            contenido = huella(armar_payload_vacante(vacante_data, None))
+            registros.append((fila, row, id_sistema, maestra_data, vacante_data, contenido))
+        except Exception as e:
+            resultados.append((fila, row, None, e))
+
+    ids = sorted({r[2] for r in registros if r[2] is not None})
+    if ids:
+        encontrados = con_reintentos(_buscar_existentes, conn, ids)
+        with estado["lock"]:
+            for id_sistema, existente in encontrados.items():
+                estado["existentes"].setdefault(id_sistema, existente)
+
+    with ExitStack() as candados:
+        # Siempre en el mismo orden, así que dos lotes con id_sistema en común no se bloquean entre sí
+        for id_sistema in ids:
+            candados.enter_context(_candado(estado, id_sistema))
+
+        unidades = _agrupar(estado, registros, resultados)
+        try:
+            _aplicar(conn, estado, unidades)
+        except ErrorTransitorio:
+            raise
+        except Exception as e:
+            logger.warning("La base rechazó el lote (%s); se aplica unidad por unidad", e)
+            for unidad in unidades:
+                if unidad.get("escrita"):
+                    continue
+                try:
+                    _aplicar(conn, estado, [unidad])
+                except ErrorTransitorio:
+                    raise
+                except Exception as error_unidad:
+                    unidad["error"] = error_unidad
+
+    for unidad in unidades:
+        error = unidad.get("error")
+        resultados += [(fila, row, None if error else resultado, error) for fila, row, resultado in unidad["filas"]]
+    return sorted(resultados, key=lambda r: r[0])
+
+
+def importar_en_paralelo(conn, lotes, completos=(), trabajadores=TRABAJADORES):
+    """Envía los lotes con a lo sumo `trabajadores` hilos y genera cada uno al terminar.
+
+    `lotes` es un iterable (se consume a medida que hay cupo) de (número, [(fila, row), ...]).
+    Genera dicts con numero, filas, resultados (ver `_importar_lote`), error y omitido;
+    los lotes en `completos` no se envían y salen con omitido=True.
+    """
+    estado = _nuevo_estado()
+    pendientes = {}
+
+    def terminados(bloquear_hasta):
+        while len(pendientes) > bloquear_hasta:
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                numero, filas = pendientes.pop(futuro)
+                try:
+                    yield {"numero": numero, "filas": len(filas), "resultados": futuro.result(), "error": None, "omitido": False}
+                except Exception as e:
+                    yield {"numero": numero, "filas": len(filas), "resultados": [], "error": e, "omitido": False}
+
+    with ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="importacion") as pool:
+        for numero, filas in lotes:
+            if numero in completos:
+                yield {"numero": numero, "filas": len(filas), "resultados": [], "error": None, "omitido": True}
+                continue
+            pendientes[pool.submit(_importar_lote, conn, estado, filas)] = (numero, filas)
+            # Como mucho dos lotes por hilo en memoria
+            yield from terminados(2 * trabajadores - 1)
+        yield from terminados(0)
+
+
+def analizar_lotes(conn, lotes, max_ejemplos=50):
+    """Simulación sin escrituras: cuántas filas serían nuevas, cambiarían, quedarían igual o son inválidas.
+
+    Returns
+    -------
+    dict
+        Conteos nuevos / cambiados / sin_cambios / invalidos y hasta `max_ejemplos`
+        filas cambiadas (Fila, ID Sistema, Campos) e inválidas (Fila, Error).
+    """
+    resumen = {"nuevos": 0, "cambiados": 0, "sin_cambios": 0, "invalidos": 0, "ejemplos_cambios": [], "ejemplos_invalidos": []}
+    for _, filas in lotes:
+        registros = []
+        for fila, row in filas:
+            try:
+                id_sistema, _, vacante_data = construir_registro(row)
+                registros.append((fila, id_sistema, armar_payload_vacante(vacante_data, None)))
+            except Exception as e:
+                resumen["invalidos"] += 1
+                if len(resumen["ejemplos_invalidos"]) < max_ejemplos:
+                    resumen["ejemplos_invalidos"].append({"Fila": fila + 1, "Error": str(e)})
+
+        ids = sorted({id_sistema for _, id_sistema, _ in registros if id_sistema is not None})
+        existentes = con_reintentos(_buscar_existentes, conn, ids) if ids else {}
+        for fila, id_sistema, payload in registros:
+            guardado = existentes.get(id_sistema)
+            if guardado is None:
+                resumen["nuevos"] += 1
+            elif huella(payload) == guardado["huella"]:
+                resumen["sin_cambios"] += 1
+            else:
+                resumen["cambiados"] += 1
+                if len(resumen["ejemplos_cambios"]) < max_ejemplos:
+                    resumen["ejemplos_cambios"].append({
+                        "Fila": fila + 1,
+                        "ID Sistema": id_sistema,
+                        "Campos": ", ".join(campos_distintos(payload, guardado)),
+                    })
+    return resumen
+
+
+def dividir_en_lotes(df, inicio, tamano=TAMANO_LOTE):
+    """Lotes numerados desde `inicio` con las filas de un bloque; devuelve (lotes, siguiente número)."""
+    filas = list(df.iterrows())
+    lotes = [(inicio + i, filas[j:j + tamano]) for i, j in enumerate(range(0, len(filas), tamano))]
+    return lotes, inicio + len(lotes)
+
+
+# ------------------ Checkpoint ------------------
+_DIRECTORIO_CHECKPOINTS = Path(tempfile.gettempdir()) / "importaciones_enlac"
+
+
+def clave_archivo(archivo):
+    """Huella del contenido del archivo; identifica su checkpoint."""
+    return hashlib.sha1(archivo.getvalue()).hexdigest()
+
+
+def _ruta_checkpoint(clave):
+    return _DIRECTORIO_CHECKPOINTS / f"{clave}.json"
+
+
+def cargar_checkpoint(clave):
+    """Números de lote ya aplicados de una importación previa del mismo archivo."""
+    ruta = _ruta_checkpoint(clave)
+    if not ruta.exists():
+        return set()
+    try:
+        return set(json.loads(ruta.read_text())["lotes"])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Checkpoint ilegible %s: %s", ruta, e)
+        return set()
+
+
+def guardar_checkpoint(clave, lotes):
+    _DIRECTORIO_CHECKPOINTS.mkdir(parents=True, exist_ok=True)
+    ruta = _ruta_checkpoint(clave)
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_text(json.dumps({"lotes": sorted(lotes), "actualizado": datetime.now().isoformat()}))
+    temporal.replace(ruta)
+
+
+def borrar_checkpoint(clave):
+    _ruta_checkpoint(clave).unlink(missing_ok=True)
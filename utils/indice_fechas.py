@@ -0,0 +1,114 @@
+"""
+Índices de periodo sobre las columnas de fecha de las cargas compartidas.
+
+Los filtros del dashboard (año, trimestre, mes, semana ISO o rango) son siempre
+un intervalo de días. En lugar de comparar toda la columna en cada rerun, por
+cada columna de fecha se guarda una vez por versión de datos:
+
+- `dias`: el día (entero desde 1970-01-01) de cada fila con fecha, ordenado;
+- `posiciones`: la posición en el frame de cada uno de esos días;
+- `cubetas`: para año, trimestre, mes y semana ISO, la llave entera del periodo
+  (p. ej. 202503 para marzo de 2025) -> (inicio, fin) dentro del orden anterior.
+
+Un filtro por periodo es una búsqueda en diccionario y uno por rango una
+búsqueda binaria; las filas se toman del frame con un solo `iloc`. El frame no
+se reordena porque el mismo frame se filtra por varias columnas de fecha.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import cargar_altas, cargar_bajas_sistema, cargar_vacantes, registrar_cache, version_datos
+
+# Columnas indexadas de cada carga
+COLUMNAS_INDEXADAS = {
+    "vacantes": ["fecha_solicitud", "fecha_cobertura", "fecha_autorizacion"],
+    "altas": ["fecha_alta"],
+    "bajas_sistema": ["fecha_baja"],
+}
+
+_CARGAS = {"vacantes": cargar_vacantes, "altas": cargar_altas, "bajas_sistema": cargar_bajas_sistema}
+
+# Filtro del dashboard -> cubeta que lo resuelve
+_CUBETA_FILTRO = {"Por año": "año", "Por trimestre": "trimestre", "Por mes": "mes", "Por semana": "semana"}
+
+
+def a_dias(valores):
+    """Días desde 1970-01-01 de fechas (datetime64, Timestamp, date o texto)."""
+    return np.asarray(pd.to_datetime(valores), dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+
+
+def _rangos(llaves):
+    """{llave: (inicio, fin)} de un arreglo de llaves ya agrupadas (no decreciente)."""
+    unicas, inicios = np.unique(llaves, return_index=True)
+    finales = np.append(inicios[1:], len(llaves))
+    return {int(llave): (int(i), int(f)) for llave, i, f in zip(unicas, inicios, finales)}
+
+
+def indexar(fechas) -> dict:
+    """Índice de periodo de una columna datetime64 (ver el docstring del módulo)."""
+    valores = np.asarray(fechas, dtype="datetime64[ns]")
+    validas = np.flatnonzero(~np.isnat(valores))
+    orden = validas[np.argsort(valores[validas], kind="stable")]
+    ordenadas = pd.DatetimeIndex(valores[orden])
+
+    año = ordenadas.year.to_numpy(dtype=np.int64)
+    iso = ordenadas.isocalendar()
+    return {
+        "dias": valores[orden].astype("datetime64[D]").astype(np.int64),
+        "posiciones": orden,
+        "cubetas": {
+            "año": _rangos(año),
+            "trimestre": _rangos(año * 10 + ordenadas.quarter.to_numpy(dtype=np.int64)),
+            "mes": _rangos(año * 100 + ordenadas.month.to_numpy(dtype=np.int64)),
+            "semana": _rangos(iso["year"].to_numpy(dtype=np.int64) * 100 + iso["week"].to_numpy(dtype=np.int64)),
+        },
+    }
+
+
+def posiciones_periodo(indice, tipo_filtro, año=None, mes=None, semana=None, trimestre=None, fecha_inicio=None, fecha_fin=None):
+    """Posiciones (ascendentes) de las filas dentro del periodo; None si el filtro no acota."""
+    cubeta = _CUBETA_FILTRO.get(tipo_filtro)
+    if cubeta == "año" and año:
+        llave = int(año)
+    elif cubeta == "trimestre" and año and trimestre:
+        llave = int(año) * 10 + int(trimestre)
+    elif cubeta == "mes" and año and mes:
+        llave = int(año) * 100 + int(mes)
+    elif cubeta == "semana" and año and semana:
+        llave = int(año) * 100 + int(semana)
+    elif tipo_filtro == "Por rango de fechas" and fecha_inicio and fecha_fin:
+        desde, hasta = a_dias([fecha_inicio, fecha_fin])
+        inicio = np.searchsorted(indice["dias"], desde, side="left")
+        fin = np.searchsorted(indice["dias"], hasta, side="right")
+        return np.sort(indice["posiciones"][inicio:fin])
+    else:
+        return None
+
+    inicio, fin = indice["cubetas"][cubeta].get(llave, (0, 0))
+    return np.sort(indice["posiciones"][inicio:fin])
+
+
+@registrar_cache(tablas={
+    "vacantes": frozenset(COLUMNAS_INDEXADAS["vacantes"]),
+    "altas": frozenset(COLUMNAS_INDEXADAS["altas"]),
+    "bajas_sistema": None,
+})
+@cache_compartido(max_entradas=2)
+def _cargar_indices_fechas(_conn, version):
+    indices = {}
+    for tabla, columnas in COLUMNAS_INDEXADAS.items():
+        df = _CARGAS[tabla](_conn, version)
+        for columna in columnas:
+            if columna in df.columns:
+                indices[(tabla, columna)] = indexar(df[columna])
+    return indices
+
+
+def cargar_indices_fechas(conn, version=None) -> dict:
+    """{(tabla, columna): índice} de las cargas de `version`.
+
+    Las posiciones solo valen para los frames de esa misma versión: las páginas
+    deben pedir frames e índices con la misma `version`.
+    """
+    return _cargar_indices_fechas(conn, version_datos() if version is None else version)
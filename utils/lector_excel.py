@@ -0,0 +1,107 @@
+"""
+Lectura por bloques de los exportes de Enla-c.
+
+Los .xlsx se recorren con openpyxl en modo solo lectura, fila por fila, y solo
+se conservan las columnas pedidas, así que la memoria depende del tamaño del
+bloque y no del archivo. Los .xls (formato anterior) no admiten lectura
+incremental: se leen con pandas limitando las columnas y se entregan en los
+mismos bloques.
+"""
+import openpyxl
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TAMANO_BLOQUE = 500
+
+
+def _es_xls(archivo):
+    return str(getattr(archivo, "name", archivo)).lower().endswith(".xls")
+
+
+def _inicio(archivo):
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+
+
+def _abrir(archivo):
+    _inicio(archivo)
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    return libro, libro.worksheets[0]
+
+
+def _encabezados(fila):
+    return [str(c).strip() if c is not None else "" for c in fila]
+
+
+def vista_previa(archivo, filas=10) -> pd.DataFrame:
+    """Primeras `filas` filas con todas sus columnas, sin leer el resto del archivo."""
+    if _es_xls(archivo):
+        _inicio(archivo)
+        df = pd.read_excel(archivo, nrows=filas)
+        df.columns = df.columns.astype(str).str.strip()
+        return df
+
+    libro, hoja = _abrir(archivo)
+    try:
+        iterador = hoja.iter_rows(values_only=True)
+        encabezados = _encabezados(next(iterador, ()))
+        datos = [(list(fila) + [None] * len(encabezados))[:len(encabezados)] for _, fila in zip(range(filas), iterador)]
+    finally:
+        libro.close()
+    return pd.DataFrame(datos, columns=encabezados)
+
+
+def filas_totales(archivo):
+    """Filas de datos según las dimensiones de la hoja (None si el archivo no las declara)."""
+    if _es_xls(archivo):
+        return None
+    libro, hoja = _abrir(archivo)
+    try:
+        return hoja.max_row - 1 if hoja.max_row else None
+    finally:
+        libro.close()
+
+
+def leer_en_bloques(archivo, columnas, tamano_bloque=TAMANO_BLOQUE):
+    """Genera DataFrames de hasta `tamano_bloque` filas con las `columnas` presentes en el archivo.
+
+    El índice de cada bloque continúa el del anterior (posición de la fila de
+    datos en la hoja). Las filas vacías en todas las columnas pedidas se omiten.
+    """
+    if _es_xls(archivo):
+        _inicio(archivo)
+        df = pd.read_excel(archivo, usecols=lambda c: str(c).strip() in columnas)
+        df.columns = df.columns.astype(str).str.strip()
+        df = df.dropna(how="all")
+        for inicio in range(0, len(df), tamano_bloque):
+            yield df.iloc[inicio:inicio + tamano_bloque]
+        return
+
+    libro, hoja = _abrir(archivo)
+    try:
+        iterador = hoja.iter_rows(values_only=True)
+        encabezados = _encabezados(next(iterador, ()))
+        posiciones = {nombre: i for i, nombre in reversed(list(enumerate(encabezados))) if nombre in columnas}
+        nombres = list(posiciones)
+        indices = list(posiciones.values())
+        faltantes = [c for c in columnas if c not in posiciones]
+        if faltantes:
+            logger.warning("Columnas no encontradas en el archivo: %s", ", ".join(faltantes))
+
+        bloque, etiquetas = [], []
+        for numero, fila in enumerate(iterador):
+            valores = [fila[i] if i < len(fila) else None for i in indices]
+            if all(v is None or v == "" for v in valores):
+                continue
+            bloque.append(valores)
+            etiquetas.append(numero)
+            if len(bloque) == tamano_bloque:
+                yield pd.DataFrame(bloque, columns=nombres, index=etiquetas)
+                bloque, etiquetas = [], []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=nombres, index=etiquetas)
+    finally:
+        libro.close()
@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 
 
@@ -11,5 +12,6 @@ def get_logger(name: str) -> logging.Logger:
             datefmt="%Y-%m-%d %H:%M:%S",
         ))
         logger.addHandler(handler)
-        logger.setLevel(logging.ERROR)
+        # LOG_LEVEL=INFO expone, por ejemplo, el resumen de consultas por rerun
+        logger.setLevel(os.getenv("LOG_LEVEL", "ERROR").upper())
     return logger
@@ -0,0 +1,304 @@
+"""
+Monitoreo de consultas a Supabase.
+
+Envuelve la conexión que usa cada página para contar consultas, filas y bytes
+recibidos por página y por sesión, detectar consultas idénticas repetidas dentro
+de un mismo rerun y señalar los ``select("*")`` sin límite. Las lecturas idénticas
+que coinciden en el tiempo entre sesiones se resuelven con una sola llamada.
+
+Uso:
+    from utils.monitor_consultas import obtener_conexion
+    conn = obtener_conexion("dashboard")
+"""
+import json
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+import streamlit as st
+from st_supabase_connection import SupabaseConnection
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.cache_compartido import coalescer, estadisticas as estadisticas_cache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_CLAVE_ESTADO = "_monitor_consultas"
+
+# Métodos que acotan el número de filas de un select; los filtros (eq, in_, gte...)
+# no cuentan porque no limitan cuántas filas pueden coincidir
+_METODOS_ACOTADOS = {"limit", "range", "single", "maybe_single"}
+
+_lock = threading.Lock()
+_totales_proceso = {"consultas": 0, "filas": 0, "bytes": 0, "compartidas": 0}
+
+# tracemalloc es de todo el proceso: se inicia con el primer rerun en depuración
+# y se detiene cuando termina el último, salvo que ya lo hubiera iniciado otro
+_trazado = {"reruns": 0, "propio": False}
+
+
+def _contadores():
+    return {"consultas": 0, "filas": 0, "bytes": 0, "segundos": 0.0}
+
+
+def _estado_sesion():
+    """Estado de monitoreo de la sesión actual; None fuera de un rerun de Streamlit."""
+    if get_script_run_ctx() is None:
+        return None
+    if _CLAVE_ESTADO not in st.session_state:
+        st.session_state[_CLAVE_ESTADO] = {
+            "sesion": _contadores(),
+            "paginas": {},
+            "rerun": {"firmas": {}, "consultas": [], "duplicadas": [], "sin_limite": []},
+        }
+    return st.session_state[_CLAVE_ESTADO]
+
+
+def _describir(pasos):
+    """Representación legible de la cadena de métodos, ej. select('id').eq('id', 3)."""
+    partes = []
+    for nombre, args, kwargs in pasos:
+        if args is None:
+            partes.append(nombre)
+            continue
+        argumentos = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()]
+        partes.append(f"{nombre}({', '.join(argumentos)})")
+    return ".".join(partes)
+
+
+def _es_select_sin_limite(pasos):
+    nombres = {nombre for nombre, _, _ in pasos}
+    select_todo = any(
+        nombre == "select" and args and str(args[0]).strip() == "*"
+        for nombre, args, _ in pasos
+    )
+    return select_todo and not (nombres & _METODOS_ACOTADOS)
+
+
+def _registrar(pagina, tabla, pasos, respuesta, segundos, compartida=False):
+    data = getattr(respuesta, "data", None)
+    if isinstance(data, list):
+        filas = len(data)
+    else:
+        filas = 1 if data else 0
+    n_bytes = len(json.dumps(data, default=str, ensure_ascii=False).encode("utf-8")) if data else 0
+
+    with _lock:
+        if compartida:
+            _totales_proceso["compartidas"] += 1
+        else:
+            _totales_proceso["consultas"] += 1
+            _totales_proceso["filas"] += filas
+            _totales_proceso["bytes"] += n_bytes
+
+    descripcion = f"{tabla}.{_describir(pasos)}"
+    logger.info("[%s] %s -> %d filas, %d bytes, %.3f s%s", pagina, descripcion, filas, n_bytes, segundos,
+                " (compartida)" if compartida else "")
+
+    sin_limite = _es_select_sin_limite(pasos)
+    if sin_limite:
+        logger.warning("[%s] select('*') sin límite: %s", pagina, descripcion)
+
+    estado = _estado_sesion()
+    if estado is None:
+        return
+
+    for contador in (estado["sesion"], estado["paginas"].setdefault(pagina, _contadores())):
+        contador["consultas"] += 1
+        contador["filas"] += filas
+        contador["bytes"] += n_bytes
+        contador["segundos"] += segundos
+
+    rerun = estado["rerun"]
+    firma = (pagina, descripcion)
+    rerun["consultas"].append({
+        "Página": pagina, "Consulta": descripcion, "Filas": filas,
+        "Bytes": n_bytes, "Segundos": round(segundos, 3), "Compartida": compartida,
+    })
+    if firma in rerun["firmas"]:
+        rerun["firmas"][firma] += 1
+        rerun["duplicadas"].append(descripcion)
+        logger.warning("[%s] consulta duplicada en el mismo rerun: %s", pagina, descripcion)
+    else:
+        rerun["firmas"][firma] = 1
+    if sin_limite:
+        rerun["sin_limite"].append(descripcion)
+
+
+class _ConsultaMonitoreada:
+    """Proxy de un request builder de postgrest que registra la cadena de llamadas."""
+
+    def __init__(self, builder, tabla, pagina, pasos=()):
+        self._builder = builder
+        self._tabla = tabla
+        self._pagina = pagina
+        self._pasos = pasos
+
+    def _envolver(self, resultado, paso):
+        if hasattr(resultado, "execute"):
+            return _ConsultaMonitoreada(resultado, self._tabla, self._pagina, self._pasos + (paso,))
+        return resultado
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._builder, nombre)
+        if not callable(atributo):
+            # Propiedades encadenables como `not_`
+            return self._envolver(atributo, (nombre, None, {}))
+
+        def _llamada(*args, **kwargs):
+            return self._envolver(atributo(*args, **kwargs), (nombre, args, kwargs))
+        return _llamada
+
+    def execute(self):
+        inicio = time.perf_counter()
+        if self._pasos and self._pasos[0][0] == "select":
+            # Lecturas idénticas en curso desde otras sesiones comparten una sola llamada
+            clave = (self._tabla, _describir(self._pasos))
+            respuesta, compartida = coalescer(clave, self._builder.execute)
+        else:
+            respuesta, compartida = self._builder.execute(), False
+        _registrar(self._pagina, self._tabla, self._pasos, respuesta, time.perf_counter() - inicio, compartida)
+        return respuesta
+
+
+class ConexionMonitoreada:
+    """Envoltura delgada de SupabaseConnection; el resto de atributos se delega tal cual."""
+
+    def __init__(self, conn, pagina):
+        self._conn = conn
+        self.pagina = pagina
+
+    def table(self, nombre):
+        return _ConsultaMonitoreada(self._conn.table(nombre), nombre, self.pagina)
+
+    def rpc(self, funcion, parametros=None):
+        """Llamada a una función SQL de Supabase; se registra con el nombre de la función."""
+        return _ConsultaMonitoreada(self._conn.client.rpc(funcion, parametros or {}), funcion, self.pagina)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def obtener_conexion(pagina: str) -> ConexionMonitoreada:
+    """Conexión a Supabase de la página `pagina` con conteo de consultas."""
+    conn = st.connection("supabase", type=SupabaseConnection)
+    return ConexionMonitoreada(conn, pagina)
+
+
+def iniciar_rerun_consultas():
+    """Reinicia el registro de consultas del rerun; se llama en app.py antes de pg.run().
+
+    En modo depuración también empieza a medir la memoria que reserva el rerun.
+    """
+    estado = _estado_sesion()
+    if estado is not None:
+        estado["rerun"] = {"firmas": {}, "consultas": [], "duplicadas": [], "sin_limite": [], "memoria_pico": None}
+        if modo_depuracion():
+            with _lock:
+                if _trazado["reruns"] == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _trazado["propio"] = True
+                _trazado["reruns"] += 1
+            estado["rerun"]["midiendo"] = True
+
+
+def registrar_resumen_rerun():
+    """Escribe en el log el resumen del rerun actual."""
+    estado = _estado_sesion()
+    if estado is None:
+        return
+    rerun = estado["rerun"]
+    if rerun.pop("midiendo", False):
+        with _lock:
+            # Pico desde que empezó la medición; incluye la de otras sesiones concurrentes
+            rerun["memoria_pico"] = tracemalloc.get_traced_memory()[1]
+            _trazado["reruns"] -= 1
+            if _trazado["reruns"] == 0 and _trazado["propio"]:
+                tracemalloc.stop()
+                _trazado["propio"] = False
+        estado["memoria_pico_sesion"] = max(estado.get("memoria_pico_sesion", 0), rerun["memoria_pico"])
+        logger.info("Rerun: pico de memoria %.1f MB", rerun["memoria_pico"] / 1024 / 1024)
+
+    consultas = rerun["consultas"]
+    if not consultas:
+        return
+    logger.info(
+        "Rerun: %d consultas, %d filas, %d bytes, %d duplicadas, %d select('*') sin límite",
+        len(consultas),
+        sum(c["Filas"] for c in consultas),
+        sum(c["Bytes"] for c in consultas),
+        len(rerun["duplicadas"]),
+        len(rerun["sin_limite"]),
+    )
+
+
+def modo_depuracion() -> bool:
+    """La vista de depuración se activa agregando ?debug=1 a la URL."""
+    return st.query_params.get("debug") == "1"
+
+
+def render_panel_consultas():
+    """Vista de depuración con los contadores del rerun, la página y la sesión."""
+    estado = _estado_sesion()
+    if estado is None:
+        return
+
+    with st.expander(":material/bug_report: Consultas a Supabase"):
+        rerun = estado["rerun"]
+        consultas = rerun["consultas"]
+        st.caption("Rerun actual")
+        st.metric("Consultas", len(consultas))
+        st.metric("Filas", sum(c["Filas"] for c in consultas))
+        st.metric("KB recibidos", f"{sum(c['Bytes'] for c in consultas) / 1024:,.1f}")
+        if rerun.get("memoria_pico") is not None:
+            st.metric(
+                "Pico de memoria (MB)",
+                f"{rerun['memoria_pico'] / 1024 / 1024:,.1f}",
+                delta=f"máx. sesión {estado['memoria_pico_sesion'] / 1024 / 1024:,.1f}",
+                delta_color="off",
+            )
+        if consultas:
+            st.dataframe(pd.DataFrame(consultas), hide_index=True)
+
+        if rerun["duplicadas"]:
+            st.warning(f"{len(rerun['duplicadas'])} consultas duplicadas en este rerun")
+            for descripcion in rerun["duplicadas"]:
+                st.code(descripcion, language=None)
+        if rerun["sin_limite"]:
+            st.warning(f"{len(rerun['sin_limite'])} select('*') sin límite")
+            for descripcion in rerun["sin_limite"]:
+                st.code(descripcion, language=None)
+
+        st.caption("Acumulado de la sesión por página")
+        paginas = pd.DataFrame.from_dict(estado["paginas"], orient="index")
+        if not paginas.empty:
+            paginas.loc["Sesión"] = estado["sesion"]
+            paginas["segundos"] = paginas["segundos"].round(3)
+            st.dataframe(paginas)
+
+        with _lock:
+            proceso = dict(_totales_proceso)
+        st.caption(
+            f"Proceso: {proceso['consultas']:,} consultas · {proceso['filas']:,} filas · "
+            f"{proceso['bytes'] / 1024 / 1024:,.1f} MB · {proceso['compartidas']:,} compartidas"
+        )
+
+    with st.expander(":material/memory: Caché compartida"):
+        resumen, entradas, por_funcion = estadisticas_cache()
+        st.metric(
+            "Memoria usada",
+            f"{resumen['bytes'] / 1024 / 1024:,.1f} MB",
+            delta=f"de {resumen['presupuesto'] / 1024 / 1024:,.0f} MB",
+            delta_color="off",
+        )
+        st.caption(
+            f"{resumen['entradas']} entradas · {resumen['en_vuelo']} cargas en curso · "
+            f"{resumen['compartidas']:,} de {resumen['ejecutadas'] + resumen['compartidas']:,} consultas coalescidas"
+        )
+        if not entradas.empty:
+            st.dataframe(entradas.round({"MB": 2, "Carga (s)": 3}), hide_index=True)
+        if not por_funcion.empty:
+            st.caption("Acumulado por función")
+            st.dataframe(por_funcion.round({"segundos_carga": 3}))
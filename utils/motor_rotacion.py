@@ -0,0 +1,182 @@
+"""
+Motor de rotación de personal sobre `bajas_sistema` y `altas`.
+
+Por versión de datos se calcula una sola vez:
+
+- por baja: antigüedad al egreso (fecha_baja - fecha_ingreso, en días), las
+  banderas de baja temprana (antes de cumplir 30 y 90 días) y el mes de la baja;
+- por mes, en total y por empresa, plaza o departamento: bajas, bajas tempranas,
+  antigüedad mediana, contrataciones del mismo mes y la rotación
+  (bajas / contrataciones × 100).
+
+`altas` no tiene departamento, así que para esa dimensión solo hay bajas y
+antigüedad. Las páginas solo toman el subconjunto del periodo filtrado.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import DEPENDENCIAS_BAJAS_SISTEMA, cargar_altas, cargar_bajas_sistema, registrar_cache, version_datos
+from utils.normalizacion import normalizar_serie
+
+# Dimensiones disponibles: etiqueta -> columna del frame de bajas de cargar_rotacion
+DIMENSIONES_ROTACION = {
+    "Empresa": "empresa",
+    "Plaza": "plaza",
+    "Departamento": "departamento",
+}
+
+# Columna equivalente en `altas` (las que no aparecen no tienen contrataciones)
+_COLUMNAS_ALTAS = {"empresa": "empresa_alta", "plaza": "plaza_alta"}
+
+# Bajas tempranas: egresos antes de cumplir estos días desde el ingreso
+DIAS_TEMPRANA = [30, 90]
+
+# Rangos de antigüedad al egreso (días); el último queda abierto
+BORDES_ANTIGUEDAD = [0, 30, 90, 180, 365, 730, 1825, np.inf]
+RANGOS_ANTIGUEDAD = ["0-29 días", "30-89 días", "90-179 días", "180-364 días", "1-2 años", "2-5 años", "5+ años"]
+
+_COLUMNAS_MENSUAL = ["bajas", "bajas_30", "bajas_90", "antiguedad_mediana", "altas", "rotacion_pct"]
+
+
+def antiguedad_egreso(bajas) -> pd.Series:
+    """Días entre fecha_ingreso y fecha_baja; NaN si falta una fecha o la baja es anterior al ingreso."""
+    ingreso = pd.to_datetime(bajas["fecha_ingreso"], errors="coerce")
+    dias = (bajas["fecha_baja"] - ingreso).dt.days.astype(float)
+    return dias.where(dias >= 0)
+
+
+def _mensual(bajas, altas, columna):
+    """Tabla mensual de una dimensión (o del total si `columna` es None)."""
+    claves_bajas = [bajas["mes"]] + ([bajas[columna]] if columna else [])
+    grupos = bajas.groupby(claves_bajas, observed=True)
+    tabla = grupos.agg(
+        bajas=("mes", "size"),
+        bajas_30=("temprana_30", "sum"),
+        bajas_90=("temprana_90", "sum"),
+        antiguedad_mediana=("antiguedad", "median"),
+    )
+
+    columna_altas = _COLUMNAS_ALTAS.get(columna) if columna else None
+    if altas is not None and (columna is None or columna_altas):
+        claves_altas = [altas["mes"]] + ([altas[columna_altas]] if columna_altas else [])
+        contratados = altas.groupby(claves_altas, observed=True)["contratados_alta"].sum()
+        contratados.index = contratados.index.set_names(tabla.index.names)
+        tabla = tabla.join(contratados.rename("altas"), how="outer")
+        tabla[["bajas", "bajas_30", "bajas_90"]] = tabla[["bajas", "bajas_30", "bajas_90"]].fillna(0)
+        tabla["altas"] = tabla["altas"].fillna(0)
+        tabla["rotacion_pct"] = (tabla["bajas"] / tabla["altas"] * 100).where(tabla["altas"] > 0)
+    else:
+        tabla["altas"] = np.nan
+        tabla["rotacion_pct"] = np.nan
+
+    tabla[["bajas", "bajas_30", "bajas_90"]] = tabla[["bajas", "bajas_30", "bajas_90"]].astype(int)
+    return tabla[_COLUMNAS_MENSUAL].sort_index()
+
+
+@registrar_cache(tablas={
+    **DEPENDENCIAS_BAJAS_SISTEMA,
+    "altas": frozenset({"fecha_alta", "empresa_alta", "plaza_alta", "contratados_alta"}),
+})
+@cache_compartido(max_entradas=2)
+def _cargar_rotacion(_conn, version):
+    bajas = cargar_bajas_sistema(_conn, version)
+    if bajas.empty:
+        return {"bajas": pd.DataFrame(), "mensual": {}}
+
+    bajas = bajas[bajas["id"] > 0]
+    antiguedad = antiguedad_egreso(bajas)
+    frame = pd.DataFrame({
+        **{dimension: normalizar_serie(bajas[dimension]) for dimension in DIMENSIONES_ROTACION.values()
+           if dimension in bajas.columns},
+        "tipo_baja": bajas["tipo_baja"] if "tipo_baja" in bajas.columns else None,
+        "motivo_baja": bajas["motivo_baja"],
+        "fecha_baja": bajas["fecha_baja"],
+        "mes": bajas["fecha_baja"].dt.to_period("M").astype(str),
+        "antiguedad": antiguedad,
+        **{f"temprana_{dias}": antiguedad < dias for dias in DIAS_TEMPRANA},
+    }, index=bajas.index)
+
+    altas = cargar_altas(_conn, version)
+    if not altas.empty:
+        altas = pd.DataFrame({
+            "mes": altas["fecha_alta"].dt.to_period("M").astype(str),
+            **{columna: normalizar_serie(altas[columna]) for columna in _COLUMNAS_ALTAS.values()},
+            "contratados_alta": altas["contratados_alta"],
+        })
+    else:
+        altas = None
+
+    mensual = {None: _mensual(frame, altas, None)}
+    for columna in DIMENSIONES_ROTACION.values():
+        if columna in frame.columns:
+            mensual[columna] = _mensual(frame, altas, columna)
+    return {"bajas": frame, "mensual": mensual}
+
+
+def cargar_rotacion(conn, version=None) -> dict:
+    """Rotación precalculada de `version`.
+
+    Returns
+    -------
+    dict
+        bajas: una fila por baja (mismo índice que cargar_bajas_sistema, sin
+        las de id <= 0) con empresa, plaza, departamento, tipo_baja,
+        motivo_baja, fecha_baja, mes, antiguedad, temprana_30 y temprana_90.
+        mensual: {None (total) o columna de DIMENSIONES_ROTACION: tabla con
+        índice (mes[, valor]) y columnas bajas, bajas_30, bajas_90,
+        antiguedad_mediana, altas y rotacion_pct}.
+    """
+    return _cargar_rotacion(conn, version_datos() if version is None else version)
+
+
+def rotacion_mensual(rotacion, columna=None, desde=None, hasta=None) -> pd.DataFrame:
+    """Tabla mensual del total o de `columna` entre los meses `desde` y `hasta` ("AAAA-MM", inclusive)."""
+    tabla = rotacion["mensual"].get(columna)
+    if tabla is None:
+        return pd.DataFrame(columns=_COLUMNAS_MENSUAL)
+    meses = tabla.index.get_level_values(0)
+    mascara = np.ones(len(tabla), dtype=bool)
+    if desde is not None:
+        mascara &= meses >= desde
+    if hasta is not None:
+        mascara &= meses <= hasta
+    return tabla[mascara]
+
+
+def resumen_antiguedad(bajas, por=None) -> pd.DataFrame:
+    """Antigüedad al egreso (p25, p50, p75, p90) y porcentaje de bajas tempranas, en total o por `por`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columnas bajas, antiguedad_p25/p50/p75/p90, pct_30 y pct_90; un renglón
+        ("Total") sin `por` o uno por valor de `por`.
+    """
+    percentiles = [0.25, 0.5, 0.75, 0.9]
+    columnas = ["bajas", *[f"antiguedad_p{int(p * 100)}" for p in percentiles], "pct_30", "pct_90"]
+    if bajas.empty:
+        return pd.DataFrame(columns=columnas)
+
+    claves = bajas[por] if por else pd.Series("Total", index=bajas.index)
+    grupos = bajas.groupby(claves, observed=True)
+    resumen = grupos.agg(
+        bajas=("antiguedad", "size"),
+        con_antiguedad=("antiguedad", "count"),
+        tempranas_30=("temprana_30", "sum"),
+        tempranas_90=("temprana_90", "sum"),
+    )
+    cuantiles = grupos["antiguedad"].quantile(percentiles).unstack()
+    for p in percentiles:
+        resumen[f"antiguedad_p{int(p * 100)}"] = cuantiles[p]
+    for dias in DIAS_TEMPRANA:
+        resumen[f"pct_{dias}"] = (resumen[f"tempranas_{dias}"] / resumen["con_antiguedad"] * 100).where(resumen["con_antiguedad"] > 0)
+    return resumen[columnas].sort_values("bajas", ascending=False)
+
+
+def histograma_antiguedad(bajas) -> pd.Series:
+    """Número de bajas por rango de antigüedad al egreso (RANGOS_ANTIGUEDAD)."""
+    if bajas.empty:
+        return pd.Series(0, index=RANGOS_ANTIGUEDAD)
+    rangos = pd.cut(bajas["antiguedad"].dropna(), BORDES_ANTIGUEDAD, right=False, labels=RANGOS_ANTIGUEDAD)
+    return rangos.value_counts(sort=False).reindex(RANGOS_ANTIGUEDAD, fill_value=0)
@@ -0,0 +1,157 @@
+"""
+Motor de SLA de cobertura de vacantes.
+
+Calcula una sola vez por versión de datos, para cada vacante con contrataciones,
+los días de cobertura (`dias`), la meta que le aplica (`sla_objetivo`) y si la
+cumplió (`cumple_sla`). Las páginas y gráficas obtienen de aquí las metas y los
+resúmenes de cumplimiento en lugar de recalcularlos.
+
+Los días de las vacantes abiertas dependen de la fecha de referencia (`hoy`):
+por versión de datos se guarda solo la parte fija (`base_cobertura`) y cada día
+se suma `hoy - inicio` a las abiertas en una sola operación. Las entradas que
+dependen del día llevan `hoy` en su llave, así que valen el día completo y dan
+el mismo resultado para la misma fecha.
+"""
+import pandas as pd
+
+from config.opciones import SLA_POR_AREA, SLA_POR_EMPRESA, SLA_POR_PUESTO
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import DEPENDENCIAS_VACANTES, cargar_vacantes, registrar_cache, version_datos
+from utils.funciones_dashboard import base_cobertura, derivar_vacantes, hoy_mexico
+
+# Ejecutivos que se muestran en las gráficas de SLA
+EJECUTIVOS_SLA = ["DIEGO", "YULIANA", "LETICIA", "ELENA"]
+
+# Dimensiones disponibles para los resúmenes
+DIMENSIONES_SLA = {
+    "Ejecutivo": "ejecutivo",
+    "Empresa": "empresa_vacante",
+    "Plaza": "plaza_vacante",
+    "Mes": "mes",
+}
+
+# Columnas de las que dependen los días de cobertura
+DEPENDENCIAS_COBERTURA = {"vacantes": frozenset({
+    "fecha_solicitud", "fecha_autorizacion", "fecha_cobertura", "vacantes_solicitadas", "vacantes_contratados",
+})}
+
+
+def objetivo_sla_area(area):
+    """Meta de días de cobertura de una función de área ('OPERATIVA' / 'ADMINISTRATIVA')."""
+    return SLA_POR_AREA.get(area)
+
+
+def objetivo_sla_promedio():
+    """Promedio de las metas por función de área; referencia global de las gráficas."""
+    return sum(SLA_POR_AREA.values()) / len(SLA_POR_AREA)
+
+
+def extraer_ejecutivo(responsables):
+    """Primer nombre del responsable que coincide con EJECUTIVOS_SLA (None si ninguno)."""
+    palabras = responsables.fillna("").astype(str).str.upper().str.split().explode()
+    coincidencias = palabras[palabras.isin(EJECUTIVOS_SLA)]
+    return coincidencias.groupby(level=0).first().reindex(responsables.index)
+
+
+def objetivo_sla(df):
+    """Meta de días de cada vacante: por puesto, si no por empresa y si no por función de área."""
+    objetivo = df["funcion_area_vacante"].map(SLA_POR_AREA)
+    if SLA_POR_EMPRESA:
+        objetivo = df["empresa_vacante"].map(SLA_POR_EMPRESA).fillna(objetivo)
+    if SLA_POR_PUESTO:
+        objetivo = df["puesto_vacante"].map(SLA_POR_PUESTO).fillna(objetivo)
+    return objetivo
+
+
+@registrar_cache(tablas=DEPENDENCIAS_COBERTURA)
+@cache_compartido(max_entradas=2)
+def _cargar_base_cobertura(_conn, version):
+    df = cargar_vacantes(_conn, version)
+    return base_cobertura(df) if not df.empty else pd.DataFrame()
+
+
+@registrar_cache(tablas=DEPENDENCIAS_VACANTES, por_dia=True)
+@cache_compartido(max_entradas=2)
+def _cargar_vacantes_derivadas(_conn, version, hoy):
+    df = cargar_vacantes(_conn, version)
+    if df.empty:
+        return derivar_vacantes(df)
+    return derivar_vacantes(df, hoy, _cargar_base_cobertura(_conn, version))
+
+
+def cargar_vacantes_derivadas(conn, version=None, hoy=None) -> pd.DataFrame:
+    """Vacantes de `version` con es_activa, es_sla y dias al día `hoy` (por defecto, hoy en México).
+
+    Conserva el orden de cargar_vacantes, así que sirven los índices de fecha de la misma versión.
+    """
+    version = version_datos() if version is None else version
+    return _cargar_vacantes_derivadas(conn, version, hoy_mexico() if hoy is None else pd.Timestamp(hoy))
+
+
+@registrar_cache(tablas=DEPENDENCIAS_VACANTES)
+@cache_compartido(max_entradas=2)
+def _cargar_base_sla(_conn, version):
+    # Lo que no depende del día, para las vacantes con contrataciones: meta, ejecutivo y mes
+    df = cargar_vacantes(_conn, version)
+    if df.empty:
+        return pd.DataFrame(columns=["sla_objetivo", "ejecutivo", "mes"])
+    df = df[df["vacantes_contratados"] > 0]
+    return pd.DataFrame({
+        "sla_objetivo": objetivo_sla(df),
+        "ejecutivo": extraer_ejecutivo(df["responsable_vacante"]),
+        "mes": df["fecha_cobertura"].dt.to_period("M").astype(str),
+    }, index=df.index)
+
+
+@registrar_cache(tablas=DEPENDENCIAS_VACANTES, por_dia=True)
+@cache_compartido(max_entradas=2)
+def _cargar_sla_vacantes(_conn, version, hoy):
+    df = cargar_vacantes_derivadas(_conn, version, hoy)
+    if df.empty:
+        return df
+    df = df[df["es_sla"]]
+    base = _cargar_base_sla(_conn, version).reindex(df.index)
+    cumple = (df["dias"] <= base["sla_objetivo"]).where(base["sla_objetivo"].notna())
+    return df.assign(
+        sla_objetivo=base["sla_objetivo"],
+        cumple_sla=cumple.astype("boolean"),
+        ejecutivo=base["ejecutivo"],
+        mes=base["mes"],
+    )
+
+
+def cargar_sla_vacantes(conn, version=None, hoy=None) -> pd.DataFrame:
+    """Vacantes con contrataciones y las columnas dias, sla_objetivo, cumple_sla, ejecutivo y mes.
+
+    Los días de las vacantes aún abiertas se cuentan hasta `hoy` (por defecto, hoy en México).
+    """
+    version = version_datos() if version is None else version
+    return _cargar_sla_vacantes(conn, version, hoy_mexico() if hoy is None else pd.Timestamp(hoy))
+
+
+def resumen_sla(df, por):
+    """Cumplimiento y días de cobertura agrupados por una o varias columnas.
+
+    Returns
+    -------
+    pd.DataFrame
+        Índice `por` y columnas total, cumplen, pct_cumplimiento,
+        dias_promedio, dias_p50 y dias_p90.
+    """
+    columnas = ["total", "cumplen", "pct_cumplimiento", "dias_promedio", "dias_p50", "dias_p90"]
+    if df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    grupos = df.groupby(por, observed=True)
+    resumen = grupos.agg(
+        total=("dias", "size"),
+        con_meta=("cumple_sla", "count"),
+        cumplen=("cumple_sla", "sum"),
+        dias_promedio=("dias", "mean"),
+    )
+    percentiles = grupos["dias"].quantile([0.5, 0.9]).unstack()
+    resumen["dias_p50"] = percentiles[0.5]
+    resumen["dias_p90"] = percentiles[0.9]
+    resumen["cumplen"] = resumen["cumplen"].astype(int)
+    resumen["pct_cumplimiento"] = (resumen["cumplen"] / resumen["con_meta"] * 100).where(resumen["con_meta"] > 0)
+    return resumen[columnas]
@@ -0,0 +1,248 @@
+"""
+Motor de tendencias: series diarias de contrataciones, bajas y vacantes abiertas.
+
+Por versión de datos se arman, para el total y para cada función de área, tres
+series diarias densas (un valor por día, sin huecos) desde el primer evento
+(no antes de INICIO_SERIES) hasta hoy:
+
+- contrataciones: suma de contratados_alta por fecha_alta;
+- bajas: bajas_sistema por fecha_baja;
+- vacantes_abiertas: vacantes autorizadas aún sin cubrir al cierre de cada día.
+
+Junto a cada serie se guarda su suma acumulada (con un cero al inicio), así que
+la suma de cualquier ventana es la resta de dos acumulados: una ventana móvil
+de 4, 13 o 52 semanas cuesta lo mismo por punto, y solo se calculan los puntos
+del rango pedido.
+"""
+import numpy as np
+import pandas as pd
+
+from config.opciones import AREAS
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import (
+    DEPENDENCIAS_ALTAS,
+    DEPENDENCIAS_BAJAS_SISTEMA,
+    cargar_altas,
+    cargar_bajas_sistema,
+    cargar_vacantes,
+    registrar_cache,
+    version_datos,
+)
+from utils.funciones_dashboard import ESTATUS_INACTIVOS, _FECHA_CENTINELA, hoy_mexico
+from utils.indice_fechas import a_dias
+
+TODAS = "Todas"
+
+SERIES = {
+    "contrataciones": "Contrataciones",
+    "bajas": "Bajas",
+    "vacantes_abiertas": "Vacantes abiertas",
+}
+
+# Saldos diarios: en una ventana se promedian en lugar de sumarse
+SALDOS = {"vacantes_abiertas"}
+
+VENTANAS_SEMANAS = [4, 13, 52]
+
+# Primer día de las series: fechas anteriores son errores de captura y no
+# deben alargar la matriz diaria
+INICIO_SERIES = pd.Timestamp("2020-01-01")
+
+# Un año en días completos de semana, para comparar los mismos días de la semana
+_DIAS_AÑO = 52 * 7
+
+
+def _eventos(fechas, pesos, areas):
+    """(días, pesos, fila de área) de los eventos con fecha; la fila 0 es el total."""
+    fechas = np.asarray(fechas, dtype="datetime64[ns]")
+    validos = ~np.isnat(fechas)
+    fila = np.zeros(len(fechas), dtype=np.int64)
+    for i, area in enumerate(AREAS, start=1):
+        fila[np.asarray(areas == area)] = i
+    return a_dias(fechas[validos]), np.asarray(pesos, dtype=float)[validos], fila[validos]
+
+
+_DEPENDENCIAS_EVENTOS = {
+    **DEPENDENCIAS_ALTAS,
+    **DEPENDENCIAS_BAJAS_SISTEMA,
+    "vacantes": frozenset({
+        "fecha_autorizacion", "fecha_cobertura", "fase_proceso", "estatus_solicitud", "funcion_area_vacante",
+    }),
+}
+
+
+@registrar_cache(tablas=_DEPENDENCIAS_EVENTOS)
+@cache_compartido(max_entradas=2)
+def _cargar_eventos(_conn, version):
+    """{contrataciones, bajas, aperturas, cierres: (días, pesos, filas)} de `version`."""
+    eventos = {}
+
+    altas = cargar_altas(_conn, version)
+    if not altas.empty:
+        eventos["contrataciones"] = _eventos(altas["fecha_alta"], altas["contratados_alta"], altas["area_alta"])
+
+    bajas = cargar_bajas_sistema(_conn, version)
+    if not bajas.empty:
+        bajas = bajas[bajas["id"] > 0]
+        area = bajas["funcion_area"] if "funcion_area" in bajas.columns else pd.Series(None, index=bajas.index)
+        eventos["bajas"] = _eventos(bajas["fecha_baja"], np.ones(len(bajas)), area)
+
+    vacantes = cargar_vacantes(_conn, version)
+    if not vacantes.empty:
+        autorizacion = vacantes["fecha_autorizacion"]
+        con_inicio = autorizacion.notna() & (autorizacion != _FECHA_CENTINELA)
+        activa = (
+            (vacantes["fase_proceso"] != "CONTRATADO") &
+            ~vacantes["estatus_solicitud"].isin(ESTATUS_INACTIVOS)
+        )
+        # Abierta desde su autorización hasta su cobertura; sin cobertura, solo si sigue activa
+        cubierta = con_inicio & vacantes["fecha_cobertura"].notna()
+        vigente = con_inicio & vacantes["fecha_cobertura"].isna() & activa
+        abiertas = vacantes[cubierta | vigente]
+        cubiertas = vacantes[cubierta]
+        eventos["aperturas"] = _eventos(
+            abiertas["fecha_autorizacion"], np.ones(len(abiertas)), abiertas["funcion_area_vacante"]
+        )
+        # Una cobertura capturada antes de la autorización cierra el mismo día
+        cierre = cubiertas["fecha_cobertura"].where(
+            cubiertas["fecha_cobertura"] >= cubiertas["fecha_autorizacion"], cubiertas["fecha_autorizacion"]
+        )
+        eventos["cierres"] = _eventos(cierre, np.ones(len(cubiertas)), cubiertas["funcion_area_vacante"])
+    return eventos
+
+
+def _densa(dias, pesos, filas, inicio, n, previos=False):
+    """Matriz (áreas + 1) × n con la suma de `pesos` por día; fuera de [inicio, inicio + n) se descarta.
+
+    Con `previos` los eventos anteriores a `inicio` se suman al primer día.
+    """
+    posicion = dias - inicio
+    if previos:
+        posicion = np.maximum(posicion, 0)
+    dentro = (posicion >= 0) & (posicion < n)
+    filas_totales = len(AREAS) + 1
+    por_area = np.bincount(
+        filas[dentro] * n + posicion[dentro], weights=pesos[dentro], minlength=filas_totales * n
+    ).reshape(filas_totales, n)
+    por_area[0] = por_area.sum(axis=0)
+    return por_area
+
+
+@registrar_cache(tablas=_DEPENDENCIAS_EVENTOS, por_dia=True)
+@cache_compartido(max_entradas=2)
+def _cargar_tendencias(_conn, version, hoy):
+    eventos = _cargar_eventos(_conn, version)
+    fin = int(a_dias([hoy])[0])
+    primero = min([int(dias.min()) for dias, _, _ in eventos.values() if len(dias)] + [fin])
+    inicio = min(max(primero, int(a_dias([INICIO_SERIES])[0])), fin)
+    n = fin - inicio + 1
+
+    def densa(nombre, previos=False):
+        if nombre not in eventos:
+            return np.zeros((len(AREAS) + 1, n))
+        return _densa(*eventos[nombre], inicio, n, previos)
+
+    series = {
+        "contrataciones": densa("contrataciones"),
+        "bajas": densa("bajas"),
+        # Saldo al cierre del día: aperturas acumuladas menos cierres acumulados; lo
+        # abierto o cerrado antes de INICIO_SERIES entra en el saldo del primer día
+        "vacantes_abiertas": np.cumsum(densa("aperturas", True) - densa("cierres", True), axis=1),
+    }
+    return {
+        "fechas": pd.date_range(pd.Timestamp(inicio, unit="D"), periods=n, freq="D"),
+        "areas": [TODAS, *AREAS],
+        "series": series,
+        "acumulados": {
+            nombre: np.concatenate([np.zeros((len(AREAS) + 1, 1)), np.cumsum(valores, axis=1)], axis=1)
+            for nombre, valores in series.items()
+        },
+    }
+
+
+def cargar_tendencias(conn, version=None, hoy=None) -> dict:
+    """Series diarias y sus acumulados (ver el docstring del módulo) hasta `hoy`.
+
+    Returns
+    -------
+    dict
+        fechas (DatetimeIndex diario), areas ([TODAS, *AREAS], una fila de cada
+        matriz por área), series y acumulados ({serie: matriz}).
+    """
+    version = version_datos() if version is None else version
+    return _cargar_tendencias(conn, version, hoy_mexico() if hoy is None else pd.Timestamp(hoy))
+
+
+def _rango(tendencias, desde, hasta):
+    """Posiciones [i, j) de los días entre `desde` y `hasta` (inclusive)."""
+    fechas = tendencias["fechas"]
+    i = 0 if desde is None else fechas.searchsorted(pd.Timestamp(desde), side="left")
+    j = len(fechas) if hasta is None else fechas.searchsorted(pd.Timestamp(hasta), side="right")
+    return i, j
+
+
+def serie_diaria(tendencias, serie, area=TODAS, desde=None, hasta=None) -> pd.Series:
+    """Valores diarios de `serie` entre `desde` y `hasta`."""
+    i, j = _rango(tendencias, desde, hasta)
+    fila = tendencias["areas"].index(area)
+    return pd.Series(tendencias["series"][serie][fila, i:j], index=tendencias["fechas"][i:j], name=serie)
+
+
+def _ventana(tendencias, serie, dias, fila, i, j):
+    """Suma de los `dias` que terminan en cada posición de [i, j); NaN si la ventana sale de la serie."""
+    acumulado = tendencias["acumulados"][serie][fila]
+    finales = np.arange(i, j) + 1
+    inicios = finales - dias
+    suma = acumulado[finales] - acumulado[np.maximum(inicios, 0)]
+    return np.where(inicios >= 0, suma, np.nan)
+
+
+def ventana_movil(tendencias, serie, semanas, area=TODAS, desde=None, hasta=None) -> pd.Series:
+    """Suma móvil de `semanas` semanas de `serie` (promedio diario para los saldos de SALDOS)."""
+    i, j = _rango(tendencias, desde, hasta)
+    dias = semanas * 7
+    valores = _ventana(tendencias, serie, dias, tendencias["areas"].index(area), i, j)
+    if serie in SALDOS:
+        valores = valores / dias
+    return pd.Series(valores, index=tendencias["fechas"][i:j], name=f"{serie}_{semanas}s")
+
+
+def variacion_anual(tendencias, serie, semanas=52, area=TODAS, desde=None, hasta=None) -> pd.DataFrame:
+    """Ventana móvil de `semanas` contra la misma ventana 52 semanas antes.
+
+    Returns
+    -------
+    pd.DataFrame
+        Índice diario y columnas actual, anterior, variacion y pct_variacion.
+    """
+    i, j = _rango(tendencias, desde, hasta)
+    actual = ventana_movil(tendencias, serie, semanas, area, desde, hasta)
+    fila = tendencias["areas"].index(area)
+    anterior = np.full(j - i, np.nan)
+    desplazadas = np.arange(i, j) - _DIAS_AÑO >= 0
+    if desplazadas.any():
+        primera = i + int(np.argmax(desplazadas))
+        anterior[primera - i:] = _ventana(tendencias, serie, semanas * 7, fila, primera - _DIAS_AÑO, j - _DIAS_AÑO)
+        if serie in SALDOS:
+            anterior = anterior / (semanas * 7)
+    resultado = pd.DataFrame({"actual": actual.to_numpy(), "anterior": anterior}, index=actual.index)
+    resultado["variacion"] = resultado["actual"] - resultado["anterior"]
+    resultado["pct_variacion"] = (resultado["variacion"] / resultado["anterior"] * 100).where(resultado["anterior"] > 0)
+    return resultado
+
+
+def cambio_neto_acumulado(tendencias, area=TODAS, desde=None, hasta=None) -> pd.Series:
+    """Contrataciones menos bajas acumuladas desde el inicio de la serie (o desde `desde`)."""
+    i, j = _rango(tendencias, desde, hasta)
+    fila = tendencias["areas"].index(area)
+    neto = tendencias["acumulados"]["contrataciones"][fila] - tendencias["acumulados"]["bajas"][fila]
+    return pd.Series(neto[i + 1:j + 1] - neto[i], index=tendencias["fechas"][i:j], name="cambio_neto")
+
+
+def semanal(serie) -> pd.Series:
+    """Un punto por semana (domingos y el último día) para graficar una serie diaria."""
+    if serie.empty:
+        return serie
+    domingos = serie.index.dayofweek == 6
+    domingos[-1] = True
+    return serie[domingos]
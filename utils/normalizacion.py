@@ -0,0 +1,65 @@
+"""
+Normalización de texto libre (puestos, motivos, comentarios, nombres).
+
+Una sola regla para toda la app: sin espacios en los extremos, en mayúsculas y,
+salvo que se pida lo contrario, sin acentos en las vocales (la Ñ se conserva).
+
+- `normalizar(valor)`: para los formularios, un valor a la vez. Los valores
+  repetidos (puestos, motivos) salen de una caché LRU.
+- `normalizar_serie(serie)`: para importaciones y cargas, una columna completa
+  de una vez con pyarrow.compute.
+"""
+import functools
+import math
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TEXTO_ARROW = pd.ArrowDtype(pa.string())
+
+_ACENTOS = {"Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U"}
+_TABLA_ACENTOS = str.maketrans(_ACENTOS)
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalizar(texto, quitar_acentos):
+    texto = texto.strip().upper()
+    return texto.translate(_TABLA_ACENTOS) if quitar_acentos else texto
+
+
+def normalizar(valor, quitar_acentos=True):
+    """Texto normalizado de un valor; None si el valor es nulo."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    return _normalizar(str(valor), quitar_acentos)
+
+
+def _arrow(serie):
+    if serie.dtype == object:
+        # Celdas numéricas de Excel u otros tipos: se toman como texto, igual que str(valor)
+        serie = serie.astype(str).where(serie.notna())
+    return pa.array(serie.astype(TEXTO_ARROW))
+
+
+def _serie(arreglo, index, name=None):
+    return pd.Series(pd.arrays.ArrowExtensionArray(arreglo), index=index, name=name)
+
+
+def normalizar_serie(serie, quitar_acentos=True) -> pd.Series:
+    """Misma regla que `normalizar` aplicada a toda la columna; devuelve texto Arrow (nulos como <NA>)."""
+    texto = pc.utf8_upper(pc.utf8_trim_whitespace(_arrow(serie)))
+    if quitar_acentos:
+        for acento, letra in _ACENTOS.items():
+            texto = pc.replace_substring(texto, acento, letra)
+    return _serie(texto, serie.index, serie.name)
+
+
+def unir_nombres(df, columnas=("nombre", "apellido_paterno", "apellido_materno")) -> pd.Series:
+    """Nombre completo normalizado a partir de `columnas`; las partes vacías no dejan espacios dobles."""
+    # Se rellenan los nulos en lugar de usar null_handling="skip": con pyarrow 26
+    # ese modo descarta las filas en que todas las partes son nulas.
+    partes = [pc.fill_null(_arrow(df[columna]), "") for columna in columnas]
+    nombre = pc.binary_join_element_wise(*partes, " ")
+    nombre = pc.replace_substring_regex(nombre, r"\s+", " ")
+    return normalizar_serie(_serie(nombre, df.index))
@@ -0,0 +1,199 @@
+"""
+Snapshots semanales de vacantes disponibles.
+
+Calcula, a partir del frame de vacantes en caché, cuántas posiciones estaban
+abiertas al cierre (domingo) de cada semana ISO, en total y por área, empresa y
+ejecutivo. Los totales se guardan en `snapshot_vacantes_semanales` (delta del
+dashboard) y el desglose en `snapshot_vacantes_detalle`, con una fila por
+(año, semana_iso, dimension, valor).
+
+Uso desde la raíz del proyecto (lee .streamlit/secrets.toml):
+
+    python -m utils.snapshot_vacantes               # última semana completa
+    python -m utils.snapshot_vacantes --desde 2024-01-01   # backfill
+    python -m utils.snapshot_vacantes --dry-run     # solo muestra el resultado
+"""
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.cache_compartido import cache_compartido
+from utils.cargas_datos import cargar_vacantes, registrar_cache, version_datos
+from utils.funciones_dashboard import MEXICO_TZ
+from utils.logger import get_logger
+from utils.motor_sla import extraer_ejecutivo
+
+logger = get_logger(__name__)
+
+TABLA_TOTALES = "snapshot_vacantes_semanales"
+TABLA_DETALLE = "snapshot_vacantes_detalle"
+
+# Columna de la vacante que alimenta cada dimensión del detalle
+DIMENSIONES_SNAPSHOT = {
+    "area": "funcion_area_vacante",
+    "empresa": "empresa_vacante",
+    "ejecutivo": "ejecutivo",
+}
+
+# Mismo criterio que "Vacantes disponibles a la fecha" en dashboard.py
+_ESTATUS_EXCLUIDOS = ["CANCELADO", "FINALIZADO", "PAUSADO"]
+
+_TAMANO_LOTE = 500
+
+
+def semanas_cerradas(desde=None, hoy=None):
+    """Domingos de cierre de las semanas ISO completas entre `desde` y `hoy`.
+
+    Sin `desde` devuelve solo la última semana completa.
+    """
+    hoy = pd.Timestamp(datetime.now(MEXICO_TZ).date()) if hoy is None else pd.Timestamp(hoy)
+    ultimo_domingo = hoy - pd.Timedelta(days=hoy.dayofweek + 1)
+    if desde is None:
+        return pd.DatetimeIndex([ultimo_domingo])
+    return pd.date_range(start=pd.Timestamp(desde), end=ultimo_domingo, freq="W-SUN")
+
+
+def calcular_snapshots(df_vacantes, cierres):
+    """Posiciones abiertas al cierre de cada semana, en total y por dimensión.
+
+    Una vacante aporta sus posiciones pendientes desde su autorización hasta su
+    cobertura (o hasta hoy si sigue activa) y sus posiciones contratadas desde la
+    autorización hasta la fecha de cobertura. Las vacantes cerradas sin fecha de
+    cobertura no se pueden ubicar en el tiempo y no se cuentan. Todas las semanas
+    se resuelven en una sola matriz (vacantes × semanas).
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        (totales con año, semana_iso, n_vacantes;
+         detalle con año, semana_iso, dimension, valor, n_vacantes)
+    """
+    columnas_totales = ["año", "semana_iso", "n_vacantes"]
+    columnas_detalle = ["año", "semana_iso", "dimension", "valor", "n_vacantes"]
+    if df_vacantes.empty or len(cierres) == 0:
+        return pd.DataFrame(columns=columnas_totales), pd.DataFrame(columns=columnas_detalle)
+
+    df = df_vacantes[df_vacantes["fecha_autorizacion"].notna()]
+    activa = ~(df["estatus_solicitud"].isin(_ESTATUS_EXCLUIDOS) | (df["fase_proceso"] == "CONTRATADO"))
+
+    dias = lambda serie: serie.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    inicio = dias(df["fecha_autorizacion"])
+    cobertura = dias(df["fecha_cobertura"])
+    fines = np.asarray(cierres, dtype="datetime64[D]")
+
+    tiene_cobertura = ~np.isnat(cobertura)
+    cubierta_despues = tiene_cobertura[:, None] & (cobertura[:, None] > fines[None, :])
+    autorizada = inicio[:, None] <= fines[None, :]
+
+    pendientes_abiertas = autorizada & (activa.to_numpy()[:, None] | cubierta_despues)
+    contratadas_abiertas = autorizada & cubierta_despues
+
+    abiertas = (
+        pendientes_abiertas * df["vacantes_solicitadas"].to_numpy()[:, None]
+        + contratadas_abiertas * df["vacantes_contratados"].to_numpy()[:, None]
+    )
+
+    iso = pd.DatetimeIndex(cierres).isocalendar()
+    semanas = pd.MultiIndex.from_arrays(
+        [iso["year"].to_numpy(), iso["week"].to_numpy()], names=["año", "semana_iso"]
+    )
+    matriz = pd.DataFrame(abiertas, index=df.index, columns=semanas)
+
+    totales = matriz.sum().rename("n_vacantes").reset_index()
+
+    df = df.assign(ejecutivo=extraer_ejecutivo(df["responsable_vacante"]))
+    detalle = []
+    for dimension, columna in DIMENSIONES_SNAPSHOT.items():
+        valores = df[columna].fillna("SIN DATO").astype(str).str.strip().str.upper()
+        por_valor = matriz.groupby(valores.rename("valor")).sum()
+        largo = por_valor.stack(["año", "semana_iso"]).rename("n_vacantes").reset_index()
+        detalle.append(largo[largo["n_vacantes"] > 0].assign(dimension=dimension))
+
+    detalle = pd.concat(detalle, ignore_index=True)[columnas_detalle]
+    return totales[columnas_totales].astype(int), detalle.astype({"año": int, "semana_iso": int, "n_vacantes": int})
+
+
+def _guardar(conn, tabla, df, conflicto):
+    registros = df.to_dict(orient="records")
+    for i in range(0, len(registros), _TAMANO_LOTE):
+        conn.table(tabla).upsert(registros[i:i + _TAMANO_LOTE], on_conflict=conflicto).execute()
+
+
+def guardar_snapshots(conn, totales, detalle):
+    """Upsert de totales y detalle; repetir una semana la sobrescribe."""
+    _guardar(conn, TABLA_TOTALES, totales, "año,semana_iso")
+    _guardar(conn, TABLA_DETALLE, detalle, "año,semana_iso,dimension,valor")
+
+
+# Las escribe la CLI en otro proceso; el ttl las refresca aunque no cambie la versión
+@registrar_cache(tablas={TABLA_DETALLE: None})
+@cache_compartido(max_entradas=2, ttl=300)
+def _cargar_snapshots_detalle(_conn, version):
+    respuesta = (
+        _conn.table(TABLA_DETALLE)
+        .select("año, semana_iso, dimension, valor, n_vacantes")
+        .order("año")
+        .order("semana_iso")
+        .execute()
+    )
+    df = pd.DataFrame(respuesta.data)
+    if df.empty:
+        return df
+    df["semana"] = df["año"].astype(str) + "-S" + df["semana_iso"].astype(str).str.zfill(2)
+    return df
+
+
+def cargar_snapshots_detalle(conn) -> pd.DataFrame:
+    """Detalle semanal guardado, con la etiqueta `semana` (p. ej. '2025-S07')."""
+    return _cargar_snapshots_detalle(conn, version_datos())
+
+
+@registrar_cache(tablas={TABLA_TOTALES: None})
+@cache_compartido(max_entradas=2, ttl=300)
+def _ultimo_snapshot(_conn, version):
+    respuesta = (
+        _conn.table(TABLA_TOTALES)
+        .select("n_vacantes, semana_iso, año")
+        .order("año", desc=True)
+        .order("semana_iso", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return respuesta.data[0] if respuesta.data else None
+
+
+def ultimo_snapshot(conn):
+    """Snapshot total más reciente (dict con n_vacantes, semana_iso y año) o None."""
+    return _ultimo_snapshot(conn, version_datos())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los snapshots semanales de vacantes.")
+    parser.add_argument("--desde", help="Fecha inicial del backfill (AAAA-MM-DD).")
+    parser.add_argument("--dry-run", action="store_true", help="Calcula sin escribir en Supabase.")
+    args = parser.parse_args(argv)
+
+    from st_supabase_connection import SupabaseConnection
+
+    conn = st.connection("supabase", type=SupabaseConnection)
+    cierres = semanas_cerradas(args.desde)
+    totales, detalle = calcular_snapshots(cargar_vacantes(conn), cierres)
+
+    if args.dry_run:
+        print(totales.to_string(index=False))
+        print(f"{len(detalle)} filas de detalle")
+        return
+
+    try:
+        guardar_snapshots(conn, totales, detalle)
+    except Exception as e:
+        logger.error("Error al guardar snapshots de vacantes: %s", e, exc_info=True)
+        raise
+    print(f"{len(totales)} semanas y {len(detalle)} filas de detalle guardadas.")
+
+
+if __name__ == "__main__":
+    main()